@@ -1,26 +1,67 @@
-import copy
-from typing import Dict, List, Set, Tuple
+import time
+from collections import Counter
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
+import board as packed
+import heuristics
+import moves as move_gen
+from deadlock import DeadlockDetector
 from pq import PQ
+from solver_stats import SolverStats
 
 
+class SolveStatus(str, Enum):
+    """The outcome of the last solve of a GameSolution."""
+    SOLVED = "solved"  # self.moves is a complete plan.
+    UNSOLVABLE = "proven-unsolvable"  # The whole reachable space was searched without finding a solved board.
+    BUDGET_EXHAUSTED = "budget-exhausted"  # Out of nodes or time, self.moves is the best partial plan.
+    CANCELLED = "cancelled"  # Stopped by the progress callback, self.moves is the best partial plan.
+
 
 class GameSolution:
-    MAX_DEPTH: int = 10
+    DEPTH_STEP: int = 4
+    MAX_NODES: int = 200000
     Tube = List[int]
     MotherTube = List[Tube]
     Move = List[List[int]]
-    NodeState = Tuple[MotherTube, Tuple[int, int], Move]
-    NColorInTube=2
-    NEmptyTubes=1
-    NColor=3
+    NodeState = Tuple[packed.Board, Tuple[int, int], packed.Path]
     """
         A class for solving the Water Sort game and finding solutions(normal, optimal).
 
+        The board settings (NColor, NColorInTube, NEmptyTubes) belong to each instance. They are taken from
+        the game when one is given, from the explicit arguments otherwise, and anything still missing is
+        inferred from the first board passed to a solve method.
+
+        Every solve runs under a node budget and an optional deadline. When the budget runs out the search
+        stops with status BUDGET_EXHAUSTED, and moves/own_state hold the best partial plan found so far:
+        the one reaching the board with the lowest heuristic estimate, the shortest such plan on ties.
+
         Attributes:
             ws_game (Game): An instance of the Water Sort game which implemented in game.py file.
+            NColor (int): The number of unique colors on the board.
+            NColorInTube (int): The capacity of a tube, which is also the number of units of each color.
+            NEmptyTubes (int): The number of initially empty tubes.
+            max_nodes (int): The maximum number of states a single solve may expand before giving up.
+            time_limit (float): The maximum number of seconds a single solve may run, None for no limit.
+            progress_callback (Callable[[GameSolution], bool]): Called every 256 expansions with the solver,
+                returning True cancels the search.
+            symmetry (str): Which equivalent boards share a closed-set entry: None (exact boards only),
+                "tubes" (boards equal up to tube order) or "colors" (also up to color names).
+            prune_deadlocks (bool): Drop generated boards a DeadlockDetector proves dead, see deadlock.py.
+            expansion_hook (Callable[[GameSolution, Board, int, int], None]): Called with the solver, the board,
+                its g-value and its h-value at every expansion, None for no hook.
+            profile (bool): Time move generation, heuristic and queue operations and measure the peak memory
+                of every solve into stats. This slows the search down.
+            trace (bool): Record every expansion into stats, for SolverStats.dump_trace.
             moves (List[Tuple[int, int]]): A list of tuples representing moves between source and destination tubes.
             solution_found (bool): True if a solution is found, False otherwise.
+            status (SolveStatus): The outcome of the last solve, None before the first one.
+            own_state (List[List[int]]): The board reached by playing moves.
+            nodes_expanded (int): The number of states expanded by the running or last solve.
+            frontier_size (int): The number of states waiting to be expanded (the stack depth for the DFS modes).
+            deadlocks_pruned (int): The number of generated states dropped as dead by the running or last solve.
+            stats (SolverStats): The statistics of the running or last solve, see solver_stats.py.
 
         Methods:
             solve(self, current_state):
@@ -30,165 +71,589 @@ class GameSolution:
             optimal_solve(self, current_state):
                 Find an optimal solution to the Water Sort game from the current state.
                 After finding solution, please set (self.solution_found) to True and fill (self.moves) list.
+
+            ida_solve(self, current_state):
+                Find an optimal solution with iterative-deepening A*, using memory linear in the solution depth.
+
+            bidirectional_solve(self, current_state):
+                Find an optimal solution with breadth-first searches from the board and from the solved board.
+
+            All of them also accept deadline (a time.monotonic() timestamp) and max_nodes, overriding the
+            budget given to the constructor for that call.
     """
-    def __init__(self):
+    def __init__(self, game=None, n_color: Optional[int] = None, n_color_in_tube: Optional[int] = None,
+                 n_empty_tubes: Optional[int] = None, max_nodes: int = MAX_NODES, symmetry: Optional[str] = "tubes",
+                 time_limit: Optional[float] = None, progress_callback: Optional[Callable] = None,
+                 prune_deadlocks: bool = True, expansion_hook: Optional[Callable] = None, profile: bool = False,
+                 trace: bool = False):
         """
             Initialize a GameSolution instance.
             Args:
-                game (Game): An instance of the Water Sort game.
+                game (Game): An instance of the Water Sort game, used to read the board settings.
+                n_color (int): The number of unique colors, overrides the game setting.
+                n_color_in_tube (int): The capacity of a tube, overrides the game setting.
+                n_empty_tubes (int): The number of empty tubes, overrides the game setting.
+                max_nodes (int): The maximum number of states a single solve may expand.
+                symmetry (str): None, "tubes" or "colors", see the class documentation.
+                time_limit (float): The maximum number of seconds a single solve may run, None for no limit.
+                progress_callback (Callable[[GameSolution], bool]): Called periodically during a solve,
+                    returning True cancels it.
+                prune_deadlocks (bool): Drop generated boards that are proven dead.
+                expansion_hook (Callable[[GameSolution, Board, int, int], None]): Called at every expansion.
+                profile (bool): Collect timings and the peak memory into stats.
+                trace (bool): Record every expansion into stats.
         """
-        # self.ws_game = game  # An instance of the Water Sort game.
+        if symmetry not in (None, "tubes", "colors"):
+            raise ValueError(f"unknown symmetry: {symmetry}")
+        self.ws_game = game  # An instance of the Water Sort game.
+        self.NColor = n_color if n_color is not None else getattr(game, "NColor", None)
+        self.NColorInTube = n_color_in_tube if n_color_in_tube is not None else getattr(game, "NColorInTube", None)
+        self.NEmptyTubes = n_empty_tubes if n_empty_tubes is not None else getattr(game, "NEmptyTubes", None)
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.progress_callback = progress_callback
+        self.symmetry = symmetry
+        self.prune_deadlocks = prune_deadlocks
+        self.expansion_hook = expansion_hook
+        self.profile = profile
+        self.trace = trace
+        self.max_depth = 0  # Last depth limit used by solve.
         self.moves = []  # A list of tuples representing moves between source and destination tubes.
-        self.tube_numbers = GameSolution.NEmptyTubes + GameSolution.NColor  # Number of tubes in the game.
+        self.tube_numbers = 0  # Number of tubes in the game, known once a board is given.
         self.solution_found = False  # True if a solution is found, False otherwise.
-        self.visited_tubes = set()  # A set of visited tubes.
+        self.status: Optional[SolveStatus] = None  # The outcome of the last solve.
+        self.visited_tubes: Dict[packed.Board, int] = {}  # Best known g-value of every state key seen.
         self.own_state = []
+        self.nodes_expanded = 0  # Number of states expanded by the last solve.
+        self.duplicates_pruned = 0  # Number of generated or popped states discarded as already seen.
+        self.peak_nodes_stored = 0  # Largest number of boards held in memory at once by the last solve.
+        self.frontier_size = 0  # Number of states waiting to be expanded.
+        self.deadlocks_pruned = 0  # Number of generated states dropped as dead.
+        self.stats = SolverStats()  # Statistics of the last solve.
+        self.__deadlocks: Optional[DeadlockDetector] = None  # Kept between solves, with what it learned.
+        self.__node_budget = max_nodes
+        self.__deadline: Optional[float] = None
+        self.__best_rank: Tuple[int, int] = (0, 0)  # (h, g) of the best board reached so far.
+        self.__best_state: Optional[packed.Board] = None
+        self.__best_moves: List[List[int]] = []
+        # Move generation and heuristic of the running solve, wrapped by the stats in profile mode.
+        self.__legal_moves = move_gen.legal_moves
+        self.__reverse_moves = move_gen.reverse_moves
+        self.__heuristic: heuristics.Heuristic = heuristics.consolidate
 
-    def __is_tube_completed(self, tube: Tube) -> bool:
-        result = False
-        if len(tube) == GameSolution.NColorInTube:
-            tmp_set = set(tube)
-            if len(tmp_set) == 1:
-                result = True
-        return result
-
-    def __find_sources(self, tubes: MotherTube) -> List[int]:
-        MIN_TUBE_LEN: int = 0
-        sources: List[int] = []
-        for i in range(len(tubes)):
-            if len(tubes[i]) != MIN_TUBE_LEN and not self.__is_tube_completed(tubes[i]):
-                sources.append(i)
-        return sources
-
-    def __find_destinations(self, tubes: MotherTube) -> List[int]:
-        destinations: List[int] = []
-        for i in range(len(tubes)):
-            if len(tubes[i]) != GameSolution.NColorInTube:
-                destinations.append(i)
-        return destinations
+    def __configure(self, tubes: packed.Board) -> None:
+        """Fill in the board settings that were neither given nor read from the game."""
+        counts = Counter(unit for tube in tubes for unit in tube)
+        if self.NColor is None:
+            self.NColor = len(counts)
+        if self.NColorInTube is None:
+            self.NColorInTube = max(counts.values()) if counts else 0
+        if self.NEmptyTubes is None:
+            self.NEmptyTubes = len(tubes) - self.NColor
+        self.tube_numbers = len(tubes)
 
-    @staticmethod
-    def __move_from_src_to_dst(tubes: MotherTube, src: int, dst: int) -> None:
-        tubes[dst].append(tubes[src][-1])
-        tubes[src].pop()
-
-    def __check_win(self, tubes: MotherTube) -> bool:
-        result = True
-        if len(tubes) == 0:
-            result = False
-        else:
-            for tube in tubes:
-                if len(tube) != 0 and len(tube) != GameSolution.NColorInTube:
-                    result = False
-                    break
-                tmp_set = set(tube)
-                if len(tmp_set) > 1:
-                    result = False
-                    break
-        return result
-
-    def solve(self, current_state: MotherTube, moves: List[List[int]] = [], depth: int = MAX_DEPTH) -> bool:
+    def __begin(self, method: str, current_state: MotherTube, deadline: Optional[float], max_nodes: Optional[int],
+                start_h: heuristics.Heuristic) -> packed.Board:
+        """Pack the board, reset the results and statistics of the previous solve and arm the budget."""
+        own_current_state = packed.pack(current_state)
+        self.__configure(own_current_state)
+        self.stats = SolverStats(method, self.profile, self.trace)
+        self.stats.start()
+        self.__legal_moves = self.stats.timed("moves", move_gen.legal_moves)
+        self.__reverse_moves = self.stats.timed("moves", move_gen.reverse_moves)
+        self.__heuristic = self.stats.timed("heuristic", start_h)
+        self.solution_found = False
+        self.status = None
+        self.moves = []
+        self.own_state = packed.unpack(own_current_state)
+        self.visited_tubes = {}
+        self.nodes_expanded = 0
+        self.duplicates_pruned = 0
+        self.peak_nodes_stored = 0
+        self.frontier_size = 0
+        self.deadlocks_pruned = 0
+        if not self.prune_deadlocks:
+            self.__deadlocks = None
+        elif self.__deadlocks is None or self.__deadlocks.capacity != self.NColorInTube:
+            self.__deadlocks = DeadlockDetector(self.NColorInTube)
+        self.__node_budget = max_nodes if max_nodes is not None else self.max_nodes
+        if deadline is None and self.time_limit is not None:
+            deadline = time.monotonic() + self.time_limit
+        self.__deadline = deadline
+        self.__best_rank = (start_h(own_current_state, self.NColorInTube), 0)
+        self.__best_state = own_current_state
+        self.__best_moves = []
+        if self.__check_win(own_current_state):
+            self.__finish(SolveStatus.SOLVED, [], own_current_state)
+        return own_current_state
+
+    def __budget_status(self) -> Optional[SolveStatus]:
+        """Return the status to stop with if the search must stop before the next expansion, None otherwise."""
+        if self.nodes_expanded >= self.__node_budget:
+            return SolveStatus.BUDGET_EXHAUSTED
+        # Reading the clock and reporting progress is comparatively slow, so only do it every 256 expansions.
+        if self.nodes_expanded & 255:
+            return None
+        if self.progress_callback is not None and self.progress_callback(self):
+            return SolveStatus.CANCELLED
+        if self.__deadline is not None and time.monotonic() > self.__deadline:
+            return SolveStatus.BUDGET_EXHAUSTED
+        return None
+
+    def __expanded(self, tubes: packed.Board, g_value: int, h_value: int) -> None:
+        """Count the expansion of a board, record it in the stats and call the expansion hook."""
+        self.nodes_expanded += 1
+        self.stats.expanded(g_value, h_value, self.frontier_size)
+        if self.expansion_hook is not None:
+            self.expansion_hook(self, tubes, g_value, h_value)
+
+    def __queue(self) -> PQ:
+        """Return an empty frontier ordered by f, its operations timed by the stats in profile mode."""
+        frontier = PQ(GameSolution.__f_compare)
+        if self.profile:
+            for name in ("push_back", "pop_back", "update", "peek"):
+                setattr(frontier, name, self.stats.timed("queue", getattr(frontier, name)))
+        return frontier
+
+    def __offer_best(self, tubes: packed.Board, h_value: int, g_value: int, path) -> None:
+        """Remember the board as the best partial result if it beats the current one.
+                path is either a linked packed.Path or a list of pours, only converted when it is kept.
+        """
+        if (h_value, g_value) < self.__best_rank:
+            self.__best_rank = (h_value, g_value)
+            self.__best_state = tubes
+            if isinstance(path, list):
+                self.__best_moves = [[pour[0], pour[1]] for pour in path]
+            else:
+                self.__best_moves = packed.unwind_path(path)
+
+    def __finish(self, status: SolveStatus, moves: List[List[int]] = None, final_state: packed.Board = None) -> None:
+        """Publish the result of a solve, falling back to the best partial plan when the budget ran out."""
+        self.status = status
+        self.solution_found = status == SolveStatus.SOLVED
+        if status in (SolveStatus.BUDGET_EXHAUSTED, SolveStatus.CANCELLED):
+            moves, final_state = self.__best_moves, self.__best_state
+        if moves is not None:
+            self.moves = moves
+        if final_state is not None:
+            self.own_state = packed.unpack(final_state)
+        self.stats.finish(self)
+
+    def __state_key(self, tubes: packed.Board) -> packed.Board:
+        if self.symmetry is None:
+            return tubes
+        return packed.state_key(tubes, self.symmetry == "colors")
+
+    def __canonical(self, tubes: packed.Board) -> Tuple[packed.Board, Tuple[int, ...]]:
+        """Return the key of a board up to tube order (and color names with symmetry "colors") and the
+        order of its tubes in the key, as packed.canonical_order."""
+        named = packed.relabel_colors(tubes) if self.symmetry == "colors" else tubes
+        order = packed.canonical_order(named)
+        return tuple(named[i] for i in order), order
+
+    def __is_tube_completed(self, tube: packed.Tube) -> bool:
+        return move_gen.is_completed(tube, self.NColorInTube)
+
+    def __check_win(self, tubes: packed.Board) -> bool:
+        return len(tubes) != 0 and move_gen.is_solved(tubes, self.NColorInTube)
+
+    def __is_dead(self, tubes: packed.Board) -> bool:
+        """Return True, and count the pruning, if deadlock pruning is on and the board is proven dead."""
+        if self.__deadlocks is not None and self.__deadlocks.is_dead(tubes):
+            self.deadlocks_pruned += 1
+            return True
+        return False
+
+    def solve(self, current_state: MotherTube, depth: Optional[int] = None, deadline: Optional[float] = None,
+              max_nodes: Optional[int] = None) -> bool:
         """
             Find a solution to the Water Sort game from the current state.
 
             Args:
                 current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                depth (int): The first depth limit, twice the admissible lower bound of the board if omitted.
+                deadline (float): A time.monotonic() timestamp after which the search gives up.
+                max_nodes (int): The node budget of this call, self.max_nodes if omitted.
 
             This method attempts to find a solution to the Water Sort game by iteratively exploring
             different moves and configurations starting from the current state.
+            It runs depth-limited depth-first searches on an explicit stack, growing the limit by half
+            (at least DEPTH_STEP) until a plan is found, the whole reachable space has been explored
+            without hitting the limit, or the node/time budget runs out. Moves are applied to a single
+            mutable board and undone on backtrack. States already on the current path are skipped, and
+            so are states this iteration already reached at the same or a smaller depth.
+
+            Returns:
+                bool: True if a solution is found, see self.status for why not otherwise.
         """
-        if depth == 0:
-            return False
-        
-        while True:
-            sources = self.__find_sources(current_state)
-            destinations = self.__find_destinations(current_state)
-            for src in sources:
-                for dst in destinations:
-                    if src == dst:
-                        continue
-                    own_current_state = copy.deepcopy(current_state)
-                    GameSolution.__move_from_src_to_dst(own_current_state, src, dst)
-                    own_moves = copy.deepcopy(moves)
-                    own_moves.append([src, dst])
-                    if self.__check_win(own_current_state):
-                        self.solution_found = True
-                        self.moves = own_moves
-                        self.own_state = own_current_state
-                        return True 
-                    result = self.solve(own_current_state, own_moves, depth - 1)
-                    if result:
-                        return True
-
-            if depth == GameSolution.MAX_DEPTH:
-                depth += 4
-            else:
-                break
+        own_current_state = self.__begin("solve", current_state, deadline, max_nodes, heuristics.consolidate)
+        if self.solution_found:
+            return True
+        if depth is None:
+            depth = 2 * heuristics.consolidate(own_current_state, self.NColorInTube)
+        depth = max(depth, 1)
+        while self.status is None:
+            self.max_depth = depth
+            self.__depth_limited(own_current_state, depth)
+            depth += max(GameSolution.DEPTH_STEP, depth // 2)
+        return self.solution_found
+
+    def __ordered_moves(self, tubes: List[bytearray], last_pour: Optional[move_gen.Pour]) -> List[Tuple]:
+        """Return (h, pour) pairs, the pours leaving the lowest consolidation estimate first, joins before
+        pours into an empty tube."""
+        capacity = self.NColorInTube
+        ranked = []
+        h = self.__heuristic
+        for pour in self.__legal_moves(tubes, capacity, last_pour):
+            src, dst, count = pour
+            into_empty = not tubes[dst]
+            tubes[dst] += tubes[src][-count:]
+            del tubes[src][-count:]
+            ranked.append((h(tubes, capacity), into_empty, -count, pour))
+            tubes[src] += tubes[dst][-count:]
+            del tubes[dst][-count:]
+        self.stats.nodes_generated += len(ranked)
+        ranked.sort()
+        return [(entry[0], entry[3]) for entry in ranked]
+
+    def __depth_limited(self, start: packed.Board, limit: int) -> None:
+        """Search up to limit moves deep, setting self.status unless the search should be deepened."""
+        tubes = [bytearray(tube) for tube in start]
+        path: List[move_gen.Pour] = []
+        path_keys: List[packed.Board] = [self.__state_key(start)]
+        on_path: Set[packed.Board] = set(path_keys)
+        self.visited_tubes = {path_keys[0]: 0}
+        stack = [iter(self.__ordered_moves(tubes, None))]
+        cutoff = False
+
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                if path:
+                    src, dst, count = path.pop()
+                    tubes[src] += tubes[dst][-count:]
+                    del tubes[dst][-count:]
+                    on_path.discard(path_keys.pop())
+                continue
+            h_value, pour = entry
+            src, dst, count = pour
+            tubes[dst] += tubes[src][-count:]
+            del tubes[src][-count:]
+            child = tuple(bytes(tube) for tube in tubes)
+            if self.__check_win(child):
+                path.append(pour)
+                self.__finish(SolveStatus.SOLVED, [[move[0], move[1]] for move in path], child)
+                return
+            child_key = self.__state_key(child)
+            child_g = len(path) + 1
+            seen_g = self.visited_tubes.get(child_key)
+            expand = child_key not in on_path and (seen_g is None or child_g < seen_g)
+            if not expand:
+                self.duplicates_pruned += 1
+            elif self.__is_dead(child):
+                # Remember it, so reaching it again counts as a duplicate instead of another check.
+                self.visited_tubes[child_key] = 0
+                expand = False
+            elif child_g >= limit:
+                cutoff = True
+                expand = False
+            if not expand:
+                tubes[src] += tubes[dst][-count:]
+                del tubes[dst][-count:]
+                continue
+            self.frontier_size = len(stack)
+            stop = self.__budget_status()
+            if stop is not None:
+                self.__finish(stop)
+                return
+            self.__expanded(child, child_g, h_value)
+            self.visited_tubes[child_key] = child_g
+            path.append(pour)
+            path_keys.append(child_key)
+            on_path.add(child_key)
+            self.__offer_best(child, h_value, child_g, path)
+            stack.append(iter(self.__ordered_moves(tubes, pour)))
+        if not cutoff:
+            self.__finish(SolveStatus.UNSOLVABLE)
 
     @staticmethod
     def __f_compare(prev: NodeState, next: NodeState) -> bool:
         prev_f = prev[1][0] + prev[1][1]
         next_f = next[1][0] + next[1][1]
-        return prev_f < next_f
-
-    def __count_completed_tubes(self, tubes) -> int:
-        count = 0
-        for tube in tubes:
-            if self.__is_tube_completed(tube):
-                count += 1
-
-        return count
-
-    def __h(self, tubes: MotherTube):
-        # if ncolor is alwas 2
-        completed_tubes = self.__count_completed_tubes(tubes)
-        return len(tubes) - completed_tubes - 1
-        
-    def optimal_solve(self, current_state: MotherTube):
+        # On equal f prefer the deeper node, it is closer to a goal.
+        return prev_f < next_f or (prev_f == next_f and prev[1][0] > next[1][0])
+
+    def optimal_solve(self, current_state: MotherTube, heuristic: str = heuristics.DEFAULT,
+                      deadline: Optional[float] = None, max_nodes: Optional[int] = None):
         """
             Find an optimal solution to the Water Sort game from the current state.
 
             Args:
                 current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                heuristic (str): The name of the heuristic to use, one of heuristics.HEURISTICS.
+                    The plan is only guaranteed optimal with one of heuristics.ADMISSIBLE.
+                deadline (float): A time.monotonic() timestamp after which the search gives up.
+                max_nodes (int): The node budget of this call, self.max_nodes if omitted.
 
             This method attempts to find an optimal solution to the Water Sort game by minimizing
             the number of moves required to complete the game, starting from the current state.
         """
-        frontier: PQ = PQ(GameSolution.__f_compare)
-        own_current_state = copy.deepcopy(current_state)
-        current_h = self.__h(own_current_state)
-        if current_h == 0:
-            self.solution_found = True
+        own_current_state = self.__begin("optimal_solve", current_state, deadline, max_nodes, heuristics.get(heuristic))
+        if self.solution_found:
             return
-        tmp_node: GameSolution.NodeState = [own_current_state, [0, current_h], []]
-        frontier.push_back(tmp_node)
+        h = self.__heuristic
+        frontier: PQ = self.__queue()
+        current_h = h(own_current_state, self.NColorInTube)
+        tmp_node: GameSolution.NodeState = (own_current_state, (0, current_h), None)
+        start_key = self.__state_key(own_current_state)
+        self.visited_tubes[start_key] = 0
+        frontier.push_back(tmp_node, start_key)
 
         while not frontier.is_empty():
             closest: GameSolution.NodeState = frontier.pop_back()
-            sources: List[int] = self.__find_sources(closest[0])
-            destinations: List[int] = self.__find_destinations(closest[0])
+            closest_g = closest[1][0]
+            if self.__check_win(closest[0]):
+                self.__finish(SolveStatus.SOLVED, packed.unwind_path(closest[2]), closest[0])
+                return
+            self.frontier_size = len(frontier)
+            stop = self.__budget_status()
+            if stop is not None:
+                self.__finish(stop)
+                return
+            self.__expanded(closest[0], closest_g, closest[1][1])
+            self.peak_nodes_stored = max(self.peak_nodes_stored, len(self.visited_tubes) + len(frontier))
+            self.__offer_best(closest[0], closest[1][1], closest_g, closest[2])
+            last_pour = closest[2][1] if closest[2] is not None else None
+            for pour in self.__legal_moves(closest[0], self.NColorInTube, last_pour):
+                self.stats.nodes_generated += 1
+                own_state: packed.Board = move_gen.pour(closest[0], *pour)
+                state_key = self.__state_key(own_state)
+                best_g = self.visited_tubes.get(state_key)
+                if best_g is not None and best_g <= closest_g + 1:
+                    self.duplicates_pruned += 1
+                    continue
+                self.visited_tubes[state_key] = closest_g + 1
+                if self.__is_dead(own_state):
+                    # Its g-value stays recorded, so reaching it again is pruned as a duplicate.
+                    continue
+                h_value = h(own_state, self.NColorInTube)
+                tmp_path: packed.Path = packed.extend_path(closest[2], pour)
+                tmp_node: GameSolution.NodeState = (own_state, (closest_g + 1, h_value), tmp_path)
+                if state_key in frontier:
+                    # Cheaper path to a queued state: decrease its key in place.
+                    frontier.update(tmp_node, state_key)
+                else:
+                    # Either a new state or a cheaper path to an expanded one, which reopens it.
+                    frontier.push_back(tmp_node, state_key)
+        self.__finish(SolveStatus.UNSOLVABLE)
 
-            for src in sources:
-                for dst in destinations:
-                    if src == dst:
-                        continue
-                    own_state: GameSolution.MotherTube = copy.deepcopy(closest[0])
-                    GameSolution.__move_from_src_to_dst(own_state, src, dst)
-                    h_value = self.__h(own_state)
-                    tmp_moves: GameSolution.Move = copy.deepcopy(closest[2])
-                    tmp_moves.append([src, dst])
-                    if h_value == 0:
-                        self.solution_found = True
-                        self.moves = tmp_moves
-                        self.own_state = own_state
+    def ida_solve(self, current_state: MotherTube, heuristic: str = heuristics.DEFAULT, table_size: int = 0,
+                  deadline: Optional[float] = None, max_nodes: Optional[int] = None):
+        """
+            Find an optimal solution to the Water Sort game with iterative-deepening A*.
+
+            Args:
+                current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                heuristic (str): The name of the heuristic to use, one of heuristics.HEURISTICS.
+                    The plan is only guaranteed optimal with one of heuristics.ADMISSIBLE.
+                table_size (int): The maximum number of entries of the transposition table, 0 disables it.
+                deadline (float): A time.monotonic() timestamp after which the search gives up.
+                max_nodes (int): The node budget of this call, self.max_nodes if omitted.
+
+            A sequence of depth-first searches bounded by f = g + h, each raising the bound to the
+            smallest f that exceeded the previous one. Only the current path is kept (plus the optional
+            table), so memory grows with the solution depth instead of with the number of states.
+            States already on the path are skipped, and the table skips states reached again within
+            an iteration at a cost no lower than before.
+        """
+        own_current_state = self.__begin("ida_solve", current_state, deadline, max_nodes, heuristics.get(heuristic))
+        h = self.__heuristic
+        bound = h(own_current_state, self.NColorInTube)
+        while self.status is None:
+            bound = self.__ida_iteration(own_current_state, bound, h, table_size)
+            if bound is None and self.status is None:
+                self.__finish(SolveStatus.UNSOLVABLE)
+
+    def __ida_iteration(self, start: packed.Board, bound: int, h: heuristics.Heuristic,
+                        table_size: int) -> Optional[int]:
+        """Run one depth-first search bounded by f <= bound and return the next bound, or None to stop."""
+        capacity = self.NColorInTube
+        start_key = self.__state_key(start)
+        stack = [(start, self.__legal_moves(start, capacity))]
+        path: List[move_gen.Pour] = []
+        path_keys: List[packed.Board] = [start_key]
+        on_path: Set[packed.Board] = {start_key}
+        table: Dict[packed.Board, int] = self.visited_tubes
+        table.clear()
+        next_bound: Optional[int] = None
+
+        while stack:
+            current, children = stack[-1]
+            pour = next(children, None)
+            if pour is None:
+                stack.pop()
+                on_path.discard(path_keys.pop())
+                if path:
+                    path.pop()
+                continue
+            self.stats.nodes_generated += 1
+            child = move_gen.pour(current, *pour)
+            child_key = self.__state_key(child)
+            child_g = len(path) + 1
+            if child_key in on_path:
+                self.duplicates_pruned += 1
+                continue
+            if table_size:
+                seen_g = table.get(child_key)
+                if seen_g is not None and seen_g <= child_g:
+                    self.duplicates_pruned += 1
+                    continue
+                if seen_g is not None or len(table) < table_size:
+                    table[child_key] = child_g
+            if self.__is_dead(child):
+                continue
+            child_h = h(child, capacity)
+            f = child_g + child_h
+            if f > bound:
+                if next_bound is None or f < next_bound:
+                    next_bound = f
+                continue
+            if self.__check_win(child):
+                path.append(pour)
+                self.__finish(SolveStatus.SOLVED, [[src, dst] for src, dst, _ in path], child)
+                return None
+            self.frontier_size = len(stack)
+            stop = self.__budget_status()
+            if stop is not None:
+                self.__finish(stop)
+                return None
+            self.__expanded(child, child_g, child_h)
+            stack.append((child, self.__legal_moves(child, capacity, pour)))
+            path.append(pour)
+            path_keys.append(child_key)
+            on_path.add(child_key)
+            self.__offer_best(child, child_h, child_g, path)
+            self.peak_nodes_stored = max(self.peak_nodes_stored, len(stack) + len(table))
+        return next_bound
+
+    def bidirectional_solve(self, current_state: MotherTube, deadline: Optional[float] = None,
+                            max_nodes: Optional[int] = None):
+        """
+            Find an optimal solution with a search from the board that meets a search from the solved board.
+
+            Args:
+                current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                deadline (float): A time.monotonic() timestamp after which the search gives up.
+                max_nodes (int): The node budget of this call, self.max_nodes if omitted.
+
+            The forward side is A* with the consolidate heuristic, the backward side a breadth-first search
+            over reverse pours (moves.reverse_moves). Both key states up to tube order, under which the whole
+            family of solved boards collapses to a single goal (symmetry None is treated like "tubes"). The
+            backward side expands its next layer whenever it is smaller than the forward frontier, and every
+            state generated by one side is looked up in the other to find meetings.
+
+            The cheapest meeting is optimal once no cheaper plan can remain: either the lowest f on the forward
+            frontier reaches its cost, or it is no more than the backward depth, in which case the backward side
+            would have reached the board itself.
+        """
+        own_current_state = self.__begin("bidirectional_solve", current_state, deadline, max_nodes,
+                                         heuristics.consolidate)
+        if self.solution_found:
+            return
+        h = self.__heuristic
+        capacity = self.NColorInTube
+        counts = Counter(unit for tube in own_current_state for unit in tube)
+        if any(count % capacity for count in counts.values()):
+            self.__finish(SolveStatus.UNSOLVABLE)
+            return
+        goal = tuple(bytes([color]) * capacity for color in sorted(counts) for _ in range(counts[color] // capacity))
+        goal += (b"",) * (len(own_current_state) - len(goal))
+
+        # Both sides map a state key to (board, path, depth). Forward paths lead from the start to the board,
+        # backward paths from the board to the goal, linked from the goal end.
+        start_key = self.__canonical(own_current_state)[0]
+        forward: Dict[packed.Board, Tuple] = {start_key: (own_current_state, None, 0)}
+        frontier: PQ = self.__queue()
+        frontier.push_back((own_current_state, (0, h(own_current_state, capacity)), None), start_key)
+        goal_key = self.__canonical(goal)[0]
+        backward: Dict[packed.Board, Tuple] = {goal_key: (goal, None, 0)}
+        backward_layer = [goal_key]
+        backward_depth = 0
+        meeting: Optional[Tuple[int, packed.Board]] = None  # (plan length, state key)
+
+        while not frontier.is_empty() and backward_layer:
+            lowest = frontier.peek()
+            if meeting is not None and meeting[0] <= max(lowest[1][0] + lowest[1][1], backward_depth + 1):
+                break
+            self.frontier_size = len(frontier) + len(backward_layer)
+            if len(backward_layer) < len(frontier):
+                next_layer = []
+                for key in backward_layer:
+                    stop = self.__budget_status()
+                    if stop is not None:
+                        self.__finish(stop)
                         return
-                    tmp_node: GameSolution.NodeState = [own_state, [closest[1][0] + 1, h_value], tmp_moves]
-                    node_i = frontier.find(tmp_node)
-                    if node_i != -1:
-                        tmp_node_f = tmp_node[1][0] + tmp_node[1][1]
-                        existed_node = frontier[node_i]
-                        f_of_node_i = existed_node[1][0] + existed_node[1][1]
-                        if tmp_node_f < f_of_node_i:
-                            frontier.pop_back(node_i)
-
-                    frontier.push_back(tmp_node)
+                    board, path, _ = backward[key]
+                    self.__expanded(board, backward_depth, 0)
+                    for src, dst, count in self.__reverse_moves(board, capacity):
+                        self.stats.nodes_generated += 1
+                        parent = move_gen.pour(board, dst, src, count)
+                        parent_key = self.__canonical(parent)[0]
+                        if parent_key in backward:
+                            self.duplicates_pruned += 1
+                            continue
+                        backward[parent_key] = (parent, packed.extend_path(path, (src, dst)), backward_depth + 1)
+                        next_layer.append(parent_key)
+                        if parent_key in forward:
+                            cost = forward[parent_key][2] + backward_depth + 1
+                            if meeting is None or cost < meeting[0]:
+                                meeting = (cost, parent_key)
+                backward_layer = next_layer
+                backward_depth += 1
+            else:
+                stop = self.__budget_status()
+                if stop is not None:
+                    self.__finish(stop)
+                    return
+                board, (g_value, h_value), path = frontier.pop_back()
+                self.__expanded(board, g_value, h_value)
+                self.__offer_best(board, h_value, g_value, path)
+                last_pour = path[1] if path is not None else None
+                for pour in self.__legal_moves(board, capacity, last_pour):
+                    self.stats.nodes_generated += 1
+                    child = move_gen.pour(board, *pour)
+                    child_key = self.__canonical(child)[0]
+                    known = forward.get(child_key)
+                    if known is not None and known[2] <= g_value + 1:
+                        self.duplicates_pruned += 1
+                        continue
+                    child_path = packed.extend_path(path, pour)
+                    forward[child_key] = (child, child_path, g_value + 1)
+                    node = (child, (g_value + 1, h(child, capacity)), child_path)
+                    if child_key in frontier:
+                        frontier.update(node, child_key)
+                    else:
+                        frontier.push_back(node, child_key)
+                    if child_key in backward:
+                        cost = g_value + 1 + backward[child_key][2]
+                        if meeting is None or cost < meeting[0]:
+                            meeting = (cost, child_key)
+            self.peak_nodes_stored = max(self.peak_nodes_stored, len(forward) + len(backward))
+
+        if meeting is None:
+            # One side ran out of states without ever reaching the other.
+            self.__finish(SolveStatus.UNSOLVABLE)
+            return
+        forward_board, forward_path, _ = forward[meeting[1]]
+        backward_board, backward_path, _ = backward[meeting[1]]
+        # The backward moves refer to the tubes of the backward side's copy of the meeting state:
+        # carry them over to the forward copy through the canonical order of both.
+        forward_order = self.__canonical(forward_board)[1]
+        backward_order = self.__canonical(backward_board)[1]
+        tube_of = [0] * len(backward_order)
+        for index, tube in enumerate(backward_order):
+            tube_of[tube] = forward_order[index]
+        moves = packed.unwind_path(forward_path)
+        moves.extend([tube_of[src], tube_of[dst]] for src, dst in reversed(packed.unwind_path(backward_path)))
+        self.__finish(SolveStatus.SOLVED, moves, move_gen.replay(own_current_state, moves, capacity))
@@ -0,0 +1,162 @@
+"""
+    Solve many boards in one process or in a pool of worker processes.
+
+    Input is JSONL: every line is either a board (a list of tubes) or an object with a "tubes" list and
+    an optional "id" (the line number otherwise). Output is JSONL as well, one line per board, written
+    as soon as it is solved:
+        {"id": 0, "status": "solved", "moves": [[0, 3], ...], "move_count": 12, "nodes_expanded": 340, "time": 0.0123}
+
+    A line that cannot be parsed or holds an invalid board gets a result with status "error" and an "error"
+    message instead of stopping the stream.
+
+    Usage:
+        python batch.py boards.jsonl -o solutions.jsonl --method optimal_solve --workers 8
+        python batch.py --random 100 --colors 3 --capacity 2 --empty 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import get_context
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import heuristics
+from ai_solution import GameSolution
+from level_generator import deal
+
+METHODS = ("solve", "optimal_solve", "ida_solve")
+Job = Tuple[Dict, str, Dict, Dict]
+
+
+def _is_board(tubes) -> bool:
+    return isinstance(tubes, list) and all(
+        isinstance(tube, list) and all(type(unit) is int and 0 <= unit < 255 for unit in tube) for tube in tubes)
+
+
+def read_boards(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+        Parse JSONL boards into {"id", "tubes"} records, skipping blank lines. A line that is not a board
+        becomes an {"id", "error"} record, which solve_record turns into an error result.
+    """
+    for number, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield {"id": number, "error": f"line {number + 1}: {error}"}
+            continue
+        if isinstance(record, list):
+            record = {"tubes": record}
+        if not isinstance(record, dict) or not _is_board(record.get("tubes")):
+            yield {"id": record.get("id", number) if isinstance(record, dict) else number,
+                   "error": f"line {number + 1}: expected a list of tubes of colors 0 to 254 or an object with "
+                            f"such a \"tubes\" list"}
+            continue
+        yield {"id": record.get("id", number), "tubes": record["tubes"]}
+
+
+def error_result(record_id, message: str) -> Dict:
+    """Return the result of a record that could not be solved."""
+    return {"id": record_id, "status": "error", "error": message, "moves": [], "move_count": 0,
+            "nodes_expanded": 0, "time": 0.0}
+
+
+def solve_record(job: Job) -> Dict:
+    """Solve one record with a fresh GameSolution, so boards with different settings can be mixed."""
+    record, method, options, settings = job
+    if "error" in record:
+        return error_result(record["id"], record["error"])
+    try:
+        solver = GameSolution(**settings)
+        start = time.perf_counter()
+        getattr(solver, method)(record["tubes"], **options)
+    except (TypeError, ValueError, IndexError) as error:
+        return error_result(record["id"], f"invalid board: {error}")
+    elapsed = time.perf_counter() - start
+    return {"id": record["id"], "status": solver.status.value, "moves": solver.moves,
+            "move_count": len(solver.moves), "nodes_expanded": solver.nodes_expanded, "time": round(elapsed, 6)}
+
+
+def solve_boards(records: Iterable[Dict], method: str = "solve", options: Optional[Dict] = None, workers: int = 1,
+                 ordered: bool = True, **settings) -> Iterator[Dict]:
+    """
+        Solve every record and yield the results as they become available.
+
+        Args:
+            records (Iterable[dict]): {"id", "tubes"} records, e.g. from read_boards, or {"id", "error"} ones.
+            method (str): The GameSolution method to run, one of METHODS.
+            options (dict): Keyword arguments for the method, e.g. heuristic or table_size.
+            workers (int): The number of processes, 1 solves in the calling process.
+            ordered (bool): Yield the results in input order, instead of in completion order.
+            settings: Keyword arguments for GameSolution, e.g. max_nodes or time_limit.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}, expected one of {METHODS}")
+    jobs = ((record, method, dict(options or {}), settings) for record in records)
+    if workers <= 1:
+        yield from map(solve_record, jobs)
+        return
+    with get_context("spawn").Pool(workers) as pool:
+        # Solve times vary a lot between boards, so hand them out one at a time.
+        results = pool.imap(solve_record, jobs) if ordered else pool.imap_unordered(solve_record, jobs)
+        yield from results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-", help="JSONL boards, - for standard input")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results, - for standard output")
+    parser.add_argument("--method", choices=METHODS, default="solve")
+    parser.add_argument("--heuristic", choices=sorted(heuristics.HEURISTICS), default=None,
+                        help="heuristic of optimal_solve and ida_solve")
+    parser.add_argument("--table-size", type=int, default=None, help="transposition table entries of ida_solve")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--unordered", action="store_true", help="write results in completion order")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per board")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per board")
+    parser.add_argument("--symmetry", choices=("none", "tubes", "colors"), default="tubes")
+    parser.add_argument("--random", type=int, default=None, metavar="COUNT",
+                        help="solve COUNT random boards instead of reading input")
+    parser.add_argument("--colors", type=int, default=3, help="colors of the random boards")
+    parser.add_argument("--capacity", type=int, default=2, help="tube capacity of the random boards")
+    parser.add_argument("--empty", type=int, default=1, help="empty tubes of the random boards")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random boards")
+    args = parser.parse_args()
+
+    options = {}
+    if args.heuristic is not None:
+        if args.method == "solve":
+            parser.error("--heuristic needs --method optimal_solve or ida_solve")
+        options["heuristic"] = args.heuristic
+    if args.table_size is not None:
+        if args.method != "ida_solve":
+            parser.error("--table-size needs --method ida_solve")
+        options["table_size"] = args.table_size
+    settings = {"max_nodes": args.max_nodes, "time_limit": args.time_limit,
+                "symmetry": None if args.symmetry == "none" else args.symmetry}
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        if args.random is not None:
+            rng = random.Random(args.seed)
+            records = ({"id": i, "tubes": deal(args.colors, args.capacity, args.empty, rng)}
+                       for i in range(args.random))
+        else:
+            records = read_boards(source)
+        for result in solve_boards(records, args.method, options, args.workers, not args.unordered, **settings):
+            sink.write(json.dumps(result) + "\n")
+            sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
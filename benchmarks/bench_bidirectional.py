@@ -0,0 +1,47 @@
+"""Node expansions, stored states and wall time of bidirectional_solve against A* (optimal_solve).
+
+Run from the repository root:
+    python -m benchmarks.bench_bidirectional --count 10
+"""
+import argparse
+import time
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(4, 4, 2), (5, 4, 2), (6, 4, 2), (7, 4, 2), (8, 4, 2)]
+VARIANTS = [
+    ("A* completed", "optimal_solve", {"heuristic": "completed"}),
+    ("A* consolidate", "optimal_solve", {}),
+    ("bidirectional", "bidirectional_solve", {}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'variant':>15} {'solved':>7} {'moves':>7} {'expanded':>9} {'stored':>8} {'time(s)':>9}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        for label, method, options in VARIANTS:
+            solved = moves = expanded = stored = 0
+            elapsed = 0.0
+            for tubes in boards:
+                solver = GameSolution(max_nodes=args.max_nodes)
+                start = time.perf_counter()
+                getattr(solver, method)(tubes, **options)
+                elapsed += time.perf_counter() - start
+                solved += solver.solution_found
+                moves += len(solver.moves)
+                expanded += solver.nodes_expanded
+                stored = max(stored, solver.peak_nodes_stored)
+            print(f"{str(config):>12} {label:>15} {solved:>3}/{args.count:<3} {moves / max(solved, 1):>7.2f} "
+                  f"{expanded // args.count:>9} {stored:>8} {elapsed / args.count:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
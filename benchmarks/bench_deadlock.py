@@ -0,0 +1,45 @@
+"""Node expansions, pruned dead states and wall time of every solver with and without deadlock pruning.
+
+Run from the repository root:
+    python -m benchmarks.bench_deadlock --count 10
+"""
+import argparse
+import time
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+# A single empty tube leaves little room, which is where dead boards are common.
+CONFIGS = [(4, 4, 1), (5, 4, 1), (6, 3, 1), (5, 4, 2), (6, 4, 2)]
+METHODS = ("solve", "optimal_solve", "ida_solve")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'method':>14} {'pruning':>8} {'decided':>8} {'expanded':>9} {'pruned':>8} {'time(s)':>9}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        for method in METHODS:
+            for prune in (False, True):
+                decided = expanded = pruned = 0
+                elapsed = 0.0
+                for tubes in boards:
+                    solver = GameSolution(max_nodes=args.max_nodes, prune_deadlocks=prune)
+                    start = time.perf_counter()
+                    getattr(solver, method)(tubes)
+                    elapsed += time.perf_counter() - start
+                    # Solved or proven unsolvable, as opposed to out of budget.
+                    decided += solver.status.value in ("solved", "proven-unsolvable")
+                    expanded += solver.nodes_expanded
+                    pruned += solver.deadlocks_pruned
+                print(f"{str(config):>12} {method:>14} {'on' if prune else 'off':>8} {decided:>3}/{args.count:<4} "
+                      f"{expanded // args.count:>9} {pruned // args.count:>8} {elapsed / args.count:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
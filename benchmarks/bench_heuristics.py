@@ -0,0 +1,43 @@
+"""Node expansions and wall time of optimal_solve for every registered heuristic.
+
+Run from the repository root:
+    python -m benchmarks.bench_heuristics --count 10
+"""
+import argparse
+import time
+
+import heuristics
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(4, 4, 2), (5, 4, 2), (6, 4, 2), (7, 4, 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--heuristics", nargs="*", default=sorted(heuristics.HEURISTICS))
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'heuristic':>12} {'admissible':>10} {'solved':>7} {'moves':>7} {'expanded':>9} {'time(s)':>9}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        for name in args.heuristics:
+            solved = moves = expanded = 0
+            elapsed = 0.0
+            for tubes in boards:
+                solver = GameSolution(max_nodes=args.max_nodes)
+                start = time.perf_counter()
+                solver.optimal_solve(tubes, heuristic=name)
+                elapsed += time.perf_counter() - start
+                solved += solver.solution_found
+                moves += len(solver.moves)
+                expanded += solver.nodes_expanded
+            print(f"{str(config):>12} {name:>12} {str(name in heuristics.ADMISSIBLE):>10} {solved:>3}/{args.count:<3} "
+                  f"{moves / max(solved, 1):>7.2f} {expanded // args.count:>9} {elapsed / args.count:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Memory and time of A* (optimal_solve) against IDA* (ida_solve) with and without a transposition table.
+
+Every solve runs under --time-limit. The averages and the peak memory only cover the solved boards, the
+solves that ran out of nodes or time are counted in the "budget" column.
+
+Run from the repository root:
+    python -m benchmarks.bench_ida --count 5
+"""
+import argparse
+import time
+import tracemalloc
+
+from ai_solution import GameSolution, SolveStatus
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(6, 4, 2), (8, 8, 2), (12, 12, 3), (15, 20, 3)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--time-limit", type=float, default=5.0, help="seconds per solve")
+    parser.add_argument("--table-size", type=int, default=100000, help="transposition table entries for IDA*+TT")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    variants = [
+        ("A*", "optimal_solve", {}),
+        ("IDA*", "ida_solve", {}),
+        ("IDA*+TT", "ida_solve", {"table_size": args.table_size}),
+    ]
+    print(f"{'config':>12} {'variant':>8} {'solved':>7} {'budget':>6} {'moves':>7} {'expanded':>9} {'stored':>8} "
+          f"{'peak(MB)':>9} {'time(s)':>9}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        for label, method, options in variants:
+            solved = exhausted = moves = expanded = stored = 0
+            peak = elapsed = 0.0
+            for tubes in boards:
+                solver = GameSolution(max_nodes=args.max_nodes, time_limit=args.time_limit)
+                start = time.perf_counter()
+                getattr(solver, method)(tubes, **options)
+                seconds = time.perf_counter() - start
+                if solver.status != SolveStatus.SOLVED:
+                    exhausted += solver.status == SolveStatus.BUDGET_EXHAUSTED
+                    continue
+                # Measure memory in a second, traced run so the timing above is not skewed. The search is
+                # deterministic, so the same node budget repeats it exactly however slow tracing makes it.
+                traced = GameSolution(max_nodes=solver.nodes_expanded + 1)
+                tracemalloc.start()
+                getattr(traced, method)(tubes, **options)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                solved += 1
+                elapsed += seconds
+                moves += len(solver.moves)
+                expanded += solver.nodes_expanded
+                stored = max(stored, solver.peak_nodes_stored)
+            average = max(solved, 1)
+            print(f"{str(config):>12} {label:>8} {solved:>3}/{args.count:<3} {exhausted:>6} {moves / average:>7.1f} "
+                  f"{expanded // average:>9} {stored:>8} {peak / 2 ** 20:>9.2f} {elapsed / average:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Expansion throughput (nodes/sec) of the pure Python path and of the NumPy backend on the same frontiers.
+
+Needs numpy. Run from the repository root:
+    python -m benchmarks.bench_numpy_backend --count 2000
+"""
+import argparse
+import random
+import time
+
+import board as packed
+import heuristics
+import moves as move_gen
+import numpy_backend
+from level_generator import random_board
+
+CONFIGS = [(5, 4, 2), (8, 4, 2), (12, 4, 2), (12, 8, 3)]
+BATCHES = [64, 512, 4096]
+
+
+def frontier(config, count, rng):
+    """Return count (board, last pour) nodes, the layers of breadth first searches from random boards."""
+    nodes = []
+    while len(nodes) < count:
+        layer = [(packed.pack(random_board(*config, rng)), None)]
+        while layer and len(nodes) < count:
+            nodes.extend(layer[:count - len(nodes)])
+            layer = [(move_gen.pour(board, *pour), pour) for board, last in layer
+                     for pour in move_gen.legal_moves(board, config[1], last)][:count]
+    return nodes
+
+
+def python_expand(nodes, capacity):
+    result = []
+    for board, last in nodes:
+        children = []
+        for pour in move_gen.legal_moves(board, capacity, last):
+            child = move_gen.pour(board, *pour)
+            children.append((pour, child, heuristics.consolidate(child, capacity)))
+        result.append(children)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="frontier nodes per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'config':>12} {'backend':>14} {'nodes/s':>10} {'children/s':>11}")
+    for config in CONFIGS:
+        nodes = frontier(config, args.count, rng)
+        start = time.perf_counter()
+        expected = python_expand(nodes, config[1])
+        elapsed = time.perf_counter() - start
+        children = sum(map(len, expected))
+        print(f"{str(config):>12} {'python':>14} {len(nodes) / elapsed:>10.0f} {children / elapsed:>11.0f}")
+        for batch in BATCHES:
+            start = time.perf_counter()
+            result = []
+            for offset in range(0, len(nodes), batch):
+                chunk = nodes[offset:offset + batch]
+                result.extend(numpy_backend.expand([board for board, _ in chunk], config[1],
+                                                   [last for _, last in chunk]))
+            elapsed = time.perf_counter() - start
+            if result != expected:
+                raise AssertionError(f"NumPy backend disagrees with the Python path on {config}")
+            print(f"{str(config):>12} {f'numpy/{batch}':>14} {len(nodes) / elapsed:>10.0f} {children / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Scaling of hash-distributed A* (hda_solve) and of the portfolio over 1, 2, 4 and 8 worker processes.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel --count 3
+"""
+import argparse
+import os
+import time
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+from parallel import ParallelSolution
+
+CONFIGS = [(10, 4, 2), (12, 8, 3), (15, 20, 3)]
+WORKERS = [1, 2, 4, 8]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=3, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--batch", type=int, default=ParallelSolution.BATCH, help="HDA* expansions per superstep")
+    parser.add_argument("--workers", type=int, nargs="*", default=WORKERS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores available")
+    print(f"{'config':>12} {'variant':>10} {'workers':>7} {'solved':>7} {'moves':>7} {'expanded':>9} "
+          f"{'balance':>7} {'time(s)':>9} {'speedup':>7}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        serial = 0.0
+        for tubes in boards:
+            solver = GameSolution(max_nodes=args.max_nodes)
+            start = time.perf_counter()
+            solver.optimal_solve(tubes)
+            serial += time.perf_counter() - start
+        print(f"{str(config):>12} {'A*':>10} {1:>7} {'':>7} {'':>7} {'':>9} {'':>7} {serial / args.count:>9.3f} {1:>7.2f}")
+        for label in ("hda", "portfolio"):
+            for workers in args.workers:
+                solved = moves = expanded = 0
+                elapsed = balance = 0.0
+                for tubes in boards:
+                    solver = ParallelSolution(workers=workers, max_nodes=args.max_nodes)
+                    start = time.perf_counter()
+                    if label == "hda":
+                        solver.hda_solve(tubes, batch=args.batch)
+                        # Largest worker share relative to an even split, 1.0 is a perfect balance.
+                        balance += max(solver.worker_nodes) * workers / max(solver.nodes_expanded, 1)
+                    else:
+                        solver.portfolio_solve(tubes)
+                    elapsed += time.perf_counter() - start
+                    solved += solver.solution_found
+                    moves += len(solver.moves)
+                    expanded += solver.nodes_expanded
+                print(f"{str(config):>12} {label:>10} {workers:>7} {solved:>3}/{args.count:<3} "
+                      f"{moves / max(solved, 1):>7.1f} {expanded // args.count:>9} "
+                      f"{f'{balance / args.count:.2f}' if label == 'hda' else '-':>7} "
+                      f"{elapsed / args.count:>9.3f} {serial / max(elapsed, 1e-9):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
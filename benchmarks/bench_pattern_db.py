@@ -0,0 +1,59 @@
+"""Node expansions and wall time of optimal_solve with a pattern database against consolidate.
+
+The databases are built into a temporary directory first, and their build time and size reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_pattern_db --count 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pattern_db
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(4, 4, 2), (5, 4, 2), (6, 4, 2), (7, 4, 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--group", type=int, default=1, help="number of colors kept by an abstraction")
+    parser.add_argument("--mode", choices=("additive", "max"), default="additive")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'config':>12} {'records':>8} {'bytes':>9} {'build(s)':>9}")
+        for config in CONFIGS:
+            start = time.perf_counter()
+            path = os.path.join(directory, "{}-{}-{}.pdb".format(*config))
+            pattern_db.build(config, args.group, args.mode == "additive", path)
+            elapsed = time.perf_counter() - start
+            database = pattern_db.PatternDatabase(path)
+            pattern_db.install(database)
+            print(f"{str(config):>12} {database.records:>8} {os.path.getsize(path):>9} {elapsed:>9.2f}")
+
+        print(f"\n{'config':>12} {'heuristic':>12} {'solved':>7} {'moves':>7} {'expanded':>9} {'time(s)':>9}")
+        for config in CONFIGS:
+            boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+            for name in ("consolidate", "pdb"):
+                solved = moves = expanded = 0
+                elapsed = 0.0
+                for tubes in boards:
+                    solver = GameSolution(max_nodes=args.max_nodes)
+                    start = time.perf_counter()
+                    solver.optimal_solve(tubes, heuristic=name)
+                    elapsed += time.perf_counter() - start
+                    solved += solver.solution_found
+                    moves += len(solver.moves)
+                    expanded += solver.nodes_expanded
+                print(f"{str(config):>12} {name:>12} {solved:>3}/{args.count:<3} {moves / max(solved, 1):>7.2f} "
+                      f"{expanded // args.count:>9} {elapsed / args.count:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
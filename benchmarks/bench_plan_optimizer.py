@@ -0,0 +1,54 @@
+"""Plan lengths and wall time of plan_optimizer on solve plans, against optimal_solve.
+
+Run from the repository root:
+    python -m benchmarks.bench_plan_optimizer --count 10
+"""
+import argparse
+import time
+
+import plan_optimizer
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(5, 4, 2), (6, 4, 2), (8, 4, 2), (10, 4, 2), (12, 4, 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=6, help="moves every local search tries to shorten")
+    parser.add_argument("--window-nodes", type=int, default=300, help="expansion budget of every local search")
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'boards':>7} {'solve':>7} {'shortened':>10} {'optimal':>8} "
+          f"{'shorten(s)':>11} {'optimal(s)':>11}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        compared = solve_moves = short_moves = optimal_moves = 0
+        shorten_time = optimal_time = 0.0
+        for tubes in boards:
+            solver = GameSolution(max_nodes=args.max_nodes)
+            solver.solve(tubes)
+            optimal = GameSolution(max_nodes=args.max_nodes)
+            start = time.perf_counter()
+            optimal.optimal_solve(tubes)
+            elapsed = time.perf_counter() - start
+            if not (solver.solution_found and optimal.solution_found):
+                continue
+            start = time.perf_counter()
+            plan = plan_optimizer.optimize(tubes, solver.moves, config[1], args.window, args.window_nodes)
+            shorten_time += time.perf_counter() - start
+            optimal_time += elapsed
+            compared += 1
+            solve_moves += len(solver.moves)
+            short_moves += len(plan)
+            optimal_moves += len(optimal.moves)
+        count = max(compared, 1)
+        print(f"{str(config):>12} {compared:>7} {solve_moves / count:>7.2f} {short_moves / count:>10.2f} "
+              f"{optimal_moves / count:>8.2f} {shorten_time / count:>11.3f} {optimal_time / count:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Scaling benchmark of GameSolution across board sizes up to the limits of the game spinners.
+
+Run from the repository root:
+    python -m benchmarks.bench_scaling --count 5 --max-nodes 200000
+"""
+import argparse
+import time
+import tracemalloc
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+# (NColor, NColorInTube, NEmptyTubes), the last entry is the top of the spinner ranges in game.py.
+CONFIGS = [(3, 2, 1), (5, 4, 2), (8, 8, 2), (12, 12, 3), (15, 20, 3)]
+
+
+def run_one(method: str, tubes, max_nodes: int):
+    solver = GameSolution(max_nodes=max_nodes)
+    tracemalloc.start()
+    start = time.perf_counter()
+    getattr(solver, method)(tubes)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return solver, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'method':>14} {'solved':>7} {'moves':>7} {'nodes':>9} {'time(s)':>9} {'peak(MB)':>9}")
+    for config in CONFIGS:
+        for method in ("solve", "optimal_solve"):
+            solved = moves = nodes = 0
+            total_time = peak = 0.0
+            for tubes in seeded_corpus(*config, count=args.count, seed=args.seed):
+                solver, elapsed, solve_peak = run_one(method, tubes, args.max_nodes)
+                solved += solver.solution_found
+                moves += len(solver.moves)
+                nodes += solver.nodes_expanded
+                total_time += elapsed
+                peak = max(peak, solve_peak)
+            print(f"{str(config):>12} {method:>14} {solved:>3}/{args.count:<3} {moves / max(solved, 1):>7.1f} "
+                  f"{nodes // args.count:>9} {total_time / args.count:>9.3f} {peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
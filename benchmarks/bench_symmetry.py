@@ -0,0 +1,42 @@
+"""State-space reduction of optimal_solve under each symmetry setting.
+
+Run from the repository root:
+    python -m benchmarks.bench_symmetry --count 5
+"""
+import argparse
+import time
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+
+CONFIGS = [(4, 3, 2), (5, 4, 2), (5, 4, 3)]
+SYMMETRIES = [None, "tubes", "colors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'symmetry':>9} {'solved':>7} {'expanded':>9} {'states':>9} {'time(s)':>9}")
+    for config in CONFIGS:
+        boards = seeded_corpus(*config, count=args.count, seed=args.seed)
+        for symmetry in SYMMETRIES:
+            solved = expanded = states = 0
+            elapsed = 0.0
+            for tubes in boards:
+                solver = GameSolution(max_nodes=args.max_nodes, symmetry=symmetry)
+                start = time.perf_counter()
+                solver.optimal_solve(tubes)
+                elapsed += time.perf_counter() - start
+                solved += solver.solution_found
+                expanded += solver.nodes_expanded
+                states += len(solver.visited_tubes)
+            print(f"{str(config):>12} {str(symmetry):>9} {solved:>3}/{args.count:<3} {expanded // args.count:>9} "
+                  f"{states // args.count:>9} {elapsed / args.count:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
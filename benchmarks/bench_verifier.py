@@ -0,0 +1,89 @@
+"""Throughput of the bulk verifier on solved, truncated and tampered submissions.
+
+The submissions are solve plans of seeded corpora. Every verdict is checked against a replay with
+engine.GameEngine first. Throughput is reported for verify alone (replays/s) and for JSONL lines in and
+out with verify_stream, without the memo and with it (every submission is sent repeat times).
+
+Run from the repository root:
+    python -m benchmarks.bench_verifier --count 200 --repeat 50
+"""
+import argparse
+import json
+import random
+import time
+
+import verifier
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+from engine import GameEngine
+
+CONFIGS = [(4, 3, 2), (7, 4, 2), (12, 4, 2)]
+
+
+def submissions(config, count: int, seed: int, max_nodes: int):
+    """Return (tubes, moves) submissions: solve plans, half of them truncated or with a tampered move."""
+    rng = random.Random(f"{seed}-verifier")
+    result = []
+    for tubes in seeded_corpus(*config, count=count, seed=seed):
+        solver = GameSolution(max_nodes=max_nodes)
+        solver.solve(tubes)
+        moves = [list(move) for move in solver.moves]
+        kind = rng.randrange(4)
+        if kind == 2 and moves:
+            moves = moves[:rng.randrange(len(moves))]
+        elif kind == 3 and moves:
+            moves[rng.randrange(len(moves))] = [rng.randrange(len(tubes)), rng.randrange(len(tubes))]
+        result.append((tubes, moves))
+    return result
+
+
+def expected(tubes, moves, capacity: int):
+    game = GameEngine(tubes, capacity)
+    for move in moves:
+        if not game.pour(*move):
+            return False, game
+    return True, game
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="boards per configuration")
+    parser.add_argument("--repeat", type=int, default=50, help="passes over the submissions")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'config':>12} {'moves':>6} {'valid':>6} {'won':>5} {'replays/s':>10} {'lines/s':>9} {'memo':>9}")
+    for config in CONFIGS:
+        corpus = submissions(config, args.count, args.seed, args.max_nodes)
+        capacity = config[1]
+        valid = won = 0
+        for tubes, moves in corpus:
+            verdict = verifier.verify(tubes, moves, capacity)
+            legal, game = expected(tubes, moves, capacity)
+            assert verdict["valid"] == legal and verdict["won"] == game.is_won(), (tubes, moves)
+            assert verdict["final"] == game.tubes and verdict["move_count"] == game.move_count, (tubes, moves)
+            valid += legal
+            won += verdict["won"]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for tubes, moves in corpus:
+                verifier.verify(tubes, moves, capacity, final=False)
+        replays = len(corpus) * args.repeat / (time.perf_counter() - start)
+
+        lines = [json.dumps({"id": i, "tubes": tubes, "moves": moves}) for i, (tubes, moves) in enumerate(corpus)]
+        lines *= args.repeat
+        streamed = []
+        for memo_size in (0, 1 << 16):
+            start = time.perf_counter()
+            for _ in verifier.verify_stream(lines, memo_size=memo_size):
+                pass
+            streamed.append(len(lines) / (time.perf_counter() - start))
+        mean_moves = sum(len(moves) for _, moves in corpus) / len(corpus)
+        print(f"{str(config):>12} {mean_moves:>6.1f} {valid:>6} {won:>5} {replays:>10.0f} {streamed[0]:>9.0f} "
+              f"{streamed[1]:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import random
+from typing import List
+
+from level_generator import random_board
+
+Tube = List[int]
+MotherTube = List[Tube]
+
+
+def seeded_corpus(n_color: int, n_color_in_tube: int, n_empty_tubes: int, count: int, seed: int = 0) -> List[MotherTube]:
+    """Return count reproducible random boards for one (NColor, NColorInTube, NEmptyTubes) configuration."""
+    rng = random.Random(f"{seed}-{n_color}-{n_color_in_tube}-{n_empty_tubes}")
+    return [random_board(n_color, n_color_in_tube, n_empty_tubes, rng) for _ in range(count)]
@@ -0,0 +1,299 @@
+"""Reproducible benchmark suite: solvers on seeded corpora, PQ operations and the game engine rules.
+
+Every case reports latency percentiles; the solver cases also report nodes/sec and peak RSS, the others
+operations/sec. Results are written as JSON. Given the JSON of an earlier run as a baseline, every
+compared metric that got worse by more than the threshold is flagged, and the exit status is then 1.
+
+Each solver case runs in a fresh process, so its peak RSS is its own and no case warms another's caches.
+
+Run from the repository root:
+    python -m benchmarks.harness --output baseline.json
+    python -m benchmarks.harness --baseline baseline.json --output results.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import board as packed
+import moves as move_gen
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+from engine import GameEngine
+from pq import PQ
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+SUITES = ("solvers", "pq", "game")
+# (NColor, NColorInTube, NEmptyTubes) of the solver corpora.
+CONFIGS = [(3, 2, 1), (4, 3, 2), (5, 4, 2), (6, 4, 2), (7, 4, 2)]
+METHODS = ("solve", "optimal_solve")
+PQ_SIZES = (1000, 10000)
+# Compared metric -> True if a larger value is better.
+COMPARED = {"latency.p50": False, "latency.p90": False, "nodes_per_sec": True, "ops_per_sec": True,
+            "peak_rss": False}
+
+Result = Dict[str, object]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Return the nearest-rank p50, p90 and p99, the mean and the maximum of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def rank(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+    return {"p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "mean": sum(ordered) / len(ordered),
+            "max": ordered[-1]}
+
+
+def peak_rss() -> Optional[int]:
+    """Return the peak resident set size of this process in bytes, None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, kilobytes elsewhere.
+
+
+def solver_case(method: str, config, count: int, seed: int, max_nodes: int) -> Result:
+    """Solve the seeded corpus of config with method, one fresh solver per board."""
+    latencies = []
+    nodes = solved = moves = 0
+    for tubes in seeded_corpus(*config, count=count, seed=seed):
+        solver = GameSolution(max_nodes=max_nodes)
+        start = time.perf_counter()
+        getattr(solver, method)(tubes)
+        latencies.append(time.perf_counter() - start)
+        nodes += solver.nodes_expanded
+        solved += solver.solution_found
+        moves += len(solver.moves) if solver.solution_found else 0
+    return {"latency": percentiles(latencies), "nodes_per_sec": nodes / max(sum(latencies), 1e-9),
+            "nodes": nodes, "solved": solved, "count": count, "mean_moves": moves / max(solved, 1),
+            "peak_rss": peak_rss()}
+
+
+def isolated(function: Callable, *args) -> Result:
+    """Run function(*args) in a fresh process and return its result."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def batched(run: Callable[[], Tuple[int, float]], batches: int) -> Result:
+    """Run batches of run(), which returns the number of operations it timed and their seconds, into per
+    operation latencies."""
+    latencies = []
+    operations = 0
+    elapsed = 0.0
+    for _ in range(batches):
+        done, seconds = run()
+        latencies.append(seconds / max(done, 1))
+        operations += done
+        elapsed += seconds
+    return {"latency": percentiles(latencies), "ops_per_sec": operations / max(elapsed, 1e-9),
+            "operations": operations}
+
+
+def _f_before(prev, next) -> bool:
+    """The order of the solver frontiers on (g, h) pairs: lower f first, deeper first on equal f."""
+    prev_f = prev[0] + prev[1]
+    next_f = next[0] + next[1]
+    return prev_f < next_f or (prev_f == next_f and prev[0] > next[0])
+
+
+def pq_cases(size: int, batches: int, seed: int) -> Dict[str, Result]:
+    """Time push_back, update (decrease-key) and pop_back on queues of size frontier-like (g, h) entries."""
+    rng = random.Random(f"{seed}-pq-{size}")
+    entries = [(rng.randrange(40), rng.randrange(40)) for _ in range(size)]
+    lowered = [(g, max(0, h - rng.randrange(1, 5))) for g, h in entries]
+
+    def filled() -> Tuple[PQ, float]:
+        queue = PQ(_f_before)
+        start = time.perf_counter()
+        for key, entry in enumerate(entries):
+            queue.push_back(entry, key)
+        return queue, time.perf_counter() - start
+
+    def push() -> Tuple[int, float]:
+        return size, filled()[1]
+
+    def update() -> Tuple[int, float]:
+        queue, _ = filled()
+        start = time.perf_counter()
+        for key, entry in enumerate(lowered):
+            queue.update(entry, key)
+        return size, time.perf_counter() - start
+
+    def pop() -> Tuple[int, float]:
+        queue, _ = filled()
+        start = time.perf_counter()
+        while not queue.is_empty():
+            queue.pop_back()
+        return size, time.perf_counter() - start
+
+    return {f"pq/push_back/{size}": batched(push, batches), f"pq/update/{size}": batched(update, batches),
+            f"pq/pop_back/{size}": batched(pop, batches)}
+
+
+def random_walk(tubes, capacity: int, length: int, rng: random.Random) -> List[List[int]]:
+    """Return up to length random legal [src, dst] moves from tubes."""
+    board = packed.pack(tubes)
+    plan = []
+    for _ in range(length):
+        pours = list(move_gen.legal_moves(board, capacity))
+        if not pours:
+            break
+        src, dst, count = rng.choice(pours)
+        board = move_gen.pour(board, src, dst, count)
+        plan.append([src, dst])
+    return plan
+
+
+def game_cases(config, count: int, seed: int, walk: int = 40) -> Dict[str, Result]:
+    """Time the pours, undos and victory checks of the game engine along random walks over the seeded corpus
+    of config."""
+    capacity = config[1]
+    rng = random.Random(f"{seed}-game")
+    walks = [(tubes, random_walk(tubes, capacity, walk, rng)) for tubes in seeded_corpus(*config, count=count,
+                                                                                         seed=seed)]
+    games = [GameEngine(tubes, capacity) for tubes, _ in walks]
+
+    def pours() -> Iterator[Tuple[int, float]]:
+        for game, (_, plan) in zip(games, walks):
+            game.reset()
+            start = time.perf_counter()
+            for src, dst in plan:
+                game.pour(src, dst)
+            yield len(plan), time.perf_counter() - start
+
+    def undos() -> Iterator[Tuple[int, float]]:
+        for game in games:
+            played = game.move_count
+            start = time.perf_counter()
+            while game.undo():
+                pass
+            yield played, time.perf_counter() - start
+
+    def victories() -> Iterator[Tuple[int, float]]:
+        for game, (_, plan) in zip(games, walks):
+            checks = 0
+            elapsed = 0.0
+            for src, dst in plan:
+                game.pour(src, dst)
+                start = time.perf_counter()
+                game.is_won()
+                elapsed += time.perf_counter() - start
+                checks += 1
+            yield checks, elapsed
+
+    name = "{}-{}-{}".format(*config)
+    return {f"game/pour/{name}": batched(pours().__next__, len(games)),
+            f"game/undo/{name}": batched(undos().__next__, len(games)),
+            f"game/check_victory/{name}": batched(victories().__next__, len(games))}
+
+
+def flatten(result: Result, prefix: str = "") -> Dict[str, float]:
+    """Return the numeric metrics of a case result keyed by dotted names, as in COMPARED."""
+    metrics = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[f"{prefix}{name}"] = value
+    return metrics
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], threshold: float) -> List[Tuple]:
+    """
+        Return the (case, metric, baseline value, new value, relative change) of every compared metric that got
+        worse by more than threshold, a fraction of the baseline value. Cases missing on either side are
+        ignored.
+    """
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        new, old = flatten(result), flatten(baseline[case])
+        for metric, larger_is_better in COMPARED.items():
+            if metric not in new or not old.get(metric):
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            if (-change if larger_is_better else change) > threshold:
+                regressions.append((case, metric, old[metric], new[metric], change))
+    return regressions
+
+
+def describe(case: str, result: Result) -> str:
+    latency = result["latency"]
+    line = f"{case:<32} p50 {latency['p50'] * 1e3:>10.4f}ms p90 {latency['p90'] * 1e3:>10.4f}ms"
+    if "nodes_per_sec" in result:
+        line += f" {result['nodes_per_sec']:>10.0f} nodes/s {result['solved']:>3}/{result['count']:<3} solved"
+    else:
+        line += f" {result['ops_per_sec']:>10.0f} ops/s"
+    if result.get("peak_rss") is not None:
+        line += f" {result['peak_rss'] / 2 ** 20:>7.1f}MB"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="boards per configuration")
+    parser.add_argument("--max-nodes", type=int, default=GameSolution.MAX_NODES, help="node budget per solve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batches", type=int, default=20, help="timed batches per PQ case")
+    parser.add_argument("--suite", choices=SUITES, action="append", help="run only these suites (repeatable)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change of a metric flagged as a regression")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run the solver cases in this process (faster, peak RSS becomes cumulative)")
+    args = parser.parse_args()
+    suites = args.suite or SUITES
+
+    results: Dict[str, Result] = {}
+    if "solvers" in suites:
+        for config in CONFIGS:
+            for method in METHODS:
+                case_args = (method, config, args.count, args.seed, args.max_nodes)
+                case = f"{method}/" + "{}-{}-{}".format(*config)
+                results[case] = solver_case(*case_args) if args.in_process else isolated(solver_case, *case_args)
+                print(describe(case, results[case]), flush=True)
+    if "pq" in suites:
+        for size in PQ_SIZES:
+            for case, result in pq_cases(size, args.batches, args.seed).items():
+                results[case] = result
+                print(describe(case, result), flush=True)
+    if "game" in suites:
+        for case, result in game_cases(CONFIGS[-1], args.count, args.seed).items():
+            results[case] = result
+            print(describe(case, result), flush=True)
+
+    report = {"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                       "platform": platform.platform(), "count": args.count, "max_nodes": args.max_nodes,
+                       "seed": args.seed},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(report, stream, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for case, metric, old, new, change in regressions:
+            print(f"REGRESSION {case} {metric}: {old:.6g} -> {new:.6g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
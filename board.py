@@ -0,0 +1,142 @@
+from typing import List, Optional, Tuple
+
+Tube = bytes
+Board = Tuple[Tube, ...]
+# A move is (src, dst), optionally followed by the number of units it poured.
+Move = Tuple[int, ...]
+# A path is stored as a chain of (parent_path, move) links so every search node can share
+# the moves of its ancestors instead of copying the whole move list.
+Path = Optional[Tuple["Path", Move]]
+
+
+def pack(tubes: List[List[int]]) -> Board:
+    """Pack a list of tubes into an immutable, hashable board.
+            Args:
+                tubes (List[List[int]]): A list of lists representing the colors in each tube.
+
+            Returns:
+                Board: A tuple holding one bytes object per tube, bottom color first.
+    """
+    return tuple(bytes(tube) for tube in tubes)
+
+
+def unpack(board: Board) -> List[List[int]]:
+    """Convert a packed board back into the list of lists used by the game."""
+    return [list(tube) for tube in board]
+
+
+def canonical(board: Board) -> Board:
+    """Return the board with its tubes in a canonical (sorted) order.
+            Two boards that only differ by the order of their tubes have the same canonical form.
+    """
+    return tuple(sorted(board))
+
+
+def canonical_order(board: Board) -> Tuple[int, ...]:
+    """Return the original index of every tube of the canonical form, i.e. canonical(board)[i] == board[order[i]]."""
+    return tuple(sorted(range(len(board)), key=board.__getitem__))
+
+
+def relabel_colors(board: Board) -> Board:
+    """Rename the colors of a board into a canonical numbering, keeping the tube order.
+            Two boards that only differ by the order of their tubes or a renaming of their colors always get
+            the same result once their tubes are sorted (see state_key), and two boards with the same sorted
+            result always have the same solutions.
+
+            Colors are numbered by where they sit (the tubes holding them and their positions in them),
+            refined until stable, which does not depend on the color names. Colors that nothing tells apart
+            are tried first in turn and the numbering giving the smallest sorted board is kept; a color is
+            not tried when swapping it with one already tried leaves the board unchanged.
+    """
+    target = tuple(sorted(board))
+    tables: List[bytes] = []
+    stack = [_refine(board, dict.fromkeys(b"".join(board), 0))]
+    while stack:
+        rank = stack.pop()
+        cells: dict = {}
+        for color, value in rank.items():
+            cells.setdefault(value, []).append(color)
+        if len(cells) == len(rank):
+            tables.append(_table(rank))
+            continue
+        tied = min(value for value, cell in cells.items() if len(cell) > 1)
+        cell = cells[tied]
+        tried: List[int] = []
+        for color in cell:
+            if not any(_swap_fixes(board, target, other, color) for other in tried):
+                tried.append(color)
+        if len(tried) == 1:
+            # Any two colors of the class can be swapped, so every numbering of the class is as good.
+            position = {color: index for index, color in enumerate(cell)}
+            stack.append(_refine(board, {unit: len(cell) * value + (position[unit] if value == tied else 0)
+                                         for unit, value in rank.items()}))
+            continue
+        for color in tried:
+            stack.append(_refine(board, {unit: 2 * value + (value == tied and unit != color)
+                                         for unit, value in rank.items()}))
+    if not tables:
+        return board
+    table = tables[0] if len(tables) == 1 else min(
+        tables, key=lambda table: tuple(sorted(tube.translate(table) for tube in board)))
+    return tuple(tube.translate(table) for tube in board)
+
+
+def _table(rank: dict) -> bytes:
+    table = bytearray(256)
+    for color, value in rank.items():
+        table[color] = value
+    return bytes(table)
+
+
+def _refine(board: Board, rank: dict) -> dict:
+    """Split the color classes of rank (color -> class number) by the tubes and positions of their units
+    until no class splits any more, and return the classes numbered 0, 1, 2, ... in a canonical order."""
+    classes = len(set(rank.values()))
+    while True:
+        table = _table(rank)
+        places: dict = {color: [] for color in rank}
+        for tube in board:
+            shape = tube.translate(table)
+            for position, unit in enumerate(tube):
+                places[unit].append((shape, position))
+        signatures = {color: (rank[color], tuple(sorted(place))) for color, place in places.items()}
+        number = {signature: index for index, signature in enumerate(sorted(set(signatures.values())))}
+        refined = {color: number[signature] for color, signature in signatures.items()}
+        if len(number) == classes or len(number) == len(rank):
+            return refined
+        classes = len(number)
+        rank = refined
+
+
+def _swap_fixes(board: Board, target: Board, first: int, second: int) -> bool:
+    """Return True if swapping two colors leaves the sorted board unchanged."""
+    table = bytearray(range(256))
+    table[first], table[second] = second, first
+    return tuple(sorted(tube.translate(table) for tube in board)) == target
+
+
+def state_key(board: Board, colors: bool = False) -> Board:
+    """Return the key identifying a board up to tube order, and optionally up to color names."""
+    if colors:
+        board = relabel_colors(board)
+    return tuple(sorted(board))
+
+
+def map_moves(moves: List[List[int]], order: Tuple[int, ...]) -> List[List[int]]:
+    """Translate moves expressed on canonical tube indices back to the original tube indices."""
+    return [[order[move[0]], order[move[1]]] for move in moves]
+
+
+def extend_path(path: Path, move: Move) -> Path:
+    """Return a new path with move appended, sharing the existing links."""
+    return path, move
+
+
+def unwind_path(path: Path) -> List[List[int]]:
+    """Convert a linked path into the [[src, dst], ...] move list used by the game."""
+    moves: List[List[int]] = []
+    while path is not None:
+        path, move = path
+        moves.append([move[0], move[1]])
+    moves.reverse()
+    return moves
@@ -0,0 +1,106 @@
+"""
+    Detection of dead boards: boards that are not solved and from which no solved board can be reached.
+
+    Two checks, from cheap to thorough:
+        - no useful pour: every tube is full or topped by a color no other tube can take, so nothing can move
+          (moves.legal_moves yields nothing). With no empty tube and every tube full this is the typical
+          dead end.
+        - closed component: a board with few pours often only leads to a handful of boards, e.g. two colors
+          trading places back and forth between the same tubes (a locked cycle). A breadth first search
+          bounded by limit boards explores them all; if it runs out of boards without reaching a solved
+          one, every board it visited is dead. Reaching a board with an empty tube ends the search
+          undecided, since an empty tube opens up most of the board again.
+
+    Boards with an empty tube are never checked. Every board proven dead is remembered under its key up to
+    tube order, so no search below a pruned board is repeated.
+"""
+from itertools import islice
+from typing import Set
+
+import board as packed
+import moves as move_gen
+
+
+class DeadlockDetector:
+    """
+        Recognizes dead boards for one tube capacity, learning dead board keys as it goes.
+
+        Attributes:
+            capacity (int): The capacity of a tube.
+            branching (int): Only boards with at most this many pours get the closed component search.
+            limit (int): The maximum number of boards a closed component search visits before giving up.
+            memo_size (int): The maximum number of dead and undecided keys remembered, each.
+            checks (int): The number of boards checked.
+            dead (int): The number of boards found dead, by a check or from memory.
+    """
+    def __init__(self, capacity: int, branching: int = 2, limit: int = 32, memo_size: int = 1 << 16):
+        """
+            Args:
+                capacity (int): The capacity of a tube.
+                branching (int): Only boards with at most this many pours get the closed component search.
+                limit (int): The maximum number of boards a closed component search visits.
+                memo_size (int): The maximum number of dead and undecided keys remembered, each.
+        """
+        self.capacity = capacity
+        self.branching = branching
+        self.limit = limit
+        self.memo_size = memo_size
+        self.checks = 0
+        self.dead = 0
+        self.__dead_keys: Set[packed.Board] = set()
+        self.__open_keys: Set[packed.Board] = set()  # Boards a closed component search could not decide.
+
+    @property
+    def learned(self) -> int:
+        """The number of dead board keys remembered."""
+        return len(self.__dead_keys)
+
+    def is_dead(self, board: packed.Board) -> bool:
+        """Return True if no solved board can be reached from board. False means alive or undecided."""
+        self.checks += 1
+        if b"" in board:
+            # An empty tube always takes the top of a mixed tube, and locked cycles need every tube in use.
+            return False
+        moves = list(islice(move_gen.legal_moves(board, self.capacity), self.branching + 1))
+        if len(moves) > self.branching:
+            return False
+        if not moves:
+            if move_gen.is_solved(board, self.capacity):
+                return False
+            self.dead += 1
+            return True
+        key = packed.canonical(board)
+        if key in self.__dead_keys:
+            self.dead += 1
+            return True
+        if key in self.__open_keys or not self.__closed(board, key):
+            return False
+        self.dead += 1
+        return True
+
+    def __remember(self, keys: Set[packed.Board], new: Set[packed.Board]) -> None:
+        if len(keys) + len(new) > self.memo_size:
+            keys.clear()
+        keys.update(new)
+
+    def __closed(self, board: packed.Board, key: packed.Board) -> bool:
+        """Search every board reachable from board, up to limit of them, and learn them as dead if none is
+        solved."""
+        seen = {key}
+        layer = [board]
+        while layer:
+            next_layer = []
+            for state in layer:
+                for pour in move_gen.legal_moves(state, self.capacity):
+                    child = move_gen.pour(state, *pour)
+                    child_key = packed.canonical(child)
+                    if child_key in seen or child_key in self.__dead_keys:
+                        continue
+                    if b"" in child or len(seen) >= self.limit:
+                        self.__remember(self.__open_keys, {key})
+                        return False
+                    seen.add(child_key)
+                    next_layer.append(child)
+            layer = next_layer
+        self.__remember(self.__dead_keys, seen)
+        return True
@@ -0,0 +1,147 @@
+"""
+    The rules of Water Sort without any display: a board, pours, the victory check, undo/redo and replay.
+
+    Nothing here needs pygame, and only the tiny board and moves modules are imported up front (the level
+    generator, which pulls in the solver, is loaded the first time a board is generated), so the engine
+    imports in milliseconds. A game keeps its board, the board it started from and the pours played: undo
+    pours the units back instead of restoring a copy of the board, so a process can hold many thousands of
+    games at once.
+
+    Usage:
+        game = GameEngine.generate(5, 4, 2)
+        game.pour(0, 5)
+        game.undo()
+        game.replay([[0, 5], [1, 5]])
+        game.is_won()
+"""
+from collections import Counter
+from typing import List, Optional
+
+import moves as move_gen
+
+MotherTube = List[List[int]]
+
+
+class GameEngine:
+    """
+        One game of Water Sort.
+
+        Attributes:
+            NColor (int): The number of unique colors on the board.
+            NColorInTube (int): The capacity of a tube, which is also the number of units of each color.
+            NEmptyTubes (int): The number of tubes beyond one per color.
+            tubes (List[List[int]]): The current board, every tube bottom first.
+            initial (List[List[int]]): The board the game started from.
+            history (List[Pour]): The pours played, for undo.
+            undone (List[Pour]): The pours undone since the last pour, for redo.
+    """
+    def __init__(self, tubes: MotherTube, n_color_in_tube: Optional[int] = None):
+        """
+            Args:
+                tubes (List[List[int]]): The board to start from, it is copied.
+                n_color_in_tube (int): The capacity of a tube, the largest color count of the board if omitted.
+        """
+        counts = Counter(unit for tube in tubes for unit in tube)
+        self.NColor = len(counts)
+        self.NColorInTube = n_color_in_tube if n_color_in_tube is not None else max(counts.values(), default=0)
+        self.NEmptyTubes = len(tubes) - self.NColor
+        self.initial = [list(tube) for tube in tubes]
+        self.tubes = [list(tube) for tube in tubes]
+        self.history: List[move_gen.Pour] = []
+        self.undone: List[move_gen.Pour] = []
+
+    @classmethod
+    def generate(cls, n_color: int, n_color_in_tube: int, n_empty_tubes: int, seed=None) -> "GameEngine":
+        """Start a game on a new solvable board, see level_generator.LevelGenerator."""
+        from level_generator import LevelGenerator
+        tubes, _ = LevelGenerator(n_color, n_color_in_tube, n_empty_tubes, seed).generate()
+        return cls(tubes, n_color_in_tube)
+
+    @property
+    def move_count(self) -> int:
+        """The number of pours played and not undone."""
+        return len(self.history)
+
+    @property
+    def moves(self) -> List[List[int]]:
+        """The [src, dst] moves played and not undone."""
+        return [[src, dst] for src, dst, _ in self.history]
+
+    def snapshot(self) -> MotherTube:
+        """Return a copy of the current board."""
+        return [list(tube) for tube in self.tubes]
+
+    def can_pour(self, src: int, dst: int) -> int:
+        """Return how many units pouring tube src into tube dst moves, 0 if the pour is not allowed."""
+        if src == dst or not (0 <= src < len(self.tubes) and 0 <= dst < len(self.tubes)):
+            return 0
+        return move_gen.pour_amount(self.tubes[src], self.tubes[dst], self.NColorInTube)
+
+    def pour(self, src: int, dst: int) -> int:
+        """Pour tube src into tube dst and return the number of units moved, 0 (and nothing changes) if the
+        pour is not allowed."""
+        count = self.can_pour(src, dst)
+        if count:
+            self.__move(src, dst, count)
+            self.history.append((src, dst, count))
+            self.undone.clear()
+        return count
+
+    def undo(self) -> bool:
+        """Take back the last pour, returning False if there is none."""
+        if not self.history:
+            return False
+        src, dst, count = self.history.pop()
+        self.__move(dst, src, count)
+        self.undone.append((src, dst, count))
+        return True
+
+    def redo(self) -> bool:
+        """Play the last undone pour again, returning False if there is none."""
+        if not self.undone:
+            return False
+        src, dst, count = self.undone.pop()
+        self.__move(src, dst, count)
+        self.history.append((src, dst, count))
+        return True
+
+    def reset(self) -> None:
+        """Go back to the board the game started from, forgetting every pour."""
+        self.tubes = [list(tube) for tube in self.initial]
+        self.history = []
+        self.undone = []
+
+    def replay(self, moves: List[List[int]]) -> int:
+        """
+            Play a list of [src, dst] moves and return how many were played.
+
+            Raises:
+                ValueError: If a move is not a legal pour or not a [src, dst] pair. The moves before it are taken
+                    back first, so the board, history and undone pours are left as they were.
+        """
+        played = len(self.history)
+        undone = self.undone[:]
+        index, move = 0, None
+        try:
+            for index, move in enumerate(moves):
+                src, dst = move
+                if not self.pour(src, dst):
+                    error = f"move {index} ({src} -> {dst}) is not a legal pour"
+                    break
+            else:
+                return len(self.history) - played
+        except (TypeError, ValueError, IndexError):
+            error = f"move {index} ({move!r}) is not a [src, dst] pair"
+        while len(self.history) > played:
+            self.undo()
+        self.undone = undone
+        raise ValueError(error)
+
+    def is_won(self) -> bool:
+        """Return True if every tube is either empty or full with a single color."""
+        return move_gen.is_solved(self.tubes, self.NColorInTube)
+
+    def __move(self, src: int, dst: int, count: int) -> None:
+        source = self.tubes[src]
+        self.tubes[dst].extend(source[-count:])
+        del source[-count:]
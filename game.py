@@ -1,13 +1,19 @@
 # water sort! Color sorting game in Python
 import pygame
-import random
-import copy
-from ai_solution import GameSolution
+import plan_optimizer
+from ai_solution import SolveStatus
+from engine import GameEngine
+from solution_cache import SolutionCache
+from solver_worker import LevelWorker, SolverWorker
 
 # Constants for the game window
 WIDTH = 850
 HEIGHT = 600
 fps = 60
+# Milliseconds between two moves when playing back a solution
+PLAYBACK_DELAY = 500
+# Seconds the board generator may look for a board proven solvable before settling for a quick deal
+GENERATION_TIME_LIMIT = 5.0
 
 # Color choices available for the game
 color_choices = ['red', 'light blue', 'dark green', 'yellow', 'orange', 'purple', 'pink', 'brown', 'gray',
@@ -99,7 +105,7 @@ class Button:
 
 class Game:
     """The main class for the Water Sort game.
-        This class manages the game's logic, display, and user interactions.
+        This class manages the display and user interactions, the rules and the board live in its engine.
         Attributes:
             clock (pygame.time.Clock): The game clock.
             font (pygame.Font): The font used for text rendering.
@@ -113,18 +119,23 @@ class Game:
             colors_in_tube_count (int): The current number of colors in each tube.
             new_game (bool): True if a new game is started.
             run (bool): True while the game is running.
-            tube_colors (list): The colors in each tube.
+            engine (GameEngine): The board being played, its rules and its undo history, None before the first game.
             tube_rects (list): Rectangles representing each tube for rendering.
-            game_state_history (list): A history of game states for undo functionality.
             selected (bool): True if a tube is selected for moving colors.
             win (bool): True if the player has won the game.
-            move_count (int): The number of moves made by the player.
             selected_tube (int): The index of the currently selected tube.
             destination_tube (int): The index of the destination tube for moving colors.
             undo_button (Button): The "Undo" button.
             new_board_button (Button): The "New Game" button.
             solve_game_button (Button): The "Solve" button.
             optimal_solve_button (Button): The "Opt. Solve" button.
+            cancel_button (Button): The "Cancel" button, shown while the AI is solving.
+            solver (SolverWorker): The background solve in progress, None when idle.
+            level_worker (LevelWorker): The background generation of the next board, None when idle.
+            solver_board (list): The board the background solve started from.
+            solution_cache (SolutionCache): Verdicts of earlier solves, checked before starting a new one.
+            playback_moves (list): The moves of the solution still to be played back.
+            next_playback_tick (int): The pygame tick at which the next move is played back.
             color_spinner (SpinBox): The SpinBox for selecting the number of colors.
             empty_tubes_spinner (SpinBox): The SpinBox for selecting the number of empty tubes.
             colors_in_tube_spinner (SpinBox): The SpinBox for selecting the number of colors in each tube.
@@ -144,13 +155,10 @@ class Game:
         self.colors_in_tube_count = self.NColorInTube
         self.new_game = True
         self.run = True
-        self.tube_colors = []
+        self.engine = None
         self.tube_rects = []
-        self.game_state_history = []
-        self.initial_colors = []
         self.selected = False
         self.win = False
-        self.move_count = 0
         self.move_text = ""
         self.selected_tube = 100
         self.destination_tube = 100
@@ -159,36 +167,45 @@ class Game:
         self.solve_game_button = Button(235, 550, 50, 30, "Solve", (33, 104, 105))
         self.optimal_solve_button = Button(295, 550, 90, 30, "Opt. Solve", (33, 104, 105))
         self.reset_button = Button(750, 12, 70, 30, "Reset", (33, 104, 105))
+        self.cancel_button = Button(660, 12, 80, 30, "Cancel", (33, 104, 105))
+        self.solver = None
+        self.level_worker = None
+        self.solver_board = []
+        self.solution_cache = SolutionCache()
+        self.playback_moves = []
+        self.next_playback_tick = 0
         self.color_spinner = SpinBox(440, 560, "NColor", self.color_count, 2, 15)
         self.empty_tubes_spinner = SpinBox(590, 560, "ETube", self.empty_tubes_count, 1, 3)
         self.colors_in_tube_spinner = SpinBox(740, 560, "CTube", self.colors_in_tube_count, 2, 20)
 
     def generate_start(self):
-        """Generate the initial configuration of tubes with colors.
-                Returns:
-                    Tuple[int, List[List[int]]]: A tuple containing the total number of tubes
-                    and a list of lists representing the colors in each tube.
+        """Start generating a new solvable board in the background, the game has no board until it arrives."""
+        if self.level_worker is not None:
+            self.level_worker.terminate()
+        self.engine = None
+        self.level_worker = LevelWorker(self.NColor, self.NColorInTube, self.NEmptyTubes,
+                                        GENERATION_TIME_LIMIT).start()
+
+    def update_level(self, m_font):
+        """Poll the background generation and start the game on its board once it is there.
+                Args:
+                    m_font (pygame.Font): The font used for the progress text.
         """
-        global tubes_number, tubes_colors
-        check_win = True
-        while check_win:
-            tubes_number = self.NEmptyTubes + self.NColor
-            tubes_colors = []
-            available_colors = []
-            for i in range(tubes_number):
-                tubes_colors.append([])
-                if i < tubes_number - self.NEmptyTubes:
-                    for j in range(self.NColorInTube):
-                        available_colors.append(i)
-            for i in range(tubes_number - self.NEmptyTubes):
-                for j in range(self.NColorInTube):
-                    color = random.choice(available_colors)
-                    tubes_colors[i].append(color)
-                    available_colors.remove(color)
-            check_win = self.check_victory(tubes_colors)
-
-        print(tubes_colors, tubes_number)
-        return tubes_number, tubes_colors
+        if not self.level_worker.poll():
+            waiting_text = m_font.render("Generating a new board...", True, 'white')
+            self.screen.blit(waiting_text, (150, 15))
+            return
+        worker = self.level_worker
+        self.level_worker = None
+        if worker.tubes is None:
+            # The worker died without a board: try again.
+            self.generate_start()
+            return
+        self.engine = GameEngine(worker.tubes, self.NColorInTube)
+        self.tubes = len(worker.tubes)
+        print(self.engine.tubes, self.tubes)
+        if worker.plan is None:
+            print(f"no board proven solvable after {worker.elapsed:.1f}s, dealt one passing the quick checks")
 
     def draw_tubes(self, tubes_num, tube_cols):
         """Draw the tubes and their colors on the game screen.
@@ -242,64 +259,6 @@ class Game:
                 tube_boxes.append(box)
         return tube_boxes
 
-    def move_logic(self, tube_cols, sel_tube, dest_tube):
-        """Handle the logic for moving colors between tubes.
-                Args:
-                    tube_cols (List[List[int]]): A list of lists representing the colors in each tube.
-                    sel_tube (int): The index of the selected tube.
-                    dest_tube (int): The index of the destination tube.
-
-                Returns:
-                    List[List[int]]: Updated tube colors after the move.
-        """
-        chain = True
-        length = 1
-        color_on_top = 100
-        color_to_move = 100
-        if len(tube_cols[sel_tube]) > 0:
-            color_to_move = tube_cols[sel_tube][-1]
-            for col in range(1, len(tube_cols[sel_tube])):
-                if chain:
-                    if tube_cols[sel_tube][-1 - col] == color_to_move:
-                        length += 1
-                    else:
-                        chain = False
-        if len(tube_cols[dest_tube]) < self.NColorInTube:
-            if len(tube_cols[dest_tube]) == 0:
-                color_on_top = color_to_move
-            else:
-                color_on_top = tube_cols[dest_tube][-1]
-        if color_on_top == color_to_move and len(tube_cols[sel_tube]) > 0:
-            if sel_tube != dest_tube:
-                self.game_state_history.append(copy.deepcopy(tube_cols))
-                self.move_count += 1
-            for i in range(length):
-                if len(tube_cols[dest_tube]) < self.NColorInTube and len(tube_cols[sel_tube]) > 0:
-                    tube_cols[dest_tube].append(color_to_move)
-                    tube_cols[sel_tube].pop(-1)
-
-        return tube_cols
-
-    def check_victory(self, tube_cols):
-        """Check if the player has won the game.
-                Args:
-                    tube_cols (List[List[int]]): A list of lists representing the colors in each tube.
-
-                Returns:
-                    bool: True if the player has won, False otherwise.
-        """
-        won = True
-        for i in range(len(tube_cols)):
-            if len(tube_cols[i]) > 0:
-                if len(tube_cols[i]) != self.NColorInTube:
-                    won = False
-                else:
-                    main_color = tube_cols[i][-1]
-                    for j in range(len(tube_cols[i])):
-                        if tube_cols[i][j] != main_color:
-                            won = False
-        return won
-
     def reset_game(self, colors_count, color_tube_count, empty_tubes):
         """Reset the game with new settings.
                 Args:
@@ -310,44 +269,81 @@ class Game:
         self.NColor = colors_count
         self.NColorInTube = color_tube_count
         self.NEmptyTubes = empty_tubes
-        self.tubes, self.tube_colors = self.generate_start()
-        self.initial_colors = copy.deepcopy(self.tube_colors)
-        self.game_state_history = []
+        self.generate_start()
         self.selected_tube = 100
         self.destination_tube = 100
         self.selected = False
         self.win = False
-        self.move_count = 0
         self.move_text = ""
 
-    def auto_move(self, founded_solution, m_font):
-        """Move the colors automatically based on the solution found by the AI.
+    def auto_move(self, founded_solution):
+        """Queue the solution found by the AI to be played back, one move every PLAYBACK_DELAY milliseconds.
                 Args:
                     founded_solution (List[Tuple[int, int]]): A list of tuples representing
                     the source and destination tubes for each move.
-                    :param founded_solution:
-                    :param m_font:
         """
-        for move in founded_solution:
-            self.screen.fill((0, 0, 0))
-            self.clock.tick(fps)
-            self.undo_button.draw(self.screen)
-            self.new_board_button.draw(self.screen)
-            self.solve_game_button.draw(self.screen)
-            self.optimal_solve_button.draw(self.screen)
-            self.reset_button.draw(self.screen)
-
-            self.color_spinner.draw(self.screen)
-            self.empty_tubes_spinner.draw(self.screen)
-            self.colors_in_tube_spinner.draw(self.screen)
-
-            sel_tube, dest_tube = move  # Extract the source and destination tubes from the AI's solution
-            self.tube_colors = self.move_logic(self.tube_colors, sel_tube, dest_tube)
-            self.move_text = m_font.render(f"Move: {self.move_count}", True, 'white')
-            self.screen.blit(self.move_text, (10, 10))
-            self.draw_tubes(self.tubes, self.tube_colors)
-            pygame.display.flip()
-            pygame.time.delay(500)  # Add a delay to slow down the automatic moves for better visualization
+        self.playback_moves = list(founded_solution)
+        self.next_playback_tick = pygame.time.get_ticks()
+
+    def play_back(self):
+        """Apply the next queued solution move once its time has come, without blocking the frame."""
+        if self.playback_moves and pygame.time.get_ticks() >= self.next_playback_tick:
+            sel_tube, dest_tube = self.playback_moves.pop(0)
+            self.engine.pour(sel_tube, dest_tube)
+            self.next_playback_tick += PLAYBACK_DELAY
+
+    def start_solver(self, method):
+        """Start solving the current board in the background with the given GameSolution method.
+                Args:
+                    method (str): "solve" or "optimal_solve".
+        """
+        cached = self.solution_cache.lookup(self.engine.tubes, self.NColorInTube, method == "optimal_solve")
+        if cached is not None:
+            status, solution_moves = cached
+            print(f"{method}: {status.value} (cached), {len(solution_moves)} moves")
+            if status == SolveStatus.SOLVED:
+                self.auto_move(solution_moves)
+            return
+        print(f"{method}: solving...")
+        self.solver_board = self.engine.snapshot()
+        self.solver = SolverWorker(method, self.solver_board, n_color=self.NColor,
+                                   n_color_in_tube=self.NColorInTube, n_empty_tubes=self.NEmptyTubes).start()
+
+    def stop_ai(self):
+        """Discard the background solve and the pending playback, if any."""
+        if self.solver is not None:
+            self.solver.terminate()
+            self.solver = None
+        self.playback_moves = []
+
+    def update_solver(self, m_font):
+        """Poll the background solve, draw its progress and start the playback once it is solved.
+                Args:
+                    m_font (pygame.Font): The font used for the progress text.
+        """
+        if self.solver.poll():
+            print(f"{self.solver.method}: {self.solver.status.value if self.solver.status else 'failed'},",
+                  f"{len(self.solver.moves)} moves, {self.solver.nodes} nodes in {self.solver.elapsed:.2f}s")
+            if self.solver.stats is not None:
+                stats = self.solver.stats
+                print(f"{self.solver.method}: {stats['nodes_generated']} generated, {stats['duplicates_pruned']} "
+                      f"duplicates, {stats['deadlocks_pruned']} dead, peak frontier {stats['peak_frontier']}")
+            solution_moves = self.solver.moves
+            if self.solver.status == SolveStatus.SOLVED and self.solver.method == "solve":
+                # The depth-first plan is rarely the shortest: trim it before it is cached and played back.
+                solution_moves = plan_optimizer.optimize(self.solver_board, solution_moves, self.NColorInTube)
+                print(f"{self.solver.method}: shortened to {len(solution_moves)} moves")
+            if self.solver.status is not None:
+                self.solution_cache.store(self.solver_board, self.solver.status, solution_moves, self.NColorInTube,
+                                          self.solver.method == "optimal_solve")
+            if self.solver.status == SolveStatus.SOLVED:
+                self.auto_move(solution_moves)
+            self.solver = None
+            return
+        self.cancel_button.draw(self.screen)
+        progress_text = m_font.render(f"Nodes: {self.solver.nodes} ({self.solver.nodes_per_second:.0f}/s) "
+                                      f"Frontier: {self.solver.frontier_size}", True, 'white')
+        self.screen.blit(progress_text, (150, 15))
 
     def run_game(self):
         """Run the main game loop."""
@@ -365,19 +361,29 @@ class Game:
             self.colors_in_tube_spinner.draw(self.screen)
 
             move_font = pygame.font.SysFont("Arial", 24)
-            self.move_text = move_font.render(f"Move: {self.move_count}", True, 'teal')
+            self.move_text = move_font.render(f"Move: {self.engine.move_count if self.engine else 0}", True, 'teal')
             self.screen.blit(self.move_text, (10, 10))
 
             if self.new_game:
-                self.tubes, self.tube_colors = self.generate_start()
-                self.initial_colors = copy.deepcopy(self.tube_colors)
+                self.generate_start()
                 self.new_game = False
-            else:
-                self.tube_rects = self.draw_tubes(self.tubes, self.tube_colors)
-            self.win = self.check_victory(self.tube_colors)
+            if self.level_worker is not None:
+                self.update_level(move_font)
+            if self.engine is not None:
+                self.tube_rects = self.draw_tubes(self.tubes, self.engine.tubes)
+            if self.solver is not None:
+                self.update_solver(move_font)
+            self.play_back()
+            self.win = self.engine is not None and self.engine.is_won()
+            # Nothing but the settings and New Game works while the board is being generated.
+            ai_busy = self.solver is not None or bool(self.playback_moves) or self.engine is None
             # Event loop
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.stop_ai()
+                    if self.level_worker is not None:
+                        self.level_worker.terminate()
+                    self.solution_cache.close()
                     self.run = False
                 if self.win:
                     if event.type == pygame.KEYDOWN:
@@ -385,17 +391,19 @@ class Game:
                             self.reset_game(self.color_spinner.value, self.colors_in_tube_spinner.value,
                                             self.empty_tubes_spinner.value)
                         if event.key == pygame.K_SPACE:
-                            self.tube_colors = copy.deepcopy(self.initial_colors)
+                            self.engine.reset()
                             self.win = False
                             self.new_game = False
-                            self.move_count = 0
-                            self.game_state_history = []
-                if not self.win or self.move_count == 0:
+                if not self.win or self.engine.move_count == 0:
                     self.color_spinner.update(event)
                     self.empty_tubes_spinner.update(event)
                     self.colors_in_tube_spinner.update(event)
                     if event.type == pygame.MOUSEBUTTONDOWN:
-                        if not self.selected:
+                        if ai_busy:
+                            # Tubes are not playable while the AI is solving or playing back its solution
+                            if self.solver is not None and self.cancel_button.rect.collidepoint(event.pos):
+                                self.solver.cancel()
+                        elif not self.selected:
                             for i in range(len(self.tube_rects)):
                                 if self.tube_rects[i].collidepoint(event.pos):
                                     self.selected = True
@@ -404,43 +412,28 @@ class Game:
                             for i in range(len(self.tube_rects)):
                                 if self.tube_rects[i].collidepoint(event.pos):
                                     self.destination_tube = i
-                                    # Save the current game state before moving
-                                    self.tube_colors = self.move_logic(self.tube_colors, self.selected_tube,
-                                                                       self.destination_tube)
+                                    # The engine keeps the pour in its history for undo
+                                    self.engine.pour(self.selected_tube, self.destination_tube)
                                     self.selected = False
                                     self.selected_tube = 100
-                        if self.undo_button.rect.collidepoint(event.pos):
+                        if self.engine is not None and self.undo_button.rect.collidepoint(event.pos):
                             # Handle the "Undo" button click
-                            if self.game_state_history:
-                                self.tube_colors = self.game_state_history.pop()
-                                self.move_count -= 1
+                            self.stop_ai()
+                            self.engine.undo()
                         if self.new_board_button.rect.collidepoint(event.pos):
                             # Handle the "New Game" button click
-                            self.tube_colors.pop()
+                            self.stop_ai()
                             self.reset_game(self.color_spinner.value, self.colors_in_tube_spinner.value,
                                             self.empty_tubes_spinner.value)
-                        if self.solve_game_button.rect.collidepoint(event.pos):
-                            print("solving...")
-                            solution = GameSolution(self)
-                            solution.solve(self.tube_colors)
-                            print(solution.solution_found, solution.moves)
-                            print("move count:", len(solution.moves))
-                            if solution.solution_found:
-                                self.auto_move(solution.moves, move_font)
-                        if self.optimal_solve_button.rect.collidepoint(event.pos):
-                            print("optimal solving...")
-                            solution = GameSolution(self)
-                            solution.optimal_solve(self.tube_colors)
-                            print(solution.solution_found, solution.moves)
-                            print("optimal move count:", len(solution.moves))
-                            if solution.solution_found:
-                                self.auto_move(solution.moves, move_font)
-                        if self.reset_button.rect.collidepoint(event.pos):
-                            self.tube_colors = copy.deepcopy(self.initial_colors)
+                        if not ai_busy and self.solve_game_button.rect.collidepoint(event.pos):
+                            self.start_solver("solve")
+                        if not ai_busy and self.optimal_solve_button.rect.collidepoint(event.pos):
+                            self.start_solver("optimal_solve")
+                        if self.engine is not None and self.reset_button.rect.collidepoint(event.pos):
+                            self.stop_ai()
+                            self.engine.reset()
                             self.win = False
                             self.new_game = False
-                            self.move_count = 0
-                            self.game_state_history = []
 
             if self.win:
                 victory_text = self.font.render('You win! press <Enter> to new game or press <Space> to reset!', True
@@ -0,0 +1,124 @@
+"""
+    Heuristics for the optimal solvers.
+
+    A heuristic takes a packed board and the tube capacity and estimates the number of pours left.
+    An admissible heuristic never overestimates it, so A* and IDA* using it return optimal plans.
+    An inadmissible one may overestimate; the search is then usually faster but the plan is not
+    guaranteed to be the shortest.
+
+    Every heuristic here is 0 on a solved board. They are registered by name in HEURISTICS, and
+    ADMISSIBLE lists the names that are safe for optimal solving.
+"""
+from typing import Callable, Dict, Set
+
+from board import Board
+
+Heuristic = Callable[[Board, int], int]
+
+
+def completed(board: Board, capacity: int) -> int:
+    """
+        Number of colors that do not have a completed tube yet.
+
+        Admissible: a pour fills at most one tube, so it completes at most one color.
+    """
+    colors = set()
+    done = 0
+    for tube in board:
+        colors.update(tube)
+        if len(tube) == capacity and tube.count(tube[0]) == capacity:
+            done += 1
+    return len(colors) - done
+
+
+def breaks(board: Board, capacity: int) -> int:
+    """
+        Number of color runs on the board minus the number of colors, i.e. the number of run joins
+        still needed for every color to form a single run.
+
+        Admissible: a pour moves a single run and joins it with at most one other run.
+    """
+    runs = 0
+    colors = set()
+    for tube in board:
+        previous = -1
+        for unit in tube:
+            if unit != previous:
+                runs += 1
+                previous = unit
+        colors.update(tube)
+    return runs - len(colors)
+
+
+def consolidate(board: Board, capacity: int) -> int:
+    """
+        Lower bound on the pours needed to consolidate every color into one tube.
+
+        Every run that is not at the bottom of its tube must be poured out at least once, since the tube
+        it sits in has to end up holding a single color. A color whose runs sit at the bottom of b
+        different tubes also needs at least b - 1 of them poured out, which are not counted by the first
+        term.
+
+        Admissible and consistent: a pour moves one run, which either leaves a non-bottom position or
+        leaves the bottom of a tube, and landing in an empty tube or on top of the same color never
+        creates a new run to pay for. It is never smaller than breaks.
+    """
+    upper_runs = 0
+    bottoms: Dict[int, int] = {}
+    for tube in board:
+        if not tube:
+            continue
+        bottom = tube[0]
+        bottoms[bottom] = bottoms.get(bottom, 0) + 1
+        previous = bottom
+        for unit in tube:
+            if unit != previous:
+                upper_runs += 1
+                previous = unit
+    return upper_runs + sum(count - 1 for count in bottoms.values())
+
+
+def mixed_tubes(board: Board, capacity: int) -> int:
+    """
+        consolidate plus the number of tubes that still hold more than one color.
+
+        Inadmissible: the pour that clears the last foreign run off a tube is counted by both terms.
+        It pushes the search harder towards unmixing tubes and finds (usually near-optimal) plans with
+        far fewer expansions.
+    """
+    mixed = 0
+    for tube in board:
+        if tube and tube.count(tube[0]) != len(tube):
+            mixed += 1
+    return consolidate(board, capacity) + mixed
+
+
+def pattern_database(board: Board, capacity: int) -> int:
+    """
+        The pattern database of the board's configuration (see pattern_db), at least consolidate.
+        The database is loaded from pattern_db.DIRECTORY on first use; without one it is consolidate.
+
+        Admissible: every pour of the board is a pour of its abstractions, and consolidate is admissible.
+    """
+    # pattern_db builds on consolidate, so it imports this module: import it on use, not at load time.
+    import pattern_db
+    return pattern_db.lookup(board, capacity)
+
+
+HEURISTICS: Dict[str, Heuristic] = {
+    "completed": completed,
+    "breaks": breaks,
+    "consolidate": consolidate,
+    "mixed_tubes": mixed_tubes,
+    "pdb": pattern_database,
+}
+ADMISSIBLE: Set[str] = {"completed", "breaks", "consolidate", "pdb"}
+DEFAULT: str = "consolidate"
+
+
+def get(name: str) -> Heuristic:
+    """Return the heuristic registered under name."""
+    try:
+        return HEURISTICS[name]
+    except KeyError:
+        raise ValueError(f"unknown heuristic: {name}, expected one of {sorted(HEURISTICS)}") from None
@@ -0,0 +1,260 @@
+"""
+    Generation of boards that are known to be solvable.
+
+    The main source is scrambling: start from a solved board and walk backwards with random reverse pours
+    (moves.reverse_moves). Every board on the walk can be solved by playing the walk forwards, so the
+    result is solvable by construction and comes with a plan. Once the walk has made the requested number
+    of steps it keeps going, preferring reverse pours that fill or empty tubes, until every tube is full or
+    empty again like in a fresh deal, without the board being solved.
+
+    Not every walk gets there: many boards have no predecessor at all (a pour never leaves a single unit on
+    top of another color, for instance). A walk that runs into one of them is dropped and, after a few
+    failed walks, a random deal whose solvability is checked with the solver is used instead. Walks settle
+    often on small boards, which makes scrambling the fast path there, but almost never from about a dozen
+    colors up, where the generator quickly switches to checked deals for good.
+
+    On tight configurations (many colors, a single empty tube) most checked deals are rejected, so a
+    generator can be given a time limit or a number of candidates, after which generate raises TimeoutError.
+    unchecked_deal then gives a board that passes the cheap checks without being proven solvable.
+"""
+import random
+import time
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+
+import board as packed
+import heuristics
+import moves as move_gen
+from ai_solution import GameSolution, SolveStatus
+from deadlock import DeadlockDetector
+
+MotherTube = List[List[int]]
+Plan = List[List[int]]
+Level = Tuple[MotherTube, Plan]
+
+
+def random_board(n_color: int, n_color_in_tube: int, n_empty_tubes: int, rng: random.Random) -> MotherTube:
+    """Deal a shuffled board with the given settings in linear time, possibly a solved one."""
+    units = [color for color in range(n_color) for _ in range(n_color_in_tube)]
+    rng.shuffle(units)
+    tubes = [units[i * n_color_in_tube:(i + 1) * n_color_in_tube] for i in range(n_color)]
+    tubes.extend([] for _ in range(n_empty_tubes))
+    return tubes
+
+
+def deal(n_color: int, n_color_in_tube: int, n_empty_tubes: int, rng: random.Random) -> MotherTube:
+    """Deal a shuffled board that is not already solved, in linear time."""
+    while True:
+        tubes = random_board(n_color, n_color_in_tube, n_empty_tubes, rng)
+        if not move_gen.is_solved(packed.pack(tubes), n_color_in_tube):
+            return tubes
+
+
+def precheck(tubes: MotherTube, capacity: int) -> bool:
+    """
+        Cheap necessary conditions for a board to be solvable: no tube over capacity, every color filling
+        exactly whole tubes, and at least one pour available unless the board is already solved.
+        A board passing them may still be unsolvable, only the solver can tell.
+    """
+    board = packed.pack(tubes)
+    if any(len(tube) > capacity for tube in board):
+        return False
+    if any(count % capacity for count in Counter(b"".join(board)).values()):
+        return False
+    return move_gen.is_solved(board, capacity) or next(move_gen.legal_moves(board, capacity), None) is not None
+
+
+def unchecked_deal(n_color: int, n_color_in_tube: int, n_empty_tubes: int, rng: random.Random) -> MotherTube:
+    """Deal a board that passes precheck and is not dead (see deadlock.DeadlockDetector), without proving it
+    solvable, for when LevelGenerator runs out of time."""
+    detector = DeadlockDetector(n_color_in_tube)
+    while True:
+        tubes = deal(n_color, n_color_in_tube, n_empty_tubes, rng)
+        if precheck(tubes, n_color_in_tube) and not detector.is_dead(packed.pack(tubes)):
+            return tubes
+
+
+def _full_or_empty(tube: bytearray, capacity: int) -> bool:
+    return len(tube) == 0 or len(tube) == capacity
+
+
+def _has_predecessor(tubes: List[bytearray], capacity: int) -> bool:
+    return next(move_gen.reverse_moves(tubes, capacity), None) is not None
+
+
+def scramble(n_color: int, n_color_in_tube: int, n_empty_tubes: int, steps: int, rng: random.Random,
+             settle: int = 100) -> Optional[Level]:
+    """
+        Walk steps random reverse pours back from a solved board, then at most settle more until every
+        tube is full or empty and the board is not solved, and shuffle the tubes and colors of the result.
+
+        Returns:
+            Tuple[List[List[int]], List[List[int]]]: The board and a plan solving it (the walk played
+            forwards, not necessarily the shortest one), or None if the walk got stuck or did not settle.
+    """
+    capacity = n_color_in_tube
+    tubes = [bytearray([color]) * capacity for color in range(n_color)]
+    tubes.extend(bytearray() for _ in range(n_empty_tubes))
+    walk: List[move_gen.Pour] = []
+    while len(walk) < steps + settle:
+        candidates = list(move_gen.reverse_moves(tubes, capacity))
+        rng.shuffle(candidates)
+        if len(walk) >= steps:
+            # Settling: try the reverse pours that leave the most tubes full or empty first.
+            candidates.sort(key=lambda move: -((len(tubes[move[0]]) + move[2] == capacity)
+                                               + (len(tubes[move[1]]) == move[2])))
+        chosen = None
+        for src, dst, count in candidates:
+            tubes[src] += tubes[dst][-count:]
+            del tubes[dst][-count:]
+            if (len(walk) + 1 >= steps and all(_full_or_empty(tube, capacity) for tube in tubes)
+                    and not move_gen.is_solved(tubes, capacity)):
+                walk.append((src, dst, count))
+                return _shuffled([bytes(tube) for tube in tubes], walk, n_color, rng)
+            # Look one step ahead so the walk does not step onto a board nothing can lead to.
+            if _has_predecessor(tubes, capacity):
+                chosen = (src, dst, count)
+                break
+            tubes[dst] += tubes[src][-count:]
+            del tubes[src][-count:]
+        if chosen is None:
+            return None
+        walk.append(chosen)
+    return None
+
+
+def _shuffled(board: List[bytes], walk: List[move_gen.Pour], n_color: int, rng: random.Random) -> Level:
+    """Permute the tubes and rename the colors of a scrambled board, and turn its walk into a plan."""
+    order = list(range(len(board)))
+    rng.shuffle(order)
+    # Deal the empty tubes last, like the game does.
+    order.sort(key=lambda tube: not board[tube])
+    position = {tube: index for index, tube in enumerate(order)}
+    names = list(range(n_color))
+    rng.shuffle(names)
+    table = bytearray(256)
+    for color, name in enumerate(names):
+        table[color] = name
+    tubes = [list(board[tube].translate(table)) for tube in order]
+    plan = [[position[src], position[dst]] for src, dst, _ in reversed(walk)]
+    return tubes, plan
+
+
+class LevelGenerator:
+    """
+        Generates solvable boards for one configuration, reproducibly from a seed.
+
+        Without a difficulty range every board comes straight from scramble (or a checked deal), which is
+        cheap. With one, every candidate is also solved optimally under max_nodes and only kept if its
+        optimal move count falls in the range; the plan returned is then the optimal one.
+
+        Attributes:
+            n_color (int): The number of colors.
+            n_color_in_tube (int): The capacity of a tube.
+            n_empty_tubes (int): The number of empty tubes.
+            moves (Tuple[int, int]): The accepted range of optimal move counts, inclusive, None for any.
+            steps (int): The length of the scramble walks, twice the number of units by default.
+            max_nodes (int): The node budget of every solver check.
+            attempts (int): The number of failed walks after which a checked deal is used instead. If no walk
+                has settled yet, only checked deals are used from then on.
+            time_limit (float): The maximum number of seconds a call to generate may run, None for no limit.
+            max_candidates (int): The maximum number of candidates a call to generate may try, None for no limit.
+            generated (int): The number of candidate boards produced so far.
+            rejected (int): The number of candidates dropped for their difficulty or an inconclusive check.
+    """
+    def __init__(self, n_color: int, n_color_in_tube: int, n_empty_tubes: int, seed=None,
+                 moves: Optional[Tuple[int, int]] = None, steps: Optional[int] = None, max_nodes: int = 20000,
+                 attempts: int = 20, time_limit: Optional[float] = None, max_candidates: Optional[int] = None):
+        """
+            Args:
+                n_color (int): The number of colors.
+                n_color_in_tube (int): The capacity of a tube.
+                n_empty_tubes (int): The number of empty tubes.
+                seed: Seed of the random generator, None for a random one.
+                moves (Tuple[int, int]): The accepted range of optimal move counts, inclusive.
+                steps (int): The length of the scramble walks.
+                max_nodes (int): The node budget of every solver check.
+                attempts (int): The number of failed walks after which a checked deal is used instead.
+                time_limit (float): The maximum number of seconds a call to generate may run.
+                max_candidates (int): The maximum number of candidates a call to generate may try.
+        """
+        # With a single color or single-unit tubes every board is solved, so there is nothing to generate.
+        if n_color < 2 or n_color_in_tube < 2 or n_empty_tubes < 0:
+            raise ValueError(f"invalid configuration: {(n_color, n_color_in_tube, n_empty_tubes)}")
+        self.n_color = n_color
+        self.n_color_in_tube = n_color_in_tube
+        self.n_empty_tubes = n_empty_tubes
+        self.moves = moves
+        self.steps = steps if steps is not None else 2 * n_color * n_color_in_tube
+        self.max_nodes = max_nodes
+        self.attempts = attempts
+        self.time_limit = time_limit
+        self.max_candidates = max_candidates
+        self.generated = 0
+        self.rejected = 0
+        self.__rng = random.Random(seed)
+        self.__scrambled = 0  # Number of walks that settled so far.
+        self.__scrambling = True
+        self.__deadline: Optional[float] = None  # time.monotonic() timestamp of the current generate call.
+
+    def __iter__(self) -> Iterator[Level]:
+        while True:
+            yield self.generate()
+
+    def __candidate(self) -> Optional[Level]:
+        if self.__scrambling:
+            for _ in range(self.attempts):
+                level = scramble(self.n_color, self.n_color_in_tube, self.n_empty_tubes, self.steps, self.__rng)
+                if level is not None:
+                    self.__scrambled += 1
+                    return level
+            self.__scrambling = self.__scrambled > 0
+        tubes = deal(self.n_color, self.n_color_in_tube, self.n_empty_tubes, self.__rng)
+        solver = self.__solver()
+        solver.solve(tubes, deadline=self.__deadline)
+        return (tubes, solver.moves) if solver.status == SolveStatus.SOLVED else None
+
+    def __config(self) -> Tuple[int, int, int]:
+        return self.n_color, self.n_color_in_tube, self.n_empty_tubes
+
+    def __solver(self) -> GameSolution:
+        return GameSolution(n_color=self.n_color, n_color_in_tube=self.n_color_in_tube,
+                            n_empty_tubes=self.n_empty_tubes, max_nodes=self.max_nodes)
+
+    def generate(self) -> Level:
+        """
+            Return a new solvable board and a plan solving it, optimal when a difficulty range is set.
+
+            Returns:
+                Tuple[List[List[int]], List[List[int]]]: The board and the plan.
+
+            Raises:
+                TimeoutError: If time_limit or max_candidates ran out first.
+        """
+        self.__deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+        candidates = 0
+        while True:
+            if self.max_candidates is not None and candidates >= self.max_candidates:
+                raise TimeoutError(f"no level of {self.__config()} among {candidates} candidates")
+            if self.__deadline is not None and time.monotonic() >= self.__deadline:
+                raise TimeoutError(f"no level of {self.__config()} within {self.time_limit}s")
+            candidates += 1
+            level = self.__candidate()
+            self.generated += 1
+            if level is None:
+                self.rejected += 1
+                continue
+            if self.moves is None:
+                return level
+            tubes, plan = level
+            lowest, highest = self.moves
+            # The known plan bounds the optimum from above and the heuristic from below, which settles
+            # many candidates without a search.
+            if len(plan) < lowest or heuristics.consolidate(packed.pack(tubes), self.n_color_in_tube) > highest:
+                self.rejected += 1
+                continue
+            solver = self.__solver()
+            solver.optimal_solve(tubes, deadline=self.__deadline)
+            if solver.status == SolveStatus.SOLVED and lowest <= len(solver.moves) <= highest:
+                return tubes, solver.moves
+            self.rejected += 1
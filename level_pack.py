@@ -0,0 +1,185 @@
+"""
+    Headless generation of level packs.
+
+    For every (NColor, NColorInTube, NEmptyTubes) configuration, a pool of worker processes generates
+    solvable boards with LevelGenerator and rates each one by the length of its optimal solution and the
+    number of states optimal_solve expanded to find it (the search effort). Boards are deduplicated by
+    canonical form (board.state_key with colors), so two levels never differ only by tube order or color
+    names, and sorted into difficulty buckets by their optimal move count.
+
+    Packs are written as JSONL, one level per line, or in a compact binary format (see write_binary).
+
+    Usage:
+        python level_pack.py --config 5 4 2 --config 8 4 2 --count 1000 -o pack.jsonl
+        python level_pack.py --config 6 4 2 --count 100000 --format binary -o pack.bin --bucket-edges 15 20 25
+"""
+import argparse
+import bisect
+import json
+import os
+import struct
+from multiprocessing import get_context
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import board as packed
+from ai_solution import GameSolution, SolveStatus
+from level_generator import LevelGenerator
+
+Config = Tuple[int, int, int]
+# Magic, format version and number of levels, then the levels back to back.
+HEADER = struct.Struct("<4sHI")
+MAGIC = b"WSPK"
+VERSION = 1
+# Per level: n_color, n_color_in_tube, n_empty_tubes, bucket, optimal move count, expanded states.
+LEVEL = struct.Struct("<BBBBHI")
+CHUNK = 64
+
+
+def rate(tubes: List[List[int]], config: Config, max_nodes: int) -> Optional[Tuple[List[List[int]], int]]:
+    """Return the optimal plan of a board and the number of states expanded to find it, None if the
+    node budget ran out first."""
+    solver = GameSolution(n_color=config[0], n_color_in_tube=config[1], n_empty_tubes=config[2], max_nodes=max_nodes)
+    solver.optimal_solve(tubes)
+    if solver.status != SolveStatus.SOLVED:
+        return None
+    return solver.moves, solver.nodes_expanded
+
+
+def _build_chunk(job: Tuple[Config, str, int, int, Optional[Tuple[int, int]]]) -> List[Dict]:
+    """Generate and rate count levels of one configuration from a seed, in a worker process."""
+    config, seed, count, max_nodes, moves = job
+    generator = LevelGenerator(*config, seed=seed, max_nodes=max_nodes)
+    levels = []
+    for _ in range(count):
+        tubes, _ = generator.generate()
+        rating = rate(tubes, config, max_nodes)
+        if rating is not None and (moves is None or moves[0] <= len(rating[0]) <= moves[1]):
+            levels.append({"config": list(config), "tubes": tubes, "moves": rating[0],
+                           "move_count": len(rating[0]), "nodes": rating[1]})
+    return levels
+
+
+def build_pack(configs: Iterable[Config], count: int, seed: int = 0, workers: int = 1, max_nodes: int = 20000,
+               moves: Optional[Tuple[int, int]] = None, bucket_edges: Iterable[int] = ()) -> Iterator[Dict]:
+    """
+        Yield count unique rated levels for every configuration, in a reproducible order for a given seed.
+
+        Args:
+            configs (Iterable[Tuple[int, int, int]]): (NColor, NColorInTube, NEmptyTubes) configurations.
+            count (int): The number of levels per configuration.
+            seed (int): Seed of the whole pack.
+            workers (int): The number of processes, 1 builds in the calling process.
+            max_nodes (int): The node budget of the optimal solve rating each level, levels exceeding it are dropped.
+            moves (Tuple[int, int]): Only keep levels whose optimal move count is in this inclusive range.
+            bucket_edges (Iterable[int]): Ascending optimal move counts starting a new difficulty bucket;
+                a level's bucket is the number of edges not above its move count.
+
+        Every level is a dict with config, tubes, moves (an optimal plan), move_count, nodes and bucket. No two
+        levels of a configuration are the same board up to tube order and color names.
+        A configuration with fewer distinct boards than count stops once a whole round of chunks finds
+        no new one.
+    """
+    edges = sorted(bucket_edges)
+    pool = get_context("spawn").Pool(workers) if workers > 1 else None
+    try:
+        for config in configs:
+            seen = set()
+            chunk = 0
+            while len(seen) < count:
+                # One round of chunks, enough to fill the configuration if there were no duplicates.
+                jobs = [(config, f"{seed}-{config}-{chunk + i}", CHUNK, max_nodes, moves)
+                        for i in range(max(workers, -(-(count - len(seen)) // CHUNK)))]
+                chunk += len(jobs)
+                results = pool.imap(_build_chunk, jobs) if pool is not None else map(_build_chunk, jobs)
+                found = len(seen)
+                for levels in results:
+                    for level in levels:
+                        key = packed.state_key(packed.pack(level["tubes"]), colors=True)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        level["bucket"] = bisect.bisect_right(edges, level["move_count"])
+                        yield level
+                        if len(seen) == count:
+                            break
+                    if len(seen) == count:
+                        break
+                if len(seen) == found:
+                    # A whole round without a new board: small configurations have few distinct boards.
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def write_binary(levels: Iterable[Dict], stream: BinaryIO) -> int:
+    """
+        Write levels in the binary pack format and return their number.
+
+        After the header every level is stored as the LEVEL fields, then every tube as its length followed by
+        its colors (one byte each, the number of tubes is NColor + NEmptyTubes), then the optimal plan as
+        (src, dst) byte pairs. The level count in the header is filled in once every level is written.
+    """
+    start = stream.tell()
+    stream.write(HEADER.pack(MAGIC, VERSION, 0))
+    written = 0
+    for level in levels:
+        config = level["config"]
+        stream.write(LEVEL.pack(config[0], config[1], config[2], level["bucket"], level["move_count"], level["nodes"]))
+        stream.write(b"".join(bytes([len(tube)]) + bytes(tube) for tube in level["tubes"]))
+        stream.write(bytes(tube for move in level["moves"] for tube in move))
+        written += 1
+    end = stream.tell()
+    stream.seek(start)
+    stream.write(HEADER.pack(MAGIC, VERSION, written))
+    stream.seek(end)
+    return written
+
+
+def read_binary(stream: BinaryIO) -> Iterator[Dict]:
+    """Yield the levels of a binary pack, as the dicts build_pack produces."""
+    magic, version, count = HEADER.unpack(stream.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} level pack")
+    for _ in range(count):
+        n_color, n_color_in_tube, n_empty_tubes, bucket, move_count, nodes = LEVEL.unpack(stream.read(LEVEL.size))
+        tubes = []
+        for _ in range(n_color + n_empty_tubes):
+            tubes.append(list(stream.read(stream.read(1)[0])))
+        plan = stream.read(2 * move_count)
+        yield {"config": [n_color, n_color_in_tube, n_empty_tubes], "tubes": tubes,
+               "moves": [[plan[i], plan[i + 1]] for i in range(0, len(plan), 2)],
+               "move_count": move_count, "nodes": nodes, "bucket": bucket}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", type=int, nargs=3, action="append", required=True,
+                        metavar=("NCOLOR", "CAPACITY", "EMPTY"), help="a configuration, may be repeated")
+    parser.add_argument("--count", type=int, default=100, help="levels per configuration")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=("jsonl", "binary"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-nodes", type=int, default=20000, help="node budget of the rating solve")
+    parser.add_argument("--moves", type=int, nargs=2, default=None, metavar=("MIN", "MAX"),
+                        help="optimal move count range of the levels")
+    parser.add_argument("--bucket-edges", type=int, nargs="*", default=[], help="move counts starting a bucket")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    levels = build_pack([tuple(config) for config in args.config], args.count, args.seed, args.workers,
+                        args.max_nodes, tuple(args.moves) if args.moves else None, args.bucket_edges)
+    if args.format == "binary":
+        with open(args.output, "wb") as stream:
+            written = write_binary(levels, stream)
+    else:
+        written = 0
+        with open(args.output, "w") as stream:
+            for level in levels:
+                stream.write(json.dumps(level) + "\n")
+                written += 1
+    print(f"{written} levels written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
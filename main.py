@@ -1,37 +1,34 @@
-import random
 from ai_solution import GameSolution
+from level_generator import LevelGenerator
+from solution_cache import SolutionCache
 
 def create_tubes() -> GameSolution.MotherTube:
-    tubes: GameSolution.MotherTube = []
-    numbers = [0, 0, 1, 1, 2, 2]
-    for _ in range(3):
-        tube: GameSolution.Tube = []
-        for _ in range(2):
-            index = random.randint(0, len(numbers) - 1)
-            tube.append(numbers[index])
-            numbers.pop(index)
-        tubes.append(tube)
-    tubes.append([])
+    tubes, _ = LevelGenerator(3, 2, 1).generate()
     return tubes
 
 
 if __name__ == "__main__":
     tubes = create_tubes()
     print(f"initial state of tubes: {tubes}")
+    cache = SolutionCache()
     solver = GameSolution()
-    solver.solve(tubes)
+    cache.solve(solver, tubes, "solve")
     optimal_solver = GameSolution()
-    optimal_solver.optimal_solve(tubes)
+    cache.solve(optimal_solver, tubes, "optimal_solve")
     print("*"*10, "water sort sovled", "*"*10)
     print("normal solve:")
     print(f"\tmoves_count: {len(solver.moves)}")
     print(f"\tmoves: {solver.moves}")
     print(f"\tlast_state: {solver.own_state}")
+    print(solver.stats)
     print("#"*30)
     print("optimal solve:")
     print(f"\tmoves_count: {len(optimal_solver.moves)}")
     print(f"\tmoves: {optimal_solver.moves}")
     print(f"\tlast_state: {optimal_solver.own_state}")
+    print(optimal_solver.stats)
+    print(f"cache: {cache.stats}")
+    cache.close()
     print("*"*30)
     
     
@@ -0,0 +1,154 @@
+from typing import Iterator, List, Optional, Tuple
+
+from board import Board, Tube
+
+# A pour is (source tube, destination tube, number of units moved).
+Pour = Tuple[int, int, int]
+
+
+def top_run(tube) -> int:
+    """Return the length of the contiguous run of the top color of a tube (0 for an empty tube)."""
+    size = len(tube)
+    if size == 0:
+        return 0
+    color = tube[-1]
+    run = 1
+    while run < size and tube[-1 - run] == color:
+        run += 1
+    return run
+
+
+def pour_amount(source, target, capacity: int) -> int:
+    """Return how many units pouring source into target moves, or 0 if the pour is not allowed.
+            The whole top run of the source is poured as long as the target has room, and the target
+            must either be empty or have the same color on top.
+    """
+    free = capacity - len(target)
+    if not source or free <= 0:
+        return 0
+    if target and target[-1] != source[-1]:
+        return 0
+    run = top_run(source)
+    return run if run < free else free
+
+
+def is_completed(tube: Tube, capacity: int) -> bool:
+    """Return True if the tube is full with a single color."""
+    return len(tube) == capacity and tube.count(tube[0]) == capacity
+
+
+def is_solved(board: Board, capacity: int) -> bool:
+    """Return True if every tube is either empty or completed."""
+    for tube in board:
+        if tube and not is_completed(tube, capacity):
+            return False
+    return True
+
+
+def legal_moves(board: Board, capacity: int, last: Optional[Pour] = None) -> Iterator[Pour]:
+    """
+        Yield every useful pour of a board.
+
+        Args:
+            board (Board): The packed board.
+            capacity (int): The number of units a tube holds.
+            last (Pour): The pour that produced this board, used to skip its exact reversal.
+
+        Moves that can never be part of a shortest solution are not generated:
+            - pouring out of a completed tube,
+            - pouring a single-colored tube into an empty tube, which only swaps two tubes,
+            - pouring into any empty tube but the first, since all empty tubes are interchangeable,
+            - pouring back the units the last pour moved, which restores the previous board.
+    """
+    first_empty = -1
+    for i, tube in enumerate(board):
+        if not tube:
+            first_empty = i
+            break
+    undo_src = undo_dst = -1
+    if last is not None:
+        undo_src, undo_dst = last[1], last[0]
+    for src, source in enumerate(board):
+        if not source:
+            continue
+        run = top_run(source)
+        uniform = run == len(source)
+        if uniform and run == capacity:
+            continue
+        color = source[-1]
+        for dst, target in enumerate(board):
+            if dst == src:
+                continue
+            if target:
+                free = capacity - len(target)
+                if free == 0 or target[-1] != color:
+                    continue
+                if src == undo_src and dst == undo_dst and run == last[2]:
+                    continue
+                yield src, dst, run if run < free else free
+            elif dst == first_empty and not uniform:
+                yield src, dst, run
+
+
+def reverse_moves(board: Board, capacity: int) -> Iterator[Pour]:
+    """
+        Yield every pour (src, dst, count) that can have produced the board, i.e. such that pouring src into
+        dst on pour(board, dst, src, count) moves exactly count units and gives back the board.
+
+        The count units must come off the top run of dst and go back on top of src. Conditions:
+            - dst kept its color below the poured units, so count is less than the top run of dst,
+              unless dst holds nothing else,
+            - src has room for them,
+            - if src already shows the same color, the pour only stopped after count units because dst
+              was full.
+    """
+    for dst, target in enumerate(board):
+        if not target:
+            continue
+        color = target[-1]
+        run = top_run(target)
+        if run == len(target):
+            most = run
+        elif run > 1:
+            most = run - 1
+        else:
+            continue
+        for src, source in enumerate(board):
+            room = capacity - len(source)
+            if src == dst or room <= 0:
+                continue
+            if source and source[-1] == color and len(target) != capacity:
+                continue
+            for count in range(1, (most if most < room else room) + 1):
+                yield src, dst, count
+
+
+def pour(board: Board, src: int, dst: int, count: int) -> Board:
+    """Return the board after moving count units from src to dst, sharing every untouched tube."""
+    tubes = list(board)
+    source = tubes[src]
+    tubes[dst] = tubes[dst] + source[-count:]
+    tubes[src] = source[:-count]
+    return tuple(tubes)
+
+
+def pour_in_place(tubes: List[List[int]], src: int, dst: int, capacity: int) -> int:
+    """Pour tube src into tube dst of a mutable board and return the number of units moved."""
+    if src == dst:
+        return 0
+    count = pour_amount(tubes[src], tubes[dst], capacity)
+    if count:
+        source = tubes[src]
+        tubes[dst].extend(source[-count:])
+        del source[-count:]
+    return count
+
+
+def replay(board: Board, plan: List[List[int]], capacity: int) -> Board:
+    """Return the board reached by playing the [src, dst] moves of plan, stopping at the first illegal one."""
+    for src, dst in plan:
+        count = pour_amount(board[src], board[dst], capacity) if src != dst else 0
+        if count == 0:
+            break
+        board = pour(board, src, dst, count)
+    return board
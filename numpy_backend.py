@@ -0,0 +1,202 @@
+"""
+    Vectorized boards for expanding many search nodes at once, on top of NumPy (optional dependency).
+
+    A batch of boards with the same number of tubes is stored as a (boards, tubes, capacity) uint8 array
+    holding every tube bottom first, padded with PADDING, and a (boards, tubes) array of fill heights.
+    Legal pours, the children they lead to, consolidate and the solved test are computed for the whole
+    batch in a handful of array operations instead of tube by tube in Python.
+
+    The results are exactly those of the pure Python path: legal_moves yields the pours of moves.legal_moves
+    in the same order, children are the boards moves.pour returns and consolidate is heuristics.consolidate.
+    Packing boards into arrays costs Python time per tube, so batches need to hold a few hundred boards
+    before this pays off. expand builds the children themselves with moves.pour, which only touches the
+    two tubes a pour changes, and uses the arrays for the legality tests and heuristic values.
+
+    Usage:
+        import numpy_backend
+        for board, children in zip(boards, numpy_backend.expand(boards, capacity)):
+            for pour, child, h_value in children:
+                ...
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import board as packed
+import moves as move_gen
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Fills the slots of a tube above its height. Colors are below 255 everywhere in the solver.
+PADDING = 0xFF
+# Children of one board: (pour, child board, consolidate of the child).
+Expansion = List[Tuple[move_gen.Pour, packed.Board, int]]
+
+
+def available() -> bool:
+    """Return True if NumPy can be imported."""
+    return np is not None
+
+
+def _require() -> None:
+    if np is None:
+        raise ImportError("the NumPy backend needs numpy, install it with: pip install numpy")
+
+
+class BoardBatch:
+    """
+        Boards with the same number of tubes and capacity, as arrays.
+
+        Attributes:
+            cells (numpy.ndarray): (boards, tubes, capacity) uint8 colors, bottom first, PADDING above the fill.
+            heights (numpy.ndarray): (boards, tubes) fill heights.
+            capacity (int): The capacity of a tube.
+    """
+    def __init__(self, cells, heights, capacity: int):
+        _require()
+        self.cells = cells
+        self.heights = heights
+        self.capacity = capacity
+        self.__slots = np.arange(capacity)
+        self.__tops = None
+        self.__runs = None
+
+    @classmethod
+    def from_boards(cls, boards: Sequence[packed.Board], capacity: int) -> "BoardBatch":
+        """Pack boards into a batch, raising ValueError unless they all have the same number of tubes."""
+        _require()
+        tubes = len(boards[0]) if boards else 0
+        if any(len(board) != tubes for board in boards):
+            raise ValueError("every board of a batch must have the same number of tubes")
+        padding = bytes([PADDING])
+        data = b"".join(tube.ljust(capacity, padding) for board in boards for tube in board)
+        cells = np.frombuffer(data, dtype=np.uint8).reshape(len(boards), tubes, capacity).copy()
+        heights = np.array([[len(tube) for tube in board] for board in boards], dtype=np.int16)
+        return cls(cells, heights.reshape(len(boards), tubes), capacity)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def boards(self) -> List[packed.Board]:
+        """Unpack the batch into packed boards."""
+        rows = self.cells.reshape(len(self.cells), -1).tobytes()
+        width = self.capacity
+        tubes = self.cells.shape[1]
+        heights = self.heights.tolist()
+        result = []
+        for index, fill in enumerate(heights):
+            starts = [(index * tubes + tube) * width for tube in range(tubes)]
+            result.append(tuple(rows[start:start + height] for start, height in zip(starts, fill)))
+        return result
+
+    def tops(self):
+        """(boards, tubes) top colors, PADDING for empty tubes."""
+        if self.__tops is None:
+            below = np.maximum(self.heights - 1, 0)[..., None]
+            top = np.take_along_axis(self.cells, below.astype(np.intp), axis=-1)[..., 0]
+            self.__tops = np.where(self.heights > 0, top, PADDING).astype(np.uint8)
+        return self.__tops
+
+    def top_runs(self):
+        """(boards, tubes) lengths of the top runs, as moves.top_run."""
+        if self.__runs is None:
+            filled = self.__slots < self.heights[..., None]
+            other = (self.cells != self.tops()[..., None]) & filled
+            last_other = np.where(other, self.__slots, -1).max(axis=-1)
+            self.__runs = (self.heights - 1 - last_other).astype(np.int16)
+        return self.__runs
+
+    def consolidate(self):
+        """(boards,) values of heuristics.consolidate."""
+        filled = self.__slots[1:] < self.heights[..., None]
+        upper_runs = ((self.cells[..., 1:] != self.cells[..., :-1]) & filled).sum(axis=(1, 2))
+        bottoms = np.sort(self.cells[..., 0], axis=1)
+        present = bottoms != PADDING
+        distinct = present[:, 0] + (present[:, 1:] & (bottoms[:, 1:] != bottoms[:, :-1])).sum(axis=1)
+        return upper_runs + (self.heights > 0).sum(axis=1) - distinct
+
+    def solved(self):
+        """(boards,) results of moves.is_solved."""
+        done = (self.heights == 0) | ((self.heights == self.capacity) & (self.top_runs() == self.capacity))
+        return done.all(axis=1)
+
+    def legal_moves(self, lasts: Optional[Sequence[Optional[move_gen.Pour]]] = None):
+        """
+            Return the pours of moves.legal_moves for every board, as four arrays (board index, src, dst,
+            count) in the order moves.legal_moves yields them, board by board.
+
+            Args:
+                lasts (Sequence[Pour]): The pour that produced every board, None where there is none.
+        """
+        heights = self.heights
+        runs = self.top_runs()
+        tops = self.tops()
+        capacity = self.capacity
+        tubes = heights.shape[1]
+        uniform = runs == heights
+        empty = heights == 0
+        sources = ~empty & ~(uniform & (runs == capacity))
+        # Into a non-empty tube: room left and the same color on top.
+        joins = ((~empty & (heights < capacity))[:, None, :]) & (tops[:, :, None] == tops[:, None, :])
+        # Into the first empty tube only, and never a single-colored tube.
+        first_empty = np.zeros_like(empty)
+        has_empty = empty.any(axis=1)
+        first_empty[np.arange(len(heights)), empty.argmax(axis=1)] = has_empty
+        into_empty = first_empty[:, None, :] & ~uniform[:, :, None]
+        allowed = sources[:, :, None] & (joins | into_empty) & ~np.eye(tubes, dtype=bool)[None]
+        if lasts is not None:
+            last = np.array([pour if pour is not None else (-1, -1, -1) for pour in lasts], dtype=np.int16)
+            src_index = np.arange(tubes)[None, :, None]
+            dst_index = np.arange(tubes)[None, None, :]
+            # Pouring back what the last pour moved restores the previous board.
+            undo = ((src_index == last[:, 1, None, None]) & (dst_index == last[:, 0, None, None])
+                    & (runs[:, :, None] == last[:, 2, None, None]) & ~empty[:, None, :])
+            allowed &= ~undo
+        index, src, dst = np.nonzero(allowed)
+        count = np.minimum(runs[index, src], capacity - heights[index, dst])
+        return index, src, dst, count
+
+    def children(self, index, src, dst, count) -> "BoardBatch":
+        """Return the batch of boards reached by pouring count units from src to dst on board index."""
+        cells = self.cells[index]
+        heights = self.heights[index].copy()
+        rows = np.arange(len(index))
+        color = self.tops()[index, src]
+        src_height = heights[rows, src][:, None]
+        dst_height = heights[rows, dst][:, None]
+        moved = count.astype(np.int16)[:, None]
+        slots = self.__slots[None, :]
+        cells[rows, src] = np.where((slots >= src_height - moved) & (slots < src_height), PADDING, cells[rows, src])
+        cells[rows, dst] = np.where((slots >= dst_height) & (slots < dst_height + moved), color[:, None],
+                                    cells[rows, dst])
+        heights[rows, src] -= moved[:, 0]
+        heights[rows, dst] += moved[:, 0]
+        return BoardBatch(cells, heights, self.capacity)
+
+
+def expand(boards: Sequence[packed.Board], capacity: int,
+           lasts: Optional[Sequence[Optional[move_gen.Pour]]] = None) -> List[Expansion]:
+    """
+        Expand a batch of boards: for every board, the (pour, child, consolidate of the child) of each of its
+        legal pours, in moves.legal_moves order.
+
+        Args:
+            boards (Sequence[Board]): Boards with the same number of tubes.
+            capacity (int): The capacity of a tube.
+            lasts (Sequence[Pour]): The pour that produced every board, None where there is none.
+    """
+    result: List[Expansion] = [[] for _ in boards]
+    if not boards:
+        return result
+    batch = BoardBatch.from_boards(boards, capacity)
+    index, src, dst, count = batch.legal_moves(lasts)
+    if not len(index):
+        return result
+    values = batch.children(index, src, dst, count).consolidate().tolist()
+    # A child only differs from its board by two tubes: pouring the bytes is cheaper than unpacking its arrays.
+    pour = move_gen.pour
+    for parent, src_tube, dst_tube, moved, h_value in zip(index.tolist(), src.tolist(), dst.tolist(),
+                                                          count.tolist(), values):
+        result[parent].append(((src_tube, dst_tube, moved), pour(boards[parent], src_tube, dst_tube, moved), h_value))
+    return result
@@ -0,0 +1,366 @@
+"""
+    Multi-core solving.
+
+    Two ways of spending several cores on one board:
+
+    * A portfolio runs different GameSolution strategies (DFS, A* with several heuristics, IDA*) in
+      parallel processes and keeps the first or the best result.
+    * Hash-distributed A* (HDA*) splits a single A* search over worker processes. Every state belongs to
+      the worker picked by a hash of its canonical key, so each worker owns its own share of the open
+      and closed sets, and generated states are sent to their owner. The workers advance in bulk-synchronous
+      supersteps: in each one, every worker expands its open states with f up to the global lowest f, and
+      the coordinator then forwards the states generated for other workers.
+"""
+import time
+import zlib
+from collections import Counter
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import board as packed
+import heuristics
+import moves as move_gen
+from ai_solution import GameSolution, SolveStatus
+from pq import PQ
+from solver_worker import SolverWorker
+
+Strategy = Tuple[str, Dict]
+# A node sent between processes: (board, g, h, path). The path packs every pour as 3 bytes (src, dst, count).
+Message = Tuple[packed.Board, int, int, bytes]
+
+PORTFOLIO: List[Strategy] = [
+    ("solve", {}),
+    ("optimal_solve", {"heuristic": "consolidate"}),
+    ("optimal_solve", {"heuristic": "mixed_tubes"}),
+    ("ida_solve", {"table_size": 100000}),
+]
+
+
+def partition(key: packed.Board, workers: int) -> int:
+    """Return the worker owning a state key.
+    Python's own hash of bytes is salted per process, so a stable checksum is used instead."""
+    return zlib.crc32(b"\xff".join(key)) % workers
+
+
+def _f_compare(prev, next) -> bool:
+    prev_f = prev[1][0] + prev[1][1]
+    next_f = next[1][0] + next[1][1]
+    # On equal f prefer the deeper node, it is closer to a goal.
+    return prev_f < next_f or (prev_f == next_f and prev[1][0] > next[1][0])
+
+
+def _hda_worker(index: int, workers: int, capacity: int, heuristic: str, symmetry: Optional[str], connection) -> None:
+    """
+        Entry point of an HDA* worker process.
+
+        Every superstep the coordinator sends (bound, batch, incoming nodes). The worker adds the nodes it has
+        not reached more cheaply yet to its open list, expands up to batch open nodes with f <= bound, and
+        replies with the nodes generated for each other worker, its lowest open f (None if empty), the goal
+        it popped (path, board) or None, and its counters and best partial result. None stops the worker.
+    """
+    h = heuristics.get(heuristic)
+    closed: Dict[packed.Board, int] = {}  # Lowest g seen of every owned state key.
+    frontier = PQ(_f_compare)
+    best: Optional[Tuple[int, int, bytes, packed.Board]] = None  # (h, g, path, board) of the best expanded node.
+    pruned = 0
+
+    def state_key(tubes: packed.Board) -> packed.Board:
+        return tubes if symmetry is None else packed.state_key(tubes, symmetry == "colors")
+
+    def add(node: Message, key: packed.Board) -> None:
+        nonlocal pruned
+        tubes, g, h_value, path = node
+        seen_g = closed.get(key)
+        if seen_g is not None and seen_g <= g:
+            pruned += 1
+            return
+        closed[key] = g
+        entry = (tubes, (g, h_value), path)
+        if key in frontier:
+            frontier.update(entry, key)
+        else:
+            frontier.push_back(entry, key)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        bound, batch, incoming = message
+        for node in incoming:
+            add(node, state_key(node[0]))
+        outgoing: List[List[Message]] = [[] for _ in range(workers)]
+        goal = None
+        expanded = 0
+        while expanded < batch and not frontier.is_empty():
+            tubes, (g, h_value), path = frontier.peek()
+            if g + h_value > bound:
+                break
+            frontier.pop_back()
+            if move_gen.is_solved(tubes, capacity):
+                goal = (path, tubes)
+                break
+            expanded += 1
+            if best is None or (h_value, g) < best[:2]:
+                best = (h_value, g, path, tubes)
+            last_pour = tuple(path[-3:]) if path else None
+            for pour in move_gen.legal_moves(tubes, capacity, last_pour):
+                child = move_gen.pour(tubes, *pour)
+                key = state_key(child)
+                node = (child, g + 1, h(child, capacity), path + bytes(pour))
+                owner = partition(key, workers)
+                if owner == index:
+                    add(node, key)
+                else:
+                    outgoing[owner].append(node)
+        lowest_f = None
+        if not frontier.is_empty():
+            top = frontier.peek()
+            lowest_f = top[1][0] + top[1][1]
+        connection.send((outgoing, lowest_f, goal, expanded, pruned, len(closed) + len(frontier), best))
+
+
+class ParallelSolution:
+    """
+        Solves a board on several processes, with the same result attributes as GameSolution.
+
+        Attributes:
+            workers (int): The number of processes a solve may use.
+            NColor (int): The number of unique colors on the board, inferred from the board if None.
+            NColorInTube (int): The capacity of a tube, inferred from the board if None.
+            NEmptyTubes (int): The number of initially empty tubes, inferred from the board if None.
+            max_nodes (int): The maximum number of states a solve may expand over all processes.
+            time_limit (float): The maximum number of seconds a solve may run, None for no limit.
+            symmetry (str): None, "tubes" or "colors", see GameSolution.
+            moves (List[List[int]]): The plan of the last solve (the best partial one unless it is solved).
+            solution_found (bool): True if the last solve found a solution.
+            status (SolveStatus): The outcome of the last solve.
+            own_state (List[List[int]]): The board reached by playing moves.
+            winner (str): The portfolio strategy whose result was kept, e.g. "optimal_solve(heuristic=consolidate)".
+            nodes_expanded (int): The number of states expanded by all processes.
+            duplicates_pruned (int): The number of received states discarded as already reached (HDA*).
+            peak_nodes_stored (int): The largest number of states held by all HDA* workers together.
+            worker_nodes (List[int]): The number of states expanded by each HDA* worker, to judge the load balance.
+            supersteps (int): The number of HDA* supersteps of the last solve.
+    """
+    BATCH: int = 64
+
+    def __init__(self, workers: int = 4, n_color: Optional[int] = None, n_color_in_tube: Optional[int] = None,
+                 n_empty_tubes: Optional[int] = None, max_nodes: int = GameSolution.MAX_NODES,
+                 time_limit: Optional[float] = None, symmetry: Optional[str] = "tubes"):
+        """
+            Args:
+                workers (int): The number of processes a solve may use.
+                n_color (int): The number of unique colors.
+                n_color_in_tube (int): The capacity of a tube.
+                n_empty_tubes (int): The number of empty tubes.
+                max_nodes (int): The maximum number of states a solve may expand over all processes.
+                time_limit (float): The maximum number of seconds a solve may run, None for no limit.
+                symmetry (str): None, "tubes" or "colors", see GameSolution.
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        if symmetry not in (None, "tubes", "colors"):
+            raise ValueError(f"unknown symmetry: {symmetry}")
+        self.workers = workers
+        self.NColor = n_color
+        self.NColorInTube = n_color_in_tube
+        self.NEmptyTubes = n_empty_tubes
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.symmetry = symmetry
+        self.moves = []
+        self.solution_found = False
+        self.status: Optional[SolveStatus] = None
+        self.own_state = []
+        self.winner = ""
+        self.nodes_expanded = 0
+        self.duplicates_pruned = 0
+        self.peak_nodes_stored = 0
+        self.worker_nodes: List[int] = []
+        self.supersteps = 0
+
+    def __begin(self, current_state: GameSolution.MotherTube) -> packed.Board:
+        tubes = packed.pack(current_state)
+        counts = Counter(b"".join(tubes))
+        if self.NColor is None:
+            self.NColor = len(counts)
+        if self.NColorInTube is None:
+            self.NColorInTube = max(counts.values()) if counts else 0
+        if self.NEmptyTubes is None:
+            self.NEmptyTubes = len(tubes) - self.NColor
+        self.moves = []
+        self.solution_found = False
+        self.status = None
+        self.own_state = packed.unpack(tubes)
+        self.winner = ""
+        self.nodes_expanded = 0
+        self.duplicates_pruned = 0
+        self.peak_nodes_stored = 0
+        self.worker_nodes = [0] * self.workers
+        self.supersteps = 0
+        return tubes
+
+    def __finish(self, status: SolveStatus, moves: List[List[int]], final_state: packed.Board) -> None:
+        self.status = status
+        self.solution_found = status == SolveStatus.SOLVED
+        self.moves = moves
+        self.own_state = packed.unpack(final_state)
+
+    def __settings(self) -> Dict:
+        return {"n_color": self.NColor, "n_color_in_tube": self.NColorInTube, "n_empty_tubes": self.NEmptyTubes,
+                "max_nodes": self.max_nodes, "time_limit": self.time_limit, "symmetry": self.symmetry}
+
+    def portfolio_solve(self, current_state: GameSolution.MotherTube, strategies: Optional[List[Strategy]] = None,
+                        best: bool = False) -> bool:
+        """
+            Run several GameSolution strategies at once, at most self.workers of them at a time.
+
+            Args:
+                current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                strategies (List[Tuple[str, dict]]): (method, keyword arguments) pairs, PORTFOLIO if omitted.
+                best (bool): Wait for every strategy and keep the shortest plan, instead of stopping
+                    the others as soon as one strategy solves the board or proves it unsolvable.
+
+            When no strategy solves the board, the result of the first strategy is kept.
+
+            Returns:
+                bool: True if a solution is found.
+        """
+        tubes = self.__begin(current_state)
+        strategies = PORTFOLIO if strategies is None else strategies
+        pending = list(enumerate(strategies))
+        running: List[Tuple[int, SolverWorker]] = []
+        finished: Dict[int, SolverWorker] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    number, (method, options) = pending.pop(0)
+                    running.append((number, SolverWorker(method, packed.unpack(tubes), options,
+                                                         **self.__settings()).start()))
+                still_running = []
+                for number, worker in running:
+                    if worker.poll():
+                        finished[number] = worker
+                        self.nodes_expanded += worker.nodes
+                    else:
+                        still_running.append((number, worker))
+                running = still_running
+                decided = any(worker.status in (SolveStatus.SOLVED, SolveStatus.UNSOLVABLE)
+                              for worker in finished.values())
+                if decided and not best:
+                    break
+                time.sleep(0.005)
+        finally:
+            for _, worker in running:
+                worker.terminate()
+
+        solved = [number for number in sorted(finished) if finished[number].status == SolveStatus.SOLVED]
+        unsolvable = [number for number in sorted(finished) if finished[number].status == SolveStatus.UNSOLVABLE]
+        if solved:
+            number = min(solved, key=lambda n: len(finished[n].moves))
+        elif unsolvable:
+            number = unsolvable[0]
+        else:
+            number = min(finished, default=None)
+        if number is None or finished[number].status is None:
+            self.__finish(SolveStatus.BUDGET_EXHAUSTED, [], tubes)
+            return False
+        worker = finished[number]
+        method, options = strategies[number]
+        self.winner = f"{method}({', '.join(f'{name}={value}' for name, value in options.items())})"
+        self.__finish(worker.status, worker.moves, move_gen.replay(tubes, worker.moves, self.NColorInTube))
+        return self.solution_found
+
+    def hda_solve(self, current_state: GameSolution.MotherTube, heuristic: str = heuristics.DEFAULT,
+                  batch: int = BATCH) -> bool:
+        """
+            Find an optimal solution with hash-distributed A* over self.workers processes.
+
+            Args:
+                current_state (List[List[int]]): A list of lists representing the colors in each tube.
+                heuristic (str): The name of the heuristic, the plan is only guaranteed optimal with a
+                    consistent one such as the default.
+                batch (int): The maximum number of states a worker expands per superstep.
+
+            Each superstep only expands states with f up to the lowest f over all open lists and all
+            states in transit, so with a consistent heuristic the first goal popped is optimal, exactly
+            as in GameSolution.optimal_solve. The node and time budget are checked between supersteps,
+            so they may be overshot by up to one superstep.
+
+            Returns:
+                bool: True if a solution is found.
+        """
+        h = heuristics.get(heuristic)
+        tubes = self.__begin(current_state)
+        capacity = self.NColorInTube
+        if move_gen.is_solved(tubes, capacity):
+            self.__finish(SolveStatus.SOLVED, [], tubes)
+            return True
+        deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+        context = get_context("spawn")
+        connections = []
+        processes = []
+        for index in range(self.workers):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_hda_worker, daemon=True,
+                                      args=(index, self.workers, capacity, heuristic, self.symmetry, child_end))
+            process.start()
+            connections.append(parent_end)
+            processes.append(process)
+
+        start_key = tubes if self.symmetry is None else packed.state_key(tubes, self.symmetry == "colors")
+        inboxes: List[List[Message]] = [[] for _ in range(self.workers)]
+        inboxes[partition(start_key, self.workers)].append((tubes, 0, h(tubes, capacity), b""))
+        bound = h(tubes, capacity)
+        best = (bound, 0, b"", tubes)
+        try:
+            while True:
+                if self.nodes_expanded >= self.max_nodes or (deadline is not None and time.monotonic() > deadline):
+                    self.__finish(SolveStatus.BUDGET_EXHAUSTED, _path_moves(best[2]), best[3])
+                    break
+                for connection, inbox in zip(connections, inboxes):
+                    connection.send((bound, batch, inbox))
+                self.supersteps += 1
+                inboxes = [[] for _ in range(self.workers)]
+                lowest: List[int] = []
+                goals = []
+                stored = 0
+                self.duplicates_pruned = 0
+                for index, connection in enumerate(connections):
+                    outgoing, lowest_f, goal, expanded, pruned, size, worker_best = connection.recv()
+                    for owner, nodes in enumerate(outgoing):
+                        inboxes[owner].extend(nodes)
+                        lowest.extend(node[1] + node[2] for node in nodes)
+                    if lowest_f is not None:
+                        lowest.append(lowest_f)
+                    if goal is not None:
+                        goals.append(goal)
+                    self.nodes_expanded += expanded
+                    self.worker_nodes[index] += expanded
+                    self.duplicates_pruned += pruned  # Each worker reports its running total.
+                    stored += size
+                    if worker_best is not None and worker_best[:2] < best[:2]:
+                        best = worker_best
+                self.peak_nodes_stored = max(self.peak_nodes_stored, stored + sum(map(len, inboxes)))
+                if goals:
+                    path, final_state = min(goals, key=lambda goal: len(goal[0]))
+                    self.__finish(SolveStatus.SOLVED, _path_moves(path), final_state)
+                    break
+                if not lowest:
+                    self.__finish(SolveStatus.UNSOLVABLE, [], tubes)
+                    break
+                bound = min(lowest)
+        finally:
+            for connection in connections:
+                connection.send(None)
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+        return self.solution_found
+
+
+def _path_moves(path: bytes) -> List[List[int]]:
+    """Turn a packed path of (src, dst, count) byte triples into [src, dst] moves."""
+    return [[path[i], path[i + 1]] for i in range(0, len(path), 3)]
+
@@ -0,0 +1,339 @@
+"""
+    Pattern databases: exact distances of abstracted boards, precomputed per configuration.
+
+    A board is abstracted by keeping the colors of a small group and replacing every other color by a
+    wildcard. Wildcard units pour like a color of their own, except that a run of them may be split
+    (a wildcard run can hide several real colors, of which a pour only moves the top one) and they never
+    land on a kept color. Every real pour is therefore also a pour of the abstraction, and the distance
+    of an abstracted board to the abstract goal (every kept color completed, wildcards anywhere) never
+    exceeds the real number of pours left.
+
+    The builder enumerates, for one (NColor, NColorInTube, NEmptyTubes) configuration, every abstract
+    board that can reach the goal with a breadth first search over reverse pours, and writes the
+    distances as sorted fixed-width records. A database is memory-mapped when loaded and looked up by
+    binary search, so even a large one costs no load time and is shared by every process reading it.
+
+    Two ways of combining the lookups, fixed when building:
+        - additive: pours of wildcards are free, so a distance only counts pours of the group's own colors.
+          The colors are split into disjoint groups and their distances summed.
+        - max: every pour costs one and the largest distance over the groups is used.
+    Either way the result is admissible, and the "pdb" heuristic also takes the max with consolidate.
+
+    The abstract state space grows quickly with the capacity and the group size: single colors of
+    capacity 4 take a few thousand records, groups of two about a million.
+
+    Usage:
+        python pattern_db.py --config 5 4 2 --config 6 4 2
+        python pattern_db.py --config 4 4 2 --group 2 --mode max -o pdb/4-4-2-max.pdb
+"""
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import board as packed
+import heuristics
+
+Config = Tuple[int, int, int]
+WILDCARD = 0xFF
+# Fills a record up to the capacity of its tube, sorts after every color.
+PADDING = 0xFE
+_PAD = bytes([PADDING])
+# Distance of an abstract board that cannot reach the goal, hence of an unsolvable board.
+UNREACHABLE = 0xFF
+# Magic, format version, n_color, n_color_in_tube, n_empty_tubes, additive and number of tables.
+HEADER = struct.Struct("<4sHBBBBB")
+# Per table: the group size and the number of records, then the records.
+TABLE = struct.Struct("<BI")
+MAGIC = b"WSPD"
+VERSION = 1
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdb")
+
+
+def default_path(config: Config) -> str:
+    """Return the file the "pdb" heuristic loads for a configuration."""
+    return os.path.join(DIRECTORY, "{}-{}-{}.pdb".format(*config))
+
+
+def group_sizes(n_color: int, group: int) -> List[int]:
+    """Return the size of every color group a board of n_color colors is split into."""
+    sizes = [group] * (n_color // group)
+    if n_color % group:
+        sizes.append(n_color % group)
+    return sizes
+
+
+def _partitions(units: int, tubes: int, capacity: int) -> Iterator[List[int]]:
+    """Yield every way of spreading units over tubes of a capacity, as non-increasing fill levels."""
+    if tubes == 0:
+        if units == 0:
+            yield []
+        return
+    for level in range(min(capacity, units), -1, -1):
+        if level * tubes < units:
+            break
+        for rest in _partitions(units - level, tubes - 1, level):
+            yield [level] + rest
+
+
+def _goals(group: int, config: Config) -> Iterator[packed.Board]:
+    """Yield every abstract goal: each kept color completed, the wildcards spread over the other tubes."""
+    n_color, capacity, n_empty = config
+    completed = [bytes([color]) * capacity for color in range(group)]
+    for levels in _partitions((n_color - group) * capacity, n_color - group + n_empty, capacity):
+        yield packed.canonical(tuple(completed + [bytes([WILDCARD]) * level for level in levels]))
+
+
+def _predecessors(board: packed.Board, capacity: int) -> Iterator[Tuple[packed.Board, bool]]:
+    """
+        Yield every abstract board one pour away from board, and whether that pour moved wildcards.
+
+        Same conditions as moves.reverse_moves, except that a wildcard pour may have moved any part of the
+        run below it, so it never needs dst to have been full.
+    """
+    for dst, target in enumerate(board):
+        if not target:
+            continue
+        color = target[-1]
+        run = len(target) - len(target.rstrip(target[-1:]))
+        if run == len(target):
+            most = run
+        elif run > 1:
+            most = run - 1
+        else:
+            continue
+        wildcard = color == WILDCARD
+        for src, source in enumerate(board):
+            room = capacity - len(source)
+            if src == dst or room <= 0:
+                continue
+            if not wildcard and source and source[-1] == color and len(target) != capacity:
+                continue
+            for count in range(1, (most if most < room else room) + 1):
+                tubes = list(board)
+                tubes[src] = source + target[-count:]
+                tubes[dst] = target[:-count]
+                yield packed.canonical(tuple(tubes)), wildcard
+
+
+def build_table(group: int, config: Config, additive: bool = True) -> Dict[packed.Board, int]:
+    """
+        Return the distance to the goal of every abstract board of a configuration that can reach it.
+
+        Args:
+            group (int): The number of kept colors, named 0 to group - 1.
+            config (Tuple[int, int, int]): (NColor, NColorInTube, NEmptyTubes).
+            additive (bool): Do not count pours of wildcards, with a 0-1 breadth first search.
+    """
+    capacity = config[1]
+    distances: Dict[packed.Board, int] = {}
+    queue = deque()
+    for goal in _goals(group, config):
+        distances[goal] = 0
+        queue.append(goal)
+    while queue:
+        state = queue.popleft()
+        distance = distances[state]
+        for previous, wildcard in _predecessors(state, capacity):
+            free = additive and wildcard
+            step = distance if free else distance + 1
+            if step < distances.get(previous, UNREACHABLE):
+                distances[previous] = step
+                if free:
+                    queue.appendleft(previous)
+                else:
+                    queue.append(previous)
+    return distances
+
+
+def _record_key(board: packed.Board, capacity: int) -> bytes:
+    """Return the fixed-width record key of a canonical abstract board."""
+    return b"".join(tube.ljust(capacity, _PAD) for tube in board)
+
+
+def build(config: Config, group: int = 1, additive: bool = True, path: Optional[str] = None) -> str:
+    """
+        Build the database of a configuration and write it to path, default_path(config) by default.
+
+        Returns:
+            str: The path written.
+    """
+    n_color, capacity, n_empty = config
+    if not 1 <= group <= n_color:
+        raise ValueError(f"group size must be between 1 and {n_color}, got {group}")
+    if max(capacity, n_color + n_empty) >= PADDING:
+        raise ValueError(f"configuration too large for a pattern database: {config}")
+    path = path or default_path(config)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Combined by max, a smaller last group is never looked up (see PatternDatabase.__call__).
+    sizes = sorted(set(group_sizes(n_color, group)), reverse=True) if additive else [group]
+    with open(path, "wb") as stream:
+        stream.write(HEADER.pack(MAGIC, VERSION, n_color, capacity, n_empty, additive, len(sizes)))
+        for size in sizes:
+            distances = build_table(size, config, additive)
+            records = sorted(_record_key(state, capacity) + bytes([distance])
+                             for state, distance in distances.items())
+            stream.write(TABLE.pack(size, len(records)))
+            stream.write(b"".join(records))
+    return path
+
+
+class _Records:
+    """The keys of a table of records in a buffer, as a sorted sequence for bisect."""
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int, width: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.width = width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self.offset + index * (self.width + 1)
+        return self.buffer[start:start + self.width]
+
+    def distance(self, key: bytes) -> int:
+        index = bisect.bisect_left(self, key)
+        if index == self.count or self[index] != key:
+            return UNREACHABLE
+        return self.buffer[self.offset + index * (self.width + 1) + self.width]
+
+
+class PatternDatabase:
+    """
+        A pattern database file, memory-mapped, usable as a heuristic.
+
+        Attributes:
+            path (str): The database file.
+            config (Tuple[int, int, int]): The (NColor, NColorInTube, NEmptyTubes) configuration it covers.
+            group (int): The size of the color groups.
+            additive (bool): True if the group distances are summed, False if their max is used.
+            records (int): The number of abstract boards stored.
+            cache_size (int): The maximum number of lookups remembered in memory.
+    """
+    def __init__(self, path: str, cache_size: int = 1 << 16):
+        """
+            Args:
+                path (str): A file written by build.
+                cache_size (int): The maximum number of lookups remembered in memory.
+        """
+        self.path = path
+        self.cache_size = cache_size
+        with open(path, "rb") as stream:
+            self.__buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_color, capacity, n_empty, additive, count = HEADER.unpack_from(self.__buffer)
+        if magic != MAGIC or version != VERSION:
+            self.__buffer.close()
+            raise ValueError(f"{path} is not a version {VERSION} pattern database")
+        self.config = (n_color, capacity, n_empty)
+        self.additive = bool(additive)
+        self.__tables: Dict[int, _Records] = {}
+        width = capacity * (n_color + n_empty)
+        offset = HEADER.size
+        for _ in range(count):
+            size, records = TABLE.unpack_from(self.__buffer, offset)
+            offset += TABLE.size
+            self.__tables[size] = _Records(self.__buffer, offset, records, width)
+            offset += records * (width + 1)
+        self.group = max(self.__tables)
+        self.records = sum(len(table) for table in self.__tables.values())
+        self.__cache: Dict[bytes, int] = {}
+
+    def __enter__(self) -> "PatternDatabase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__buffer.close()
+
+    def covers(self, board: packed.Board, capacity: int) -> bool:
+        """Return True if the board has the configuration of the database."""
+        n_color = len(set(b"".join(board)))
+        return (n_color, capacity, len(board) - n_color) == self.config
+
+    def distance(self, board: packed.Board, colors: Tuple[int, ...]) -> int:
+        """Return the distance of the board abstracted to a group of colors, UNREACHABLE if it cannot be solved."""
+        table = bytearray([WILDCARD]) * 256
+        for name, color in enumerate(colors):
+            table[color] = name
+        key = _record_key(packed.canonical(tuple(tube.translate(table) for tube in board)), self.config[1])
+        distance = self.__cache.get(key)
+        if distance is None:
+            distance = self.__tables[len(colors)].distance(key)
+            if len(self.__cache) >= self.cache_size:
+                self.__cache.clear()
+            self.__cache[key] = distance
+        return distance
+
+    def __call__(self, board: packed.Board, capacity: int) -> int:
+        """The heuristic: the combined group distances, at least consolidate. Boards of another
+        configuration only get consolidate."""
+        bound = heuristics.consolidate(board, capacity)
+        if not self.covers(board, capacity):
+            return bound
+        colors = sorted(set(b"".join(board)))
+        distances = []
+        start = 0
+        for size in group_sizes(len(colors), self.group):
+            if self.additive:
+                distances.append(self.distance(board, tuple(colors[start:start + size])))
+            else:
+                # Groups may overlap when combined by max, so the last one is filled up instead.
+                distances.append(self.distance(board, tuple(colors[min(start, len(colors) - self.group):][:self.group])))
+            start += size
+        if UNREACHABLE in distances:
+            return UNREACHABLE
+        combined = sum(distances) if self.additive else max(distances)
+        return combined if combined > bound else bound
+
+
+_databases: Dict[Config, Optional[PatternDatabase]] = {}
+
+
+def install(database: PatternDatabase) -> None:
+    """Make the "pdb" heuristic use a database for its configuration, instead of the default file."""
+    _databases[database.config] = database
+
+
+def lookup(board: packed.Board, capacity: int) -> int:
+    """
+        The "pdb" heuristic: the database of the board's configuration, loaded from default_path on first
+        use, or consolidate when there is none.
+    """
+    n_color = len(set(b"".join(board)))
+    config = (n_color, capacity, len(board) - n_color)
+    if config not in _databases:
+        path = default_path(config)
+        _databases[config] = PatternDatabase(path) if os.path.exists(path) else None
+    database = _databases[config]
+    return database(board, capacity) if database is not None else heuristics.consolidate(board, capacity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", type=int, nargs=3, action="append", required=True,
+                        metavar=("NCOLOR", "CAPACITY", "EMPTY"), help="a configuration, may be repeated")
+    parser.add_argument("--group", type=int, default=1, help="number of colors kept by an abstraction")
+    parser.add_argument("--mode", choices=("additive", "max"), default="additive")
+    parser.add_argument("-o", "--output", default=None, help="output file, only with a single --config")
+    args = parser.parse_args()
+    if args.output and len(args.config) > 1:
+        parser.error("-o needs a single --config")
+
+    for config in args.config:
+        start = time.perf_counter()
+        path = build(tuple(config), args.group, args.mode == "additive", args.output)
+        with PatternDatabase(path) as database:
+            print(f"{tuple(config)}: {database.records} records, {os.path.getsize(path)} bytes, "
+                  f"{time.perf_counter() - start:.1f}s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+    Shortening of valid but wasteful plans, such as the first plan the depth-first solve runs into.
+
+    Two passes, repeated until neither finds anything:
+        - loops: the plan is replayed and, whenever a board comes back up to the order of its tubes, the
+          moves in between are dropped (this covers a pour and its undo). The moves after the loop are
+          renamed onto the tubes of the earlier board, where the same contents sit.
+        - windows: for every stretch of window moves, a breadth first search from the board at its start
+          looks for the board at its end, up to tube order, in fewer moves. A shorter stretch is spliced in
+          and the rest of the plan renamed. A solved board is unique up to tube order, so the last stretch
+          of a solving plan still ends on a solved board.
+
+    A pour always moves the whole top run the target can hold, so there are no partial pours to merge: two
+    pours that could be a single one (through an intermediate tube, say) are found by the window search.
+    The result is replayed before it is returned and is never longer than the input plan.
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import board as packed
+import moves as move_gen
+
+Plan = List[List[int]]
+
+
+def _states(board: packed.Board, plan: Plan, capacity: int) -> List[packed.Board]:
+    """Return the boards along a plan, raising ValueError at the first illegal move."""
+    states = [board]
+    for index, (src, dst) in enumerate(plan):
+        count = move_gen.pour_amount(board[src], board[dst], capacity) if src != dst else 0
+        if count == 0:
+            raise ValueError(f"move {index} ({src} -> {dst}) is not a legal pour")
+        board = move_gen.pour(board, src, dst, count)
+        states.append(board)
+    return states
+
+
+def _renaming(board: packed.Board, same: packed.Board) -> List[int]:
+    """Return, for every tube of board, the index of a tube with the same contents in same, a permutation
+    of it."""
+    renaming = [0] * len(board)
+    for tube, other in zip(packed.canonical_order(board), packed.canonical_order(same)):
+        renaming[tube] = other
+    return renaming
+
+
+def _rename(plan: Plan, renaming: List[int]) -> Plan:
+    return [[renaming[src], renaming[dst]] for src, dst in plan]
+
+
+def remove_loops(board: packed.Board, plan: Plan, capacity: int) -> Plan:
+    """Return the plan without the moves between two occurrences of a board up to tube order."""
+    result: Plan = []
+    keys = [packed.canonical(board)]
+    seen: Dict[packed.Board, int] = {keys[0]: 0}
+    renaming = list(range(len(board)))  # Tube of the input plan -> tube of the current board.
+    current = board
+    states = [board]
+    for src, dst in plan:
+        src, dst = renaming[src], renaming[dst]
+        current = move_gen.pour(current, src, dst, move_gen.pour_amount(current[src], current[dst], capacity))
+        key = packed.canonical(current)
+        earlier = seen.get(key)
+        if earlier is None:
+            result.append([src, dst])
+            states.append(current)
+            keys.append(key)
+            seen[key] = len(result)
+            continue
+        # Back to an earlier board: forget the loop and carry on from the earlier copy of the board.
+        step = _renaming(current, states[earlier])
+        renaming = [step[tube] for tube in renaming]
+        for dropped in keys[earlier + 1:]:
+            del seen[dropped]
+        del result[earlier:], states[earlier + 1:], keys[earlier + 1:]
+        current = states[earlier]
+    return result
+
+
+def _unmatched(board: packed.Board, target: Counter) -> int:
+    """Return the number of tubes of board with no tube of the same contents left in the target tube counts."""
+    unmatched = 0
+    left = dict(target)
+    for tube in board:
+        if left.get(tube):
+            left[tube] -= 1
+        else:
+            unmatched += 1
+    return unmatched
+
+
+def _shortcut(start: packed.Board, target: packed.Board, moves: int, capacity: int,
+              max_nodes: int) -> Optional[Tuple[Plan, packed.Board]]:
+    """
+        Breadth first search for a plan of at most moves moves from start to target up to tube order.
+
+        A pour changes two tubes, so a board with u tubes that do not appear in target is at least u / 2
+        pours away from it, and boards that cannot make it within moves are not searched further.
+
+        Returns:
+            Tuple[List[List[int]], Board]: The plan and the board it reaches, None if there is none within
+            moves moves or max_nodes expansions.
+    """
+    goal = packed.canonical(target)
+    tubes = Counter(target)
+    seen = {packed.canonical(start)}
+    layer: List[Tuple[packed.Board, packed.Path]] = [(start, None)]
+    expanded = 0
+    for depth in range(1, moves + 1):
+        next_layer = []
+        for state, path in layer:
+            if expanded >= max_nodes:
+                return None
+            expanded += 1
+            for pour in move_gen.legal_moves(state, capacity, path[1] if path is not None else None):
+                child = move_gen.pour(state, *pour)
+                key = packed.canonical(child)
+                if key in seen:
+                    continue
+                seen.add(key)
+                child_path = packed.extend_path(path, pour)
+                if key == goal:
+                    return packed.unwind_path(child_path), child
+                if depth + (_unmatched(child, tubes) + 1) // 2 <= moves:
+                    next_layer.append((child, child_path))
+        layer = next_layer
+    return None
+
+
+def shorten_windows(board: packed.Board, plan: Plan, capacity: int, window: int = 6,
+                    max_nodes: int = 300) -> Plan:
+    """Return the plan with every stretch of window moves replaced by a shorter one when a search of at most
+    max_nodes expansions finds it."""
+    plan = list(plan)
+    states = _states(board, plan, capacity)
+    start = 0
+    while start < len(plan) - 1:
+        end = min(start + window, len(plan))
+        found = _shortcut(states[start], states[end], end - start - 1, capacity, max_nodes)
+        if found is None:
+            start += 1
+            continue
+        shortcut, reached = found
+        plan = plan[:start] + shortcut + _rename(plan[end:], _renaming(states[end], reached))
+        states = _states(board, plan, capacity)
+    return plan
+
+
+def optimize(tubes: List[List[int]], plan: Plan, capacity: Optional[int] = None, window: int = 6,
+             max_nodes: int = 300) -> Plan:
+    """
+        Return a plan reaching the same board as plan up to tube order (a solved board if plan solves the
+        board) in no more moves.
+
+        Args:
+            tubes (List[List[int]]): The board the plan starts from.
+            plan (List[List[int]]): Valid [src, dst] moves.
+            capacity (int): The capacity of a tube, the largest color count of the board if omitted.
+            window (int): The number of moves every local search tries to do in fewer.
+            max_nodes (int): The expansion budget of every local search.
+
+        Raises:
+            ValueError: If a move of plan is not a legal pour.
+    """
+    board = packed.pack(tubes)
+    if capacity is None:
+        capacity = max(Counter(b"".join(board)).values(), default=0)
+    final = _states(board, plan, capacity)[-1]
+    solves = move_gen.is_solved(final, capacity)
+    best = [list(move) for move in plan]
+    while True:
+        shorter = shorten_windows(board, remove_loops(board, best, capacity), capacity, window, max_nodes)
+        if len(shorter) >= len(best):
+            break
+        best = shorter
+    reached = _states(board, best, capacity)[-1]
+    if (move_gen.is_solved(reached, capacity) if solves else packed.canonical(reached) == packed.canonical(final)):
+        return best
+    return [list(move) for move in plan]
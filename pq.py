@@ -1,49 +1,129 @@
-import heapq
-
-
-class Element:
-    __compare = None
-    def __init__(self, element, compare):
-        self.element = element
-        if Element.__compare == None:
-            Element.__compare = compare
+class PQ:
+    """
+        An indexed binary min-heap.
 
-    def __lt__(self, other):
-        return Element.__compare(self.element, other.element)
+        Every element is stored together with a hashable key, and a position map from key to heap index
+        gives O(1) membership tests and O(log n) decrease-key and removal by key.
+        The ordering is decided by the compare function given to each queue, so queues with different
+        comparators can be used side by side.
 
-class PQ:
+        Args:
+            compare (Callable[[Any, Any], bool]): Returns True if the first element should be popped before the second.
+    """
     def __init__(self, compare):
-        self.__queue = []
+        self.__queue = []  # Heap-ordered list of [key, element] entries.
+        self.__position = {}  # Maps a key to the index of its entry in self.__queue.
         self.__compare = compare
-        self.__current = 0
 
-    def push_back(self, element):
-        heapq.heappush(self.__queue, Element(element, self.__compare))
+    def __swap(self, i, j):
+        queue = self.__queue
+        queue[i], queue[j] = queue[j], queue[i]
+        self.__position[queue[i][0]] = i
+        self.__position[queue[j][0]] = j
+
+    def __sift_up(self, i):
+        queue = self.__queue
+        compare = self.__compare
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not compare(queue[i][1], queue[parent][1]):
+                break
+            self.__swap(i, parent)
+            i = parent
+
+    def __sift_down(self, i):
+        queue = self.__queue
+        compare = self.__compare
+        size = len(queue)
+        while True:
+            smallest = i
+            left = 2 * i + 1
+            right = left + 1
+            if left < size and compare(queue[left][1], queue[smallest][1]):
+                smallest = left
+            if right < size and compare(queue[right][1], queue[smallest][1]):
+                smallest = right
+            if smallest == i:
+                break
+            self.__swap(i, smallest)
+            i = smallest
+
+    def __remove_at(self, i):
+        queue = self.__queue
+        last = len(queue) - 1
+        if i != last:
+            self.__swap(i, last)
+        key, element = queue.pop()
+        del self.__position[key]
+        if i < len(queue):
+            self.__sift_down(i)
+            self.__sift_up(i)
+        return element
+
+    def push_back(self, element, key=None):
+        """
+            Insert an element, or update the element already stored under the same key.
+
+            Args:
+                element: The element to store.
+                key: A hashable key identifying the element, the element itself is used if omitted.
+        """
+        if key is None:
+            key = element
+        i = self.__position.get(key)
+        if i is not None:
+            self.update(element, key)
+            return
+        self.__queue.append([key, element])
+        self.__position[key] = len(self.__queue) - 1
+        self.__sift_up(len(self.__queue) - 1)
 
-    def pop_back(self, i = -1):
+    def pop_back(self, i=-1):
+        """Remove and return the smallest element, or the element at heap index i."""
         if i == -1:
-            tmp: Element = self.__queue[0]
-            heapq.heappop(self.__queue)
-        else:
-            if i >= 0:
-                tmp: Element = self.queue[i]
-                self.__queue.pop(i)
-                heapq.heapify(self.__queue)
-            else:
-                raise ValueError("index should not be nagative")
-        return tmp.element
-
-    def remove(self, element):
-        tmp_element = Element(element)
-        self.__queue.remove(tmp_element)
-        heapq.heapify(self.__queue)
-
-    def find(self, element):
-        result = -1
-        for i in range(len(self.__queue)):
-            if element == self.__queue[i]:
-                result = i
-        return result
+            i = 0
+        elif i < 0:
+            raise ValueError("index should not be nagative")
+        return self.__remove_at(i)
+
+    def update(self, element, key=None):
+        """Replace the element stored under key and restore the heap order (decrease-key or increase-key)."""
+        if key is None:
+            key = element
+        i = self.__position[key]
+        self.__queue[i][1] = element
+        self.__sift_up(i)
+        self.__sift_down(self.__position[key])
+
+    def decrease_key(self, element, key=None):
+        """Replace the element stored under key only if the new element is ordered before it."""
+        if key is None:
+            key = element
+        i = self.__position[key]
+        if self.__compare(element, self.__queue[i][1]):
+            self.__queue[i][1] = element
+            self.__sift_up(i)
+            return True
+        return False
+
+    def remove(self, key):
+        """Remove and return the element stored under key."""
+        return self.__remove_at(self.__position[key])
+
+    def get(self, key, default=None):
+        """Return the element stored under key, or default if the key is not queued."""
+        i = self.__position.get(key)
+        if i is None:
+            return default
+        return self.__queue[i][1]
+
+    def find(self, key):
+        """Return the heap index of the element stored under key, or -1 if it is not queued."""
+        return self.__position.get(key, -1)
+
+    def peek(self):
+        """Return the smallest element without removing it."""
+        return self.__queue[0][1]
 
     def is_empty(self):
         return len(self.__queue) == 0
@@ -51,19 +131,14 @@ class PQ:
     def size(self):
         return len(self.__queue)
 
+    def __contains__(self, key):
+        return key in self.__position
+
     def __len__(self):
         return len(self.__queue)
 
     def __iter__(self):
-        return self.__queue
-
-    def __next__(self):
-        if self.__current < (len(self.__queue) - 1):
-            next = self.__current
-            self.__current += 1
-            return self.__queue[next]
-        else:
-            raise StopIteration
+        return (entry[1] for entry in self.__queue)
 
     def __getitem__(self, i):
-        return self.__queue[i]
+        return self.__queue[i][1]
@@ -0,0 +1,194 @@
+"""
+    Persistent cache of solved boards.
+
+    Verdicts are stored in sqlite under the canonical key of the board (its tubes sorted, and by default its
+    colors renamed canonically too), so a board is found again whatever the order of its tubes and the names
+    of its colors. Databases written with an older key are re-keyed when opened. Plans are
+    stored on the canonical tube indices and mapped back to the tube order of the board being looked up.
+    Renaming colors does not change which pours are legal, so a plan is valid for every board sharing its key.
+
+    An in-memory LRU sits in front of the database, so repeated lookups never reach the disk.
+"""
+import os
+import sqlite3
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import board as packed
+import heuristics
+import moves as move_gen
+from ai_solution import GameSolution, SolveStatus
+from solver_stats import SolverStats
+
+# Next to the code, like pattern_db.DIRECTORY, so every program shares one cache wherever it is started from.
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solutions.sqlite")
+# Stored as the user_version of the database. 2: colors renamed with the canonical board.relabel_colors.
+KEY_VERSION = 2
+# (status, plan on canonical tube indices, True if the plan is known to be optimal)
+Entry = Tuple[SolveStatus, bytes, bool]
+
+
+class SolutionCache:
+    """
+        Solved and proven-unsolvable verdicts keyed by canonical board, on disk with an in-memory LRU in front.
+
+        Attributes:
+            path (str): The sqlite database file, ":memory:" keeps the cache in this process only.
+            lru_size (int): The maximum number of entries kept in memory.
+            colors (bool): Also identify boards that only differ by the names of their colors.
+            hits (int): Lookups answered from memory.
+            disk_hits (int): Lookups answered from the database.
+            misses (int): Lookups that found no usable entry.
+    """
+    def __init__(self, path: str = DEFAULT_PATH, lru_size: int = 4096, colors: bool = True):
+        self.path = path
+        self.lru_size = lru_size
+        self.colors = colors
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.__memory: "OrderedDict[bytes, Entry]" = OrderedDict()
+        self.__db = sqlite3.connect(path)
+        self.__db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                          "(key BLOB PRIMARY KEY, status TEXT NOT NULL, moves BLOB NOT NULL, optimal INTEGER NOT NULL)")
+        if self.__db.execute("PRAGMA user_version").fetchone()[0] < KEY_VERSION:
+            self.__migrate()
+            self.__db.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        self.__db.commit()
+
+    def __enter__(self) -> "SolutionCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__db.close()
+
+    def __len__(self) -> int:
+        return self.__db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "memory_entries": len(self.__memory)}
+
+    def __key(self, tubes: packed.Board, capacity: Optional[int]) -> Tuple[bytes, Tuple[int, ...]]:
+        """Return the database key of a board and the order mapping canonical tube indices back to it."""
+        if capacity is None:
+            capacity = max(Counter(b"".join(tubes)).values(), default=0)
+        if self.colors:
+            tubes = packed.relabel_colors(tubes)
+        order = packed.canonical_order(tubes)
+        # Colors are below 255, so 0xff separates the tubes unambiguously. The capacity decides which
+        # pours are legal, so it is part of the key.
+        return bytes([capacity]) + b"\xff".join(tubes[i] for i in order), order
+
+    def __migrate(self) -> None:
+        """Store the entries of a database written with older keys again under the current ones. A key holds
+        the whole board, so the entries are kept; entries meeting under one key keep the best plan."""
+        rows = self.__db.execute("SELECT key, status, moves, optimal FROM solutions").fetchall()
+        self.__db.execute("DELETE FROM solutions")
+        for key, status, plan, optimal in rows:
+            tubes = [list(tube) for tube in key[1:].split(b"\xff")]
+            moves = [[plan[i], plan[i + 1]] for i in range(0, len(plan), 2)]
+            self.store(tubes, SolveStatus(status), moves, key[0], bool(optimal))
+
+    def __remember(self, key: bytes, entry: Entry) -> None:
+        self.__memory[key] = entry
+        self.__memory.move_to_end(key)
+        if len(self.__memory) > self.lru_size:
+            self.__memory.popitem(last=False)
+
+    def __entry(self, key: bytes) -> Tuple[Optional[Entry], bool]:
+        """Return the entry of a key and whether it came from memory."""
+        entry = self.__memory.get(key)
+        if entry is not None:
+            self.__memory.move_to_end(key)
+            return entry, True
+        row = self.__db.execute("SELECT status, moves, optimal FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, False
+        entry = (SolveStatus(row[0]), row[1], bool(row[2]))
+        self.__remember(key, entry)
+        return entry, False
+
+    def lookup(self, tubes: GameSolution.MotherTube, capacity: Optional[int] = None,
+               optimal: bool = False) -> Optional[Tuple[SolveStatus, List[List[int]]]]:
+        """
+            Return the cached (status, moves) of a board, or None on a miss.
+
+            Args:
+                tubes (List[List[int]]): The board, in the caller's tube order.
+                capacity (int): The capacity of a tube, the largest color count of the board if omitted.
+                optimal (bool): Only accept a plan known to be optimal.
+
+            The moves are expressed on the caller's tube indices.
+        """
+        key, order = self.__key(packed.pack(tubes), capacity)
+        entry, in_memory = self.__entry(key)
+        if entry is None or (optimal and entry[0] == SolveStatus.SOLVED and not entry[2]):
+            self.misses += 1
+            return None
+        if in_memory:
+            self.hits += 1
+        else:
+            self.disk_hits += 1
+        status, plan, _ = entry
+        return status, [[order[plan[i]], order[plan[i + 1]]] for i in range(0, len(plan), 2)]
+
+    def store(self, tubes: GameSolution.MotherTube, status: SolveStatus, moves: List[List[int]],
+              capacity: Optional[int] = None, optimal: bool = False) -> None:
+        """
+            Record the verdict of a solve. Only SOLVED and UNSOLVABLE are kept, the other statuses say
+            nothing about the board. An existing plan is only replaced by an optimal or a shorter one.
+
+            Args:
+                tubes (List[List[int]]): The board, in the caller's tube order.
+                status (SolveStatus): The outcome of the solve.
+                moves (List[List[int]]): The plan on the caller's tube indices.
+                capacity (int): The capacity of a tube, the largest color count of the board if omitted.
+                optimal (bool): True if the plan is known to be optimal.
+        """
+        if status not in (SolveStatus.SOLVED, SolveStatus.UNSOLVABLE):
+            return
+        key, order = self.__key(packed.pack(tubes), capacity)
+        position = {tube: index for index, tube in enumerate(order)}
+        plan = bytes(position[tube] for move in moves for tube in move)
+        known, _ = self.__entry(key)
+        if known is not None and status == SolveStatus.SOLVED and known[0] == SolveStatus.SOLVED:
+            if known[2] or not (optimal or len(plan) < len(known[1])):
+                return
+        entry = (status, plan if status == SolveStatus.SOLVED else b"", optimal)
+        self.__db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                          (key, status.value, entry[1], int(optimal)))
+        self.__db.commit()
+        self.__remember(key, entry)
+
+    def solve(self, solver: GameSolution, tubes: GameSolution.MotherTube, method: str = "solve", **options) -> bool:
+        """
+            Run solver.<method>(tubes, **options) unless the cache already knows the answer, and cache
+            the verdict otherwise. On a hit the solver's results (moves, status, solution_found, own_state)
+            are filled in as if it had solved the board, with nodes_expanded left at 0 and stats describing
+            no search.
+
+            Returns:
+                bool: True if a solution is known.
+        """
+        optimal = (method in ("optimal_solve", "ida_solve")
+                   and options.get("heuristic", heuristics.DEFAULT) in heuristics.ADMISSIBLE)
+        cached = self.lookup(tubes, solver.NColorInTube, optimal)
+        if cached is not None:
+            status, moves = cached
+            solver.status = status
+            solver.solution_found = status == SolveStatus.SOLVED
+            solver.moves = moves
+            solver.nodes_expanded = 0
+            capacity = solver.NColorInTube or max(Counter(unit for tube in tubes for unit in tube).values(), default=0)
+            solver.own_state = packed.unpack(move_gen.replay(packed.pack(tubes), moves, capacity))
+            solver.stats = SolverStats(method)
+            solver.stats.finish(solver)
+            return solver.solution_found
+        getattr(solver, method)(tubes, **options)
+        self.store(tubes, solver.status, solver.moves, solver.NColorInTube, optimal)
+        return solver.solution_found
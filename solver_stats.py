@@ -0,0 +1,172 @@
+"""
+    Statistics of a solve, collected by GameSolution and left in its stats attribute afterwards.
+
+    The counters (generated and expanded nodes, pruned duplicates and dead boards, peak frontier, depth
+    histogram) are always kept. Timing the move generation, heuristic and queue operations separately and
+    measuring the peak memory (with tracemalloc) slow the search down, so they only happen in profile mode.
+    With trace on, every expansion is also recorded, and the trace can be written to a compact binary
+    file for offline analysis (see dump_trace and read_trace).
+"""
+import inspect
+import struct
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+TRACE_HEADER = struct.Struct("<4sHI")  # Magic, format version and number of records.
+TRACE_MAGIC = b"WSTR"
+TRACE_VERSION = 1
+# Per expansion: depth, heuristic value, frontier size and seconds since the start of the solve.
+TRACE_RECORD = struct.Struct("<HHIf")
+TraceRecord = Tuple[int, int, int, float]
+
+
+class SolverStats:
+    """
+        What one solve did.
+
+        Attributes:
+            method (str): The GameSolution method that ran.
+            status (str): The SolveStatus value it ended with, None while running.
+            profile (bool): True if timings and peak_memory are measured.
+            trace (bool): True if every expansion is recorded.
+            nodes_generated (int): The number of child boards generated.
+            nodes_expanded (int): The number of boards expanded.
+            duplicates_pruned (int): The number of boards discarded as already seen.
+            deadlocks_pruned (int): The number of boards discarded as dead.
+            peak_frontier (int): The largest frontier seen at an expansion.
+            peak_nodes_stored (int): The largest number of boards held in memory at once.
+            peak_memory (int): The peak of the memory allocated during the solve in bytes, profile mode only.
+            moves (int): The length of the resulting plan.
+            elapsed (float): Seconds from the start of the solve to its end.
+            timings (Dict[str, float]): Seconds spent in "moves", "heuristic" and "queue" operations, profile
+                mode only.
+            depth_histogram (Counter): The number of expansions at every depth.
+    """
+    def __init__(self, method: Optional[str] = None, profile: bool = False, trace: bool = False):
+        self.method = method
+        self.status: Optional[str] = None
+        self.profile = profile
+        self.trace = trace
+        self.nodes_generated = 0
+        self.nodes_expanded = 0
+        self.duplicates_pruned = 0
+        self.deadlocks_pruned = 0
+        self.peak_frontier = 0
+        self.peak_nodes_stored = 0
+        self.peak_memory: Optional[int] = None
+        self.moves = 0
+        self.elapsed = 0.0
+        self.timings: Dict[str, float] = {}
+        self.depth_histogram: Counter = Counter()
+        self.__start = time.perf_counter()
+        self.__tracing = False  # True if tracemalloc was started for this solve.
+        self.__timing = False  # True while a timed function runs, calls it makes are not timed again.
+        self.__records = {field: array(code) for field, code in (("depth", "H"), ("h", "H"),
+                                                                 ("frontier", "I"), ("time", "f"))}
+
+    def start(self) -> None:
+        """Start the clock, and the memory measurement in profile mode."""
+        if self.profile:
+            self.__tracing = not tracemalloc.is_tracing()
+            if self.__tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.__start = time.perf_counter()
+
+    def timed(self, category: str, function: Callable) -> Callable:
+        """
+            Return function, adding the time spent in it to timings[category] in profile mode.
+
+            A generator does its work as it is consumed, so a generator function is run to completion inside
+            the timer and the wrapper returns an iterator over what it yielded. A timed function called from
+            another one (PQ.push_back calling PQ.update, say) counts as part of its caller only.
+        """
+        if not self.profile:
+            return function
+        timings = self.timings
+        timings.setdefault(category, 0.0)
+        generates = inspect.isgeneratorfunction(function)
+
+        def run(*args):
+            if self.__timing:
+                return function(*args)
+            self.__timing = True
+            start = time.perf_counter()
+            try:
+                return iter(list(function(*args))) if generates else function(*args)
+            finally:
+                timings[category] += time.perf_counter() - start
+                self.__timing = False
+        return run
+
+    def expanded(self, depth: int, h_value: int, frontier: int) -> None:
+        """Record an expansion."""
+        self.depth_histogram[depth] += 1
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if self.trace:
+            records = self.__records
+            records["depth"].append(min(depth, 0xFFFF))
+            records["h"].append(min(h_value, 0xFFFF))
+            records["frontier"].append(min(frontier, 0xFFFFFFFF))
+            records["time"].append(time.perf_counter() - self.__start)
+
+    def finish(self, solver) -> None:
+        """Stop the clock and copy the final counters and result of a GameSolution."""
+        self.elapsed = time.perf_counter() - self.__start
+        self.status = solver.status.value if solver.status is not None else None
+        self.nodes_expanded = solver.nodes_expanded
+        self.duplicates_pruned = solver.duplicates_pruned
+        self.deadlocks_pruned = solver.deadlocks_pruned
+        self.peak_nodes_stored = solver.peak_nodes_stored
+        self.moves = len(solver.moves)
+        if self.profile and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.__tracing:
+                tracemalloc.stop()
+                self.__tracing = False
+
+    def as_dict(self) -> Dict:
+        """Return the statistics as JSON-friendly values."""
+        return {"method": self.method, "status": self.status, "nodes_generated": self.nodes_generated,
+                "nodes_expanded": self.nodes_expanded, "duplicates_pruned": self.duplicates_pruned,
+                "deadlocks_pruned": self.deadlocks_pruned, "peak_frontier": self.peak_frontier,
+                "peak_nodes_stored": self.peak_nodes_stored, "peak_memory": self.peak_memory, "moves": self.moves,
+                "elapsed": round(self.elapsed, 6), "timings": {name: round(seconds, 6)
+                                                               for name, seconds in self.timings.items()},
+                "depth_histogram": dict(sorted(self.depth_histogram.items()))}
+
+    def __str__(self) -> str:
+        lines = [f"{self.method}: {self.status}, {self.moves} moves in {self.elapsed:.3f}s",
+                 f"\tnodes: {self.nodes_generated} generated, {self.nodes_expanded} expanded, "
+                 f"{self.duplicates_pruned} duplicates, {self.deadlocks_pruned} dead",
+                 f"\tpeak: {self.peak_frontier} frontier, {self.peak_nodes_stored} stored"
+                 + (f", {self.peak_memory / 1e6:.1f} MB" if self.peak_memory is not None else "")]
+        if self.timings:
+            lines.append("\ttime: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.timings.items()))
+        if self.depth_histogram:
+            lines.append("\tdepths: " + " ".join(f"{depth}:{count}"
+                                                  for depth, count in sorted(self.depth_histogram.items())))
+        return "\n".join(lines)
+
+    def dump_trace(self, path: str) -> int:
+        """Write the recorded expansions to a trace file and return their number (0 unless trace is on)."""
+        records = self.__records
+        count = len(records["depth"])
+        with open(path, "wb") as stream:
+            stream.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, count))
+            stream.write(b"".join(TRACE_RECORD.pack(*record) for record in zip(
+                records["depth"], records["h"], records["frontier"], records["time"])))
+        return count
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """Yield the (depth, h, frontier size, seconds) records of a trace file, in expansion order."""
+    with open(path, "rb") as stream:
+        magic, version, count = TRACE_HEADER.unpack(stream.read(TRACE_HEADER.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} search trace")
+        yield from TRACE_RECORD.iter_unpack(stream.read(count * TRACE_RECORD.size))
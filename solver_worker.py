@@ -0,0 +1,176 @@
+import multiprocessing
+import queue
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ai_solution import GameSolution, SolveStatus
+
+
+def _run_solver(method: str, tubes: List[List[int]], settings: dict, options: dict, messages, cancel) -> None:
+    """Entry point of the worker process: solve and stream progress and the result through messages."""
+    start = time.monotonic()
+
+    def report(solver: GameSolution) -> bool:
+        messages.put(("progress", solver.nodes_expanded, solver.frontier_size, time.monotonic() - start))
+        return cancel.is_set()
+
+    solver = GameSolution(progress_callback=report, **settings)
+    getattr(solver, method)(tubes, **options)
+    messages.put(("done", solver.status.value, solver.moves, solver.nodes_expanded, time.monotonic() - start,
+                  solver.stats.as_dict()))
+
+
+class SolverWorker:
+    """
+        Runs one GameSolution method in a background process so the caller never blocks.
+
+        The caller polls the worker once per frame; progress (nodes expanded, frontier size, elapsed time)
+        and finally the result arrive through a queue. cancel() asks the solver to stop at its next
+        progress report, which leaves the best partial plan as the result.
+
+        Attributes:
+            method (str): The GameSolution method to run ("solve", "optimal_solve" or "ida_solve").
+            options (dict): Keyword arguments for the method, e.g. heuristic or table_size.
+            nodes (int): The number of states expanded so far.
+            frontier_size (int): The latest reported frontier size.
+            elapsed (float): Seconds spent solving so far.
+            done (bool): True once the result has arrived.
+            status (SolveStatus): The status of the finished solve, None if the worker died without a result.
+            moves (List[List[int]]): The plan of the finished solve (partial unless status is SOLVED).
+            stats (dict): SolverStats.as_dict() of the finished solve, None until then.
+    """
+    def __init__(self, method: str, tubes: List[List[int]], options: Optional[Dict] = None, **settings):
+        """
+            Args:
+                method (str): The GameSolution method to run.
+                tubes (List[List[int]]): The board to solve.
+                options (dict): Keyword arguments for the method, e.g. heuristic or table_size.
+                settings: Keyword arguments for GameSolution, e.g. n_color_in_tube or time_limit.
+        """
+        context = multiprocessing.get_context("spawn")
+        self.method = method
+        self.options = dict(options or {})
+        self.nodes = 0
+        self.frontier_size = 0
+        self.elapsed = 0.0
+        self.done = False
+        self.status: Optional[SolveStatus] = None
+        self.moves: List[List[int]] = []
+        self.stats: Optional[Dict] = None
+        self.__messages = context.Queue()
+        self.__cancel = context.Event()
+        self.__process = context.Process(target=_run_solver, daemon=True,
+                                         args=(method, [list(tube) for tube in tubes], settings, self.options,
+                                               self.__messages, self.__cancel))
+
+    def start(self) -> "SolverWorker":
+        self.__process.start()
+        return self
+
+    def poll(self) -> bool:
+        """Consume every pending message without blocking and return True once the solve is done."""
+        while not self.done:
+            try:
+                message = self.__messages.get_nowait()
+            except queue.Empty:
+                if self.__process.is_alive():
+                    break
+                # The process is gone: give its last messages a moment to arrive, then give up on it.
+                try:
+                    message = self.__messages.get(timeout=0.1)
+                except queue.Empty:
+                    self.done = True
+                    break
+            if message[0] == "progress":
+                _, self.nodes, self.frontier_size, self.elapsed = message
+            else:
+                _, status, self.moves, self.nodes, self.elapsed, self.stats = message
+                self.status = SolveStatus(status)
+                self.done = True
+                self.__process.join()
+        return self.done
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def cancel(self) -> None:
+        """Ask the solver to stop, it reports its best partial plan shortly after."""
+        self.__cancel.set()
+
+    def terminate(self) -> None:
+        """Stop the worker process immediately, discarding any result."""
+        if self.__process.is_alive():
+            self.__process.terminate()
+        self.done = True
+
+
+def _run_generator(config: Tuple[int, int, int], time_limit: Optional[float], messages) -> None:
+    """Entry point of a level worker process: generate a level, or deal an unchecked board on timeout."""
+    from level_generator import LevelGenerator, unchecked_deal
+    start = time.monotonic()
+    generator = LevelGenerator(*config, time_limit=time_limit)
+    try:
+        tubes, plan = generator.generate()
+    except TimeoutError:
+        tubes, plan = unchecked_deal(*config, random.Random()), None
+    messages.put(("done", tubes, plan, generator.generated, time.monotonic() - start))
+
+
+class LevelWorker:
+    """
+        Generates a level in a background process so the caller never blocks, polled once per frame like
+        SolverWorker.
+
+        Tight configurations can take LevelGenerator a long time, so it runs under time_limit; past it the
+        worker deals a board that only passes the cheap checks (level_generator.unchecked_deal) and plan is None.
+
+        Attributes:
+            config (Tuple[int, int, int]): (NColor, NColorInTube, NEmptyTubes) of the level.
+            done (bool): True once the level has arrived, or the worker died without one.
+            tubes (List[List[int]]): The board, None until done.
+            plan (List[List[int]]): A plan solving it, None until done or if the board is unchecked.
+            candidates (int): The number of candidate boards the generator tried.
+            elapsed (float): Seconds the generation took.
+    """
+    def __init__(self, n_color: int, n_color_in_tube: int, n_empty_tubes: int, time_limit: Optional[float] = 5.0):
+        context = multiprocessing.get_context("spawn")
+        self.config = (n_color, n_color_in_tube, n_empty_tubes)
+        self.done = False
+        self.tubes: Optional[List[List[int]]] = None
+        self.plan: Optional[List[List[int]]] = None
+        self.candidates = 0
+        self.elapsed = 0.0
+        self.__messages = context.Queue()
+        self.__process = context.Process(target=_run_generator, daemon=True,
+                                         args=(self.config, time_limit, self.__messages))
+
+    def start(self) -> "LevelWorker":
+        self.__process.start()
+        return self
+
+    def poll(self) -> bool:
+        """Return True once the level is there (or the worker died without one), without blocking."""
+        if self.done:
+            return True
+        try:
+            message = self.__messages.get_nowait()
+        except queue.Empty:
+            if self.__process.is_alive():
+                return False
+            try:
+                message = self.__messages.get(timeout=0.1)
+            except queue.Empty:
+                self.done = True
+                return True
+        _, self.tubes, self.plan, self.candidates, self.elapsed = message
+        self.done = True
+        self.__process.join()
+        return True
+
+    def terminate(self) -> None:
+        """Stop the worker process immediately, discarding any level."""
+        if self.__process.is_alive():
+            self.__process.terminate()
+        self.done = True
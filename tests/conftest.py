@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture
+def renamed():
+    """Return a function giving a board (lists or packed) as lists, its colors renamed and its tubes shuffled."""
+    def rename(tubes, rng):
+        colors = sorted({unit for tube in tubes for unit in tube})
+        names = dict(zip(colors, rng.sample(range(100, 200), len(colors))))
+        board = [[names[unit] for unit in tube] for tube in tubes]
+        rng.shuffle(board)
+        return board
+    return rename
@@ -0,0 +1,15 @@
+import batch
+
+
+def test_bad_lines_do_not_stop_the_stream():
+    lines = ['[[0, 1], [1, 0], []]', 'not json', '{"id": "x", "tubes": [[0, "a"]]}', '[[0, 1], 3]', '',
+             '{"id": 7, "tubes": [[0, 1], [1, 0], []]}']
+    results = list(batch.solve_boards(batch.read_boards(lines)))
+    assert [result["id"] for result in results] == [0, 1, "x", 3, 7]
+    assert [result["status"] for result in results] == ["solved", "error", "error", "error", "solved"]
+    assert all(result["error"].startswith(f"line {line}:") for result, line in zip(results[1:4], (2, 3, 4)))
+
+
+def test_solve_errors_become_results():
+    result = batch.solve_record(({"id": 0, "tubes": [[0, 300], [300, 0], []]}, "solve", {}, {}))
+    assert result["status"] == "error" and result["moves"] == []
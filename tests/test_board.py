@@ -0,0 +1,29 @@
+import random
+
+import board as packed
+from benchmarks.corpus import seeded_corpus
+
+
+def test_state_key_ignores_color_names_and_tube_order(renamed):
+    rng = random.Random(0)
+    for tubes in seeded_corpus(5, 4, 2, count=300, seed=1):
+        board = packed.pack(tubes)
+        assert packed.state_key(packed.pack(renamed(board, rng)), colors=True) == packed.state_key(board, colors=True)
+
+
+def test_state_key_on_symmetric_boards(renamed):
+    rng = random.Random(1)
+    for tubes in ([[0, 0], [1, 1], [2, 2], []], [[0, 1], [1, 2], [2, 0]], [[0, 1], [1, 0], [2, 3], [3, 2]],
+                  [[0, 1, 2], [1, 2, 0], [2, 0, 1]], [[0, 1], [2, 3], [1, 0], [3, 2], [], []]):
+        board = packed.pack(tubes)
+        key = packed.state_key(board, colors=True)
+        for _ in range(50):
+            assert packed.state_key(packed.pack(renamed(board, rng)), colors=True) == key
+
+
+def test_relabel_colors_keeps_tube_order_and_shape():
+    board = packed.pack([[7, 3, 3], [3, 7], [], [7]])
+    relabeled = packed.relabel_colors(board)
+    assert [len(tube) for tube in relabeled] == [3, 2, 0, 1]
+    assert relabeled[0][1] == relabeled[0][2] == relabeled[1][0] != relabeled[0][0]
+    assert set(b"".join(relabeled)) == {0, 1}
@@ -0,0 +1,55 @@
+import pytest
+
+from engine import GameEngine
+
+TUBES = [[0, 1], [1, 0], []]
+
+
+def test_pour_undo_redo():
+    game = GameEngine(TUBES)
+    assert game.NColor == 2 and game.NColorInTube == 2 and game.NEmptyTubes == 1
+    assert game.pour(0, 2) == 1
+    assert game.tubes == [[0], [1, 0], [1]]
+    assert game.pour(0, 0) == 0 and game.pour(0, 5) == 0 and game.pour(2, 0) == 0
+    assert game.undo() and game.tubes == TUBES and game.moves == []
+    assert not game.undo()
+    assert game.redo() and game.tubes == [[0], [1, 0], [1]] and game.moves == [[0, 2]]
+    assert not game.redo()
+
+
+def test_pour_clears_redo():
+    game = GameEngine(TUBES)
+    game.pour(0, 2)
+    game.undo()
+    game.pour(1, 2)
+    assert game.undone == [] and not game.redo()
+
+
+def test_replay_wins():
+    game = GameEngine(TUBES)
+    assert game.replay([[0, 2], [1, 0], [1, 2], [0, 1]]) == 4
+    assert game.is_won() and game.move_count == 4
+
+
+@pytest.mark.parametrize("moves", [[[0, 1], [2, 0], [2, 1]], [[0, 1], [0, 9]], [[0, 1], [1]], [[0, 1], "ab"],
+                                   [[0, 1], [1.0, 0]], [[0, 1], None]])
+def test_failed_replay_changes_nothing(moves):
+    game = GameEngine(TUBES)
+    game.pour(1, 2)
+    game.pour(0, 1)
+    game.undo()
+    board, history, undone = game.snapshot(), list(game.history), list(game.undone)
+    with pytest.raises(ValueError):
+        game.replay(moves)
+    assert game.tubes == board and game.history == history and game.undone == undone
+    assert game.redo() and game.tubes == [[0], [1, 1], [0]]
+
+
+def test_reset():
+    game = GameEngine(TUBES)
+    game.replay([[0, 2], [1, 0]])
+    game.undo()
+    game.reset()
+    assert game.tubes == TUBES and game.history == [] and game.undone == []
+    game.tubes[0].append(1)
+    assert game.initial == TUBES
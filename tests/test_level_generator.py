@@ -0,0 +1,72 @@
+import random
+import time
+
+import pytest
+
+import board as packed
+import level_generator
+import moves as move_gen
+from engine import GameEngine
+from level_generator import LevelGenerator, unchecked_deal
+from solver_worker import LevelWorker
+
+
+@pytest.mark.parametrize("config", [(2, 2, 1), (2, 2, 2), (2, 2, 3), (3, 2, 3), (4, 3, 2)])
+def test_generated_boards_are_unsolved_and_solved_by_their_plan(config):
+    generator = LevelGenerator(*config, seed=0)
+    for _ in range(300):
+        tubes, plan = generator.generate()
+        assert not move_gen.is_solved(packed.pack(tubes), config[1])
+        game = GameEngine(tubes, config[1])
+        game.replay(plan)
+        assert game.is_won()
+
+
+def test_new_games_do_not_start_won():
+    assert not any(GameEngine.generate(2, 2, 1, seed=seed).is_won() for seed in range(300))
+
+
+@pytest.mark.parametrize("config", [(1, 4, 1), (3, 1, 1), (3, 2, -1)])
+def test_configurations_without_unsolved_boards_are_rejected(config):
+    with pytest.raises(ValueError):
+        LevelGenerator(*config)
+
+
+@pytest.mark.parametrize("config", [(12, 4, 1), (15, 4, 1), (15, 20, 1), (15, 20, 2)])
+def test_tight_configurations_return_or_time_out(config):
+    generator = LevelGenerator(*config, seed=0, time_limit=1.0)
+    start = time.monotonic()
+    try:
+        tubes, plan = generator.generate()
+    except TimeoutError:
+        pass
+    else:
+        game = GameEngine(tubes, config[1])
+        game.replay(plan)
+        assert game.is_won()
+    assert time.monotonic() - start < 3.0
+
+
+def test_candidate_limit():
+    generator = LevelGenerator(15, 20, 1, seed=0, max_candidates=2)
+    with pytest.raises(TimeoutError):
+        generator.generate()
+    assert generator.generated == 2
+
+
+def test_unchecked_deal_passes_the_quick_checks():
+    rng = random.Random(0)
+    for _ in range(20):
+        tubes = unchecked_deal(15, 4, 1, rng)
+        assert level_generator.precheck(tubes, 4) and not move_gen.is_solved(packed.pack(tubes), 4)
+
+
+def test_level_worker():
+    worker = LevelWorker(4, 3, 2).start()
+    deadline = time.monotonic() + 60
+    while not worker.poll():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    game = GameEngine(worker.tubes, 3)
+    game.replay(worker.plan)
+    assert game.is_won()
@@ -0,0 +1,24 @@
+import itertools
+
+import board as packed
+import level_pack
+
+
+def brute_force_key(board):
+    """The smallest sorted board over every renaming of the colors."""
+    colors = sorted(set(b"".join(board)))
+    keys = []
+    for names in itertools.permutations(range(len(colors))):
+        table = bytearray(256)
+        for color, name in zip(colors, names):
+            table[color] = name
+        keys.append(tuple(sorted(tube.translate(table) for tube in board)))
+    return min(keys)
+
+
+def test_levels_are_unique_up_to_tube_order_and_color_names():
+    levels = list(level_pack.build_pack([(4, 3, 1), (5, 3, 2)], 150, seed=0))
+    for config in ([4, 3, 1], [5, 3, 2]):
+        keys = [brute_force_key(packed.pack(level["tubes"])) for level in levels if level["config"] == config]
+        assert len(keys) == 150
+        assert len(set(keys)) == len(keys)
@@ -0,0 +1,55 @@
+import os
+import random
+import sqlite3
+
+import board as packed
+import solution_cache
+from ai_solution import GameSolution, SolveStatus
+from benchmarks.corpus import seeded_corpus
+from engine import GameEngine
+from solution_cache import SolutionCache
+
+
+def test_renamed_and_permuted_boards_hit(renamed):
+    rng = random.Random(0)
+    with SolutionCache(":memory:") as cache:
+        for tubes in seeded_corpus(5, 4, 2, count=30, seed=2):
+            solver = GameSolution(max_nodes=20000)
+            solver.solve(tubes)
+            cache.store(tubes, solver.status, solver.moves, 4)
+            copy = renamed(tubes, rng)
+            status, moves = cache.lookup(copy, 4)
+            assert status == solver.status
+            if status == SolveStatus.SOLVED:
+                game = GameEngine(copy, 4)
+                game.replay(moves)
+                assert game.is_won()
+        assert cache.misses == 0
+
+
+def test_old_keys_are_migrated(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    tubes = [[1, 0, 1, 0], [0, 1, 0, 1], [], []]
+    solver = GameSolution()
+    solver.solve(tubes)
+    # A version 1 database holding the board under a key whose colors are not canonically named.
+    plan = bytes(tube for move in solver.moves for tube in move)
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE solutions (key BLOB PRIMARY KEY, status TEXT NOT NULL, moves BLOB NOT NULL, "
+               "optimal INTEGER NOT NULL)")
+    db.execute("INSERT INTO solutions VALUES (?, ?, ?, 0)",
+               (bytes([4]) + b"\xff".join(packed.pack(tubes)), SolveStatus.SOLVED.value, plan))
+    db.commit()
+    db.close()
+    with SolutionCache(path) as cache:
+        copy = [[], [1, 0, 1, 0], [], [0, 1, 0, 1]]
+        status, moves = cache.lookup(copy, 4)
+        game = GameEngine(copy, 4)
+        game.replay(moves)
+        assert status == SolveStatus.SOLVED and game.is_won()
+        assert len(cache) == 1
+
+
+def test_default_path_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(solution_cache.DEFAULT_PATH)
+    assert os.path.dirname(solution_cache.DEFAULT_PATH) == os.path.dirname(os.path.abspath(solution_cache.__file__))
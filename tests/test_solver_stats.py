@@ -0,0 +1,32 @@
+import time
+
+from ai_solution import GameSolution
+from benchmarks.corpus import seeded_corpus
+from solver_stats import SolverStats
+
+
+def test_nested_timed_calls_are_counted_once():
+    stats = SolverStats("solve", profile=True)
+    inner = stats.timed("queue", lambda: time.sleep(0.02))
+
+    def outer():
+        time.sleep(0.02)
+        inner()
+    stats.timed("queue", outer)()
+    assert 0.04 <= stats.timings["queue"] < 0.06
+    inner()
+    assert stats.timings["queue"] >= 0.06
+
+
+def test_profiled_timings_fit_in_the_solve():
+    for tubes in seeded_corpus(5, 4, 2, count=5, seed=0):
+        solver = GameSolution(profile=True)
+        solver.optimal_solve(tubes)
+        stats = solver.stats
+        assert stats.timings["queue"] > 0
+        assert sum(stats.timings.values()) <= stats.elapsed
+
+
+def test_plain_mode_does_not_wrap():
+    function = len
+    assert SolverStats("solve").timed("moves", function) is function
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import verifier
+
+TUBES = [[0, 1], [1, 0], []]
+MOVES = [[0, 2], [1, 0], [1, 2], [0, 1]]
+
+
+def test_verify_solution():
+    verdict = verifier.verify(TUBES, MOVES)
+    assert verdict == {"valid": True, "won": True, "move_count": 4, "error": None, "final": [[], [0, 0], [1, 1]]}
+
+
+def test_illegal_move_stops_the_replay():
+    verdict = verifier.verify(TUBES, [[0, 2], [0, 2], [1, 0]])
+    assert not verdict["valid"] and not verdict["won"] and verdict["move_count"] == 1
+    assert verdict["error"].startswith("move 1 ")
+    verdict = verifier.verify(TUBES, [[0, 2], [0, 2], [1, 0]], skip_illegal=True)
+    assert not verdict["valid"] and verdict["move_count"] == 2
+
+
+@pytest.mark.parametrize("tubes, moves, capacity", [
+    ([[0.0, 1], [1, 0], []], MOVES, None),
+    ([[False, 1], [1, 0], []], MOVES, None),
+    ([[0, 1], 2, []], MOVES, None),
+    (TUBES, MOVES, 2.0),
+    (TUBES, MOVES, True),
+    (TUBES, tuple(MOVES), None),
+])
+def test_non_integer_submissions_are_invalid(tubes, moves, capacity):
+    verdict = verifier.verify(tubes, moves, capacity)
+    assert not verdict["valid"] and verdict["move_count"] == 0 and verdict["final"] is None
+
+
+@pytest.mark.parametrize("moves", [[[0.0, 2]] + MOVES[1:], [[0, 2], [True, 0]] + MOVES[2:], [[0, 2], [1]]])
+def test_non_integer_moves_end_the_replay(moves):
+    for skip_illegal in (False, True):
+        verdict = verifier.verify(TUBES, moves, skip_illegal=skip_illegal)
+        assert not verdict["valid"] and not verdict["won"]
+
+
+@pytest.mark.parametrize("tubes, moves, capacity", [
+    ([[0.0, 1], [1, 0], []], MOVES, None),
+    ([[False, 1], [1, 0], []], MOVES, None),
+    (TUBES, [[0.0, 2]] + MOVES[1:], None),
+    (TUBES, [[0, 2], [True, 0]] + MOVES[2:], None),
+    (TUBES, MOVES, True),
+    (TUBES, tuple(MOVES), None),
+])
+def test_verdicts_do_not_depend_on_submission_order(tubes, moves, capacity):
+    expected = verifier.verify(tubes, moves, capacity)
+    for first in ((TUBES, MOVES, None), (TUBES, MOVES, 2), (tubes, moves, capacity)):
+        checker = verifier.Verifier()
+        checker.verify(*first)
+        assert checker.verify(tubes, moves, capacity) == expected
+        assert checker.verify(TUBES, MOVES, 2 if capacity is True else None)["valid"]
+
+
+def test_repeated_submissions_come_from_the_memo():
+    checker = verifier.Verifier()
+    first = checker.verify(TUBES, MOVES)
+    assert checker.verify([list(tube) for tube in TUBES], [list(move) for move in MOVES]) == first
+    assert checker.verified == 2 and checker.repeated == 1
+
+
+def test_stream_keeps_going_after_bad_lines():
+    lines = [json.dumps({"id": "a", "tubes": TUBES, "moves": MOVES}), "not json", "", '{"tubes": [[0]]}',
+             json.dumps({"tubes": TUBES, "moves": MOVES[:1]})]
+    verdicts = [json.loads(line) for line in verifier.verify_stream(lines)]
+    assert [verdict["id"] for verdict in verdicts] == ["a", 1, 3, 4]
+    assert [verdict["valid"] for verdict in verdicts] == [True, False, False, True]
+    assert [verdict["won"] for verdict in verdicts] == [True, False, False, False]
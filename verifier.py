@@ -0,0 +1,296 @@
+"""
+    Verify submitted solutions in bulk: replay every move list on its board without rendering.
+
+    Input is JSONL, one submission per line: an object with the initial "tubes", the "moves" as [src, dst]
+    pairs, an optional "id" (the line number otherwise) and an optional "capacity" (the largest color count
+    of the board otherwise). Output is JSONL as well, one line per submission, in input order:
+        {"id": 0, "valid": true, "won": true, "move_count": 12, "error": null, "final": [[0, 0, 0], ...]}
+
+    The moves follow the rules of engine.GameEngine.pour. A submission is valid if its board is well formed
+    (every color exactly capacity times, no tube over capacity) and every move is a legal pour. The replay
+    stops at the first illegal move unless skip_illegal is set, in which case illegal moves are ignored like
+    taps on the wrong tube in the game. move_count counts the pours actually played and final is the board
+    they lead to. A line that cannot be parsed gets an invalid result instead of stopping the stream.
+
+    The replay works on one bytearray per tube and pours with slice operations, so a typical board replays
+    in a few microseconds and most of the time goes to JSON. Repeated submissions (the same board and moves)
+    are answered from a memo of recent verdicts. With workers > 1 the lines are handed to a pool of
+    processes in chunks, parsing included.
+
+    Usage:
+        python verifier.py submissions.jsonl -o verdicts.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from itertools import chain, islice
+from multiprocessing import get_context
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MotherTube = List[List[int]]
+Plan = List[List[int]]
+Chunk = Tuple[int, List[str]]  # The number of the first line and the lines.
+
+Verdict = Dict[str, object]
+
+
+def check_board(tubes: MotherTube, capacity: Optional[int] = None) -> Tuple[List[bytearray], int]:
+    """
+        Return the board as one bytearray per tube and the capacity of a tube.
+
+        Raises:
+            ValueError: If the board is not a list of tubes of integer colors 0 to 255 (True and 1.0 are not
+                colors), a tube holds more than capacity units, or a color does not appear exactly capacity times.
+    """
+    try:
+        # _plain first: bytearray(3) would make a tube of three zeros.
+        if not _plain(tubes):
+            raise TypeError
+        board = [bytearray(tube) for tube in tubes]
+    except (TypeError, ValueError):
+        raise ValueError("the board must be a list of tubes of colors 0 to 255") from None
+    if capacity is not None and (type(capacity) is not int or capacity < 1):
+        raise ValueError(f"invalid capacity: {capacity!r}")
+    counts = Counter(b"".join(board))
+    if capacity is None:
+        capacity = max(counts.values(), default=0)
+    if board and max(map(len, board)) > capacity:
+        raise ValueError(f"a tube holds more than {capacity} units")
+    if counts and set(counts.values()) != {capacity}:
+        raise ValueError(f"every color must appear exactly {capacity} times")
+    return board, capacity
+
+
+def _plain(rows) -> bool:
+    """Return True if every item of every row is an int, bool excluded: 1.0 == 1 and True == 1, but neither
+    is a color or a tube index."""
+    return set(map(type, chain.from_iterable(rows))) <= {int}
+
+
+def replay(board: List[bytearray], moves: Plan, capacity: int, skip_illegal: bool = False) -> Tuple[int, Optional[int]]:
+    """
+        Play the [src, dst] moves on board in place. A move that is not a pair of integers (bool excluded)
+        ends the replay, even with skip_illegal.
+
+        Returns:
+            Tuple[int, int]: The number of pours played and the index of the first illegal move, None if there
+            is none.
+    """
+    tubes = len(board)
+    played = 0
+    illegal = None
+    index = 0
+    try:
+        for index, (src, dst) in enumerate(moves):
+            if type(src) is not int or type(dst) is not int:
+                illegal = index if illegal is None else illegal
+                break
+            if 0 <= src < tubes and 0 <= dst < tubes and src != dst:
+                source = board[src]
+                target = board[dst]
+                free = capacity - len(target)
+                # moves.pour_amount inlined, this loop is the whole cost of a replay.
+                if source and free > 0 and (not target or target[-1] == source[-1]):
+                    color = source[-1]
+                    size = len(source)
+                    count = 1
+                    while count < size and count < free and source[-1 - count] == color:
+                        count += 1
+                    target += source[-count:]
+                    del source[-count:]
+                    played += 1
+                    continue
+            if illegal is None:
+                illegal = index
+            if not skip_illegal:
+                break
+    except (TypeError, ValueError, IndexError):
+        if illegal is None:
+            illegal = index
+    return played, illegal
+
+
+def is_won(board: List[bytearray], capacity: int) -> bool:
+    """Return True if every tube is either empty or full with a single color."""
+    for tube in board:
+        if tube and (len(tube) != capacity or tube.count(tube[0]) != capacity):
+            return False
+    return True
+
+
+def verify(tubes: MotherTube, moves: Plan, capacity: Optional[int] = None, skip_illegal: bool = False,
+           final: bool = True) -> Verdict:
+    """
+        Verify one submission.
+
+        Args:
+            tubes (List[List[int]]): The initial board.
+            moves (List[List[int]]): The submitted [src, dst] moves.
+            capacity (int): The capacity of a tube, the largest color count of the board if omitted.
+            skip_illegal (bool): Ignore illegal moves instead of stopping at the first one.
+            final (bool): Include the final board in the result.
+
+        Returns:
+            dict: "valid", "won", "move_count", "error" (None for a valid submission) and "final".
+    """
+    try:
+        board, capacity = check_board(tubes, capacity)
+        if not isinstance(moves, list):
+            raise ValueError("the moves must be a list of [src, dst] pairs")
+    except ValueError as error:
+        return {"valid": False, "won": False, "move_count": 0, "error": f"invalid submission: {error}",
+                "final": None}
+    played, illegal = replay(board, moves, capacity, skip_illegal)
+    error = None
+    if illegal is not None:
+        error = f"move {illegal} ({moves[illegal]!r}) is not a legal pour"
+    return {"valid": illegal is None, "won": is_won(board, capacity), "move_count": played, "error": error,
+            "final": [list(tube) for tube in board] if final else None}
+
+
+class Verifier:
+    """
+        Verifies submissions, remembering the verdicts of recent ones: on a leaderboard many players submit
+        the same moves for the same level, and a repeated submission is answered without a replay.
+
+        Attributes:
+            skip_illegal (bool): Ignore illegal moves instead of stopping at the first one.
+            final (bool): Include the final boards in the verdicts.
+            memo_size (int): The maximum number of verdicts remembered, 0 disables the memo.
+            verified (int): The number of submissions verified.
+            repeated (int): The number of them answered from the memo.
+    """
+    def __init__(self, skip_illegal: bool = False, final: bool = True, memo_size: int = 1 << 16):
+        self.skip_illegal = skip_illegal
+        self.final = final
+        self.memo_size = memo_size
+        self.verified = 0
+        self.repeated = 0
+        self.__memo: Dict[Tuple, Verdict] = {}
+
+    def verify(self, tubes: MotherTube, moves: Plan, capacity: Optional[int] = None) -> Verdict:
+        """Verify one submission, see verify. Verdicts from the memo share their final board."""
+        self.verified += 1
+        key = self.__key(tubes, moves, capacity) if self.memo_size else None
+        if key is None:
+            return verify(tubes, moves, capacity, self.skip_illegal, self.final)
+        known = self.__memo.get(key)
+        if known is not None:
+            self.repeated += 1
+            return dict(known)
+        verdict = verify(tubes, moves, capacity, self.skip_illegal, self.final)
+        if len(self.__memo) >= self.memo_size:
+            self.__memo.clear()
+        self.__memo[key] = verdict
+        return dict(verdict)
+
+    @staticmethod
+    def __key(tubes: MotherTube, moves: Plan, capacity: Optional[int]) -> Optional[Tuple]:
+        """
+            Return the memo key of a submission, None if it is not lists of plain integers. Equal keys must
+            mean equal verdicts, and 0.0 == 0 and True == 1 in a tuple, so anything else is verified afresh.
+        """
+        if type(moves) is not list or (capacity is not None and type(capacity) is not int):
+            return None
+        try:
+            key = (tuple(map(tuple, tubes)), tuple(map(tuple, moves)), capacity)
+        except TypeError:
+            return None
+        return key if _plain(key[0]) and _plain(key[1]) else None
+
+    def verify_line(self, line: str, number: int) -> Verdict:
+        """Verify the submission on one JSONL line, its id defaulting to the line number."""
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict) or "tubes" not in record or "moves" not in record:
+                raise ValueError("expected an object with \"tubes\" and \"moves\"")
+        except ValueError as error:
+            return {"id": number, "valid": False, "won": False, "move_count": 0,
+                    "error": f"line {number + 1}: {error}", "final": None}
+        result = {"id": record.get("id", number)}
+        result.update(self.verify(record["tubes"], record["moves"], record.get("capacity")))
+        return result
+
+    def verify_lines(self, lines: List[str], start: int = 0) -> List[str]:
+        """Verify consecutive JSONL lines, the first one having number start, and return the JSONL verdicts."""
+        return [json.dumps(self.verify_line(line, start + offset)) for offset, line in enumerate(lines)
+                if line.strip()]
+
+
+_worker: Optional[Verifier] = None  # The verifier of a pool process, kept across chunks for its memo.
+
+
+def _start_worker(skip_illegal: bool, final: bool, memo_size: int) -> None:
+    global _worker
+    _worker = Verifier(skip_illegal, final, memo_size)
+
+
+def _verify_chunk(chunk: Chunk) -> List[str]:
+    start, lines = chunk
+    return _worker.verify_lines(lines, start)
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[Chunk]:
+    lines = iter(lines)
+    start = 0
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def verify_stream(lines: Iterable[str], workers: int = 1, chunk_size: int = 1000, skip_illegal: bool = False,
+                  final: bool = True, memo_size: int = 1 << 16) -> Iterator[str]:
+    """
+        Verify JSONL submissions and yield the JSONL verdicts, in input order.
+
+        Args:
+            lines (Iterable[str]): JSONL submissions, blank lines are skipped but keep their number.
+            workers (int): The number of processes, 1 verifies in the calling process.
+            chunk_size (int): The number of lines handed to a worker at once.
+            skip_illegal (bool): Ignore illegal moves instead of stopping at the first one.
+            final (bool): Include the final boards in the verdicts.
+            memo_size (int): The number of verdicts every process remembers, 0 disables the memo.
+    """
+    chunks = _chunks(lines, chunk_size)
+    if workers <= 1:
+        verifier = Verifier(skip_illegal, final, memo_size)
+        for start, chunk in chunks:
+            yield from verifier.verify_lines(chunk, start)
+        return
+    with get_context("spawn").Pool(workers, _start_worker, (skip_illegal, final, memo_size)) as pool:
+        for results in pool.imap(_verify_chunk, chunks):
+            yield from results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-", help="JSONL submissions, - for standard input")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results, - for standard output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="lines handed to a worker at once")
+    parser.add_argument("--skip-illegal", action="store_true", help="ignore illegal moves instead of stopping")
+    parser.add_argument("--no-final", action="store_true", help="leave the final boards out of the results")
+    parser.add_argument("--memo-size", type=int, default=1 << 16,
+                        help="verdicts remembered per process for repeated submissions, 0 disables")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for result in verify_stream(source, args.workers, args.chunk_size, args.skip_illegal, not args.no_final,
+                                    args.memo_size):
+            sink.write(result + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()